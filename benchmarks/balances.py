@@ -0,0 +1,160 @@
+"""Balance decoding: full msgpack decode vs. deposit.balances.
+
+Builds synthetic account responses with thousands of holdings plus created
+assets, created apps and local state, checks decodeBalances against a full
+decode on every one (also with reordered fields and unusual holdings), and
+times both. Then fetches a pool account from the stand-in node with and
+without ``exclude`` and compares the bytes transferred.
+
+    python -m benchmarks.balances [holdings ...]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict
+
+import msgpack
+
+from deposit.balances import decodeBalances, fetchBalances
+
+REPEAT = 10
+
+
+def syntheticAccount(rng: random.Random, holdings: int) -> Dict[str, Any]:
+    # algod's raw ledger record: short keys in canonical (sorted) order,
+    # zero fields left out
+    assets = dict()
+    for _ in range(holdings):
+        amount = rng.choice([0, rng.randrange(10 ** 6), rng.randrange(2 ** 64)])
+        assets[rng.randrange(1, 2 ** 40)] = {"a": amount} if amount else {}
+    return {
+        "algo": rng.randrange(10 ** 12),
+        "apar": {
+            i: {
+                "an": "token {}".format(i),
+                "au": "https://example.com/{}".format(i),
+                "t": 10 ** 13,
+                "un": "TOK",
+            }
+            for i in range(1, 201)
+        },
+        "appl": {
+            i: {
+                "hsch": {"nbs": 16},
+                "tkv": {
+                    os.urandom(16): {"tb": os.urandom(64), "tt": 1}
+                    for _ in range(16)
+                },
+            }
+            for i in range(1, 51)
+        },
+        "appp": {
+            i: {
+                "approv": os.urandom(2048),
+                "clearp": os.urandom(8),
+                "gs": {os.urandom(8): {"tt": 2, "ui": i} for _ in range(7)},
+            }
+            for i in range(1, 51)
+        },
+        "asset": dict(sorted(assets.items())),
+        "tsch": {"nbs": 800},
+    }
+
+
+def fullDecode(raw: bytes) -> Dict[int, int]:
+    # decode everything, then build a dict
+    accountInfo = msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    balances = {0: accountInfo.get("algo", 0)}
+    for assetID, holding in accountInfo.get("asset", {}).items():
+        balances[assetID] = holding.get("a", 0)
+    return balances
+
+
+def timeit(f, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        f(*args)
+    return (time.perf_counter() - start) / REPEAT
+
+
+def variants(info: Dict[str, Any]):
+    yield info
+    # fields in another order, as some nodes and the stand-in send them
+    yield dict(reversed(list(info.items())))
+    # holdings with fields the fast path does not know
+    yield dict(
+        info,
+        asset={i: dict(h, x=[1, 2]) for i, h in info["asset"].items()},
+    )
+
+
+def standin(holdings: int) -> None:
+    from algosdk import account
+
+    from deposit.standin import StandInNode, serve
+    from deposit.transport import PooledAlgodClient
+
+    node = StandInNode()
+    _, address = serve(node)
+    client = PooledAlgodClient("", address)
+    holder = account.generate_account()[1]
+    node.fund(holder, 10 ** 9)
+    with node.lock:
+        node.accounts[holder]["assets"] = {i: i * 7 for i in range(1, holdings + 1)}
+
+    wanted = [1, 2, holdings, holdings + 5]
+    sizes = {}
+    request = client.algod_request
+
+    def counting(method, path, *args, **kwargs):
+        response = request(method, path, *args, **kwargs)
+        # JSON responses come back parsed
+        size = len(response if isinstance(response, bytes) else json.dumps(response))
+        sizes[key] = sizes.get(key, 0) + size
+        return response
+
+    client.algod_request = counting
+    for key, exclude in (("full", False), ("exclude", True)):
+        start = time.perf_counter()
+        balances = fetchBalances(client, holder, wanted, exclude=exclude)
+        elapsed = time.perf_counter() - start
+        assert dict(balances) == {0: 10 ** 9, 1: 7, 2: 14, holdings: holdings * 7}
+        print(
+            "stand-in {:<8} {:>10} bytes {:>8.2f} ms".format(
+                key, sizes[key], elapsed * 1e3
+            )
+        )
+
+
+def main(*sizes: int) -> None:
+    rng = random.Random(1)
+    mismatches = 0
+    for holdings in sizes or (1_000, 5_000, 20_000):
+        info = syntheticAccount(rng, holdings)
+        for variant in variants(info):
+            raw = msgpack.packb(variant, use_bin_type=True)
+            mismatches += dict(decodeBalances(raw)) != fullDecode(raw)
+
+        raw = msgpack.packb(info, use_bin_type=True)
+        wanted = list(info["asset"])[:4]
+        full = timeit(fullDecode, raw)
+        partial = timeit(decodeBalances, raw)
+        subset = timeit(decodeBalances, raw, wanted)
+        print(
+            "{:>6} holdings {:>9} bytes  full {:>7.2f} ms  partial {:>7.2f} ms"
+            "  4 assets {:>7.2f} ms".format(
+                holdings, len(raw), full * 1e3, partial * 1e3, subset * 1e3
+            )
+        )
+
+    standin(5_000)
+    print("mismatches {}".format(mismatches))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,141 @@
+"""CPU and memory per confirmed transaction and per global state read:
+eager JSON decoding vs. lazy views over msgpack responses.
+
+Runs offline on synthetic responses shaped like algod's.
+
+    python -m benchmarks.decoding
+"""
+import json
+import tracemalloc
+from base64 import b64decode, b64encode
+from timeit import timeit
+
+import msgpack
+
+from deposit.utils import PendingTxnResponse, StateView, decodeState
+
+LOGS = [bytes(range(i % 200, i % 200 + 48)) for i in range(16)]
+INNER = [{"txn": {"txn": {"type": "axfer", "aamt": i, "xaid": 7}}} for i in range(4)]
+PENDING = {
+    "pool-error": "",
+    "confirmed-round": 1234,
+    "txn": {"sig": bytes(64), "txn": {"type": "appl", "apid": 99, "snd": bytes(32)}},
+    "global-state-delta": [
+        {"key": b64encode(b"pool_tokens_outstanding_key").decode(), "value": {"action": 2, "uint": 5}}
+    ],
+    "inner-txns": INNER,
+    "logs": LOGS,
+}
+PENDING_JSON = json.dumps(
+    dict(
+        PENDING,
+        txn={"sig": b64encode(bytes(64)).decode(), "txn": {"type": "appl", "apid": 99}},
+        logs=[b64encode(l).decode() for l in LOGS],
+    )
+).encode()
+PENDING_MSGPACK = msgpack.packb(PENDING, use_bin_type=True)
+
+STATE = [
+    {
+        "key": b64encode(b"key_%d" % i).decode(),
+        "value": {"type": 1, "bytes": b64encode(b"v" * 32).decode()}
+        if i % 2
+        else {"type": 2, "uint": i},
+    }
+    for i in range(64)
+] + [
+    {"key": b64encode(k).decode(), "value": {"type": 2, "uint": 1}}
+    for k in (b"token_a_key", b"token_b_key", b"pool_token_key")
+]
+
+
+class EagerPendingTxnResponse:
+    """The previous PendingTxnResponse, which copied every field up front."""
+
+    def __init__(self, response):
+        self.poolError = response["pool-error"]
+        self.txn = response["txn"]
+        self.applicationIndex = response.get("application-index")
+        self.assetIndex = response.get("asset-index")
+        self.closeRewards = response.get("close-rewards")
+        self.closingAmount = response.get("closing-amount")
+        self.confirmedRound = response.get("confirmed-round")
+        self.globalStateDelta = response.get("global-state-delta")
+        self.localStateDelta = response.get("local-state-delta")
+        self.receiverRewards = response.get("receiver-rewards")
+        self.senderRewards = response.get("sender-rewards")
+        self.innerTxns = response.get("inner-txns", [])
+        self.logs = [b64decode(l) for l in response.get("logs", [])]
+
+
+PENDING_JSON_DECODED = json.loads(PENDING_JSON)
+PENDING_MSGPACK_DECODED = msgpack.unpackb(PENDING_MSGPACK, raw=False)
+
+
+def eagerConfirmed():
+    return EagerPendingTxnResponse(PENDING_JSON_DECODED).confirmedRound
+
+
+def lazyConfirmed():
+    return PendingTxnResponse(PENDING_MSGPACK_DECODED).confirmedRound
+
+
+def jsonWire():
+    return json.loads(PENDING_JSON)
+
+
+def msgpackWire():
+    return msgpack.unpackb(PENDING_MSGPACK, raw=False)
+
+
+def eagerState():
+    state = decodeState(STATE)
+    return state[b"token_a_key"], state[b"token_b_key"], state[b"pool_token_key"]
+
+
+def lazyState():
+    state = StateView(STATE)
+    return state[b"token_a_key"], state[b"token_b_key"], state[b"pool_token_key"]
+
+
+def peakBytes(fn, n: int = 1000) -> float:
+    tracemalloc.start()
+    kept = [fn() for _ in range(n)]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del kept
+    return peak / n
+
+
+def main(n: int = 20000) -> None:
+    print(
+        "msgpack extension:",
+        "C" if not msgpack.Unpacker.__module__.endswith("fallback") else "pure Python",
+    )
+    wireJson = timeit(jsonWire, number=n) / n
+    wireMsgpack = timeit(msgpackWire, number=n) / n
+    print(
+        f"{'wire decode':14} json  {wireJson * 1e6:7.2f} us  msgpack {wireMsgpack * 1e6:7.2f} us"
+        f"  ({len(PENDING_JSON)} vs {len(PENDING_MSGPACK)} bytes)"
+    )
+
+    for name, eager, lazy in (
+        ("confirmed txn", eagerConfirmed, lazyConfirmed),
+        ("state read", eagerState, lazyState),
+    ):
+        assert eager() == lazy()
+        eagerTime = timeit(eager, number=n) / n
+        lazyTime = timeit(lazy, number=n) / n
+        print(
+            f"{name:14} eager {eagerTime * 1e6:7.2f} us  lazy {lazyTime * 1e6:7.2f} us"
+            f"  ({eagerTime / lazyTime:.1f}x)"
+        )
+
+    # memory held per response object while it is in use
+    eagerBytes = peakBytes(lambda: EagerPendingTxnResponse(jsonWire()))
+    lazyBytes = peakBytes(lambda: PendingTxnResponse(msgpackWire()))
+    print(f"memory/txn     eager {eagerBytes:7.0f} B   lazy {lazyBytes:7.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Pool deployment: one pool at a time vs. PoolDeployer.
+
+Runs against an in-process stand-in node whose rounds last ``--round``
+seconds. Deploys a few pools with the serial helpers (createApp, setupApp,
+optInToPoolToken, supply) to measure rounds per pool, then ``pools`` pools
+with deployPools, and checks every deployed pool holds its liquidity.
+
+    python -m benchmarks.deploy [pools] [--round 0.5]
+"""
+
+import argparse
+import time
+
+from algosdk import account
+
+from deposit.account import Account
+from deposit.deploy import PoolSpec, deployPools
+from deposit.operations import createApp, optInToPoolToken, setupApp, supply
+from deposit.resources import createDummyAsset, getTemporaryAccount
+from deposit.standin import StandInNode, serve
+from deposit.transport import PooledAlgodClient
+from deposit.utils import getAppGlobalState, getBalances
+
+SERIAL_POOLS = 3
+LIQUIDITY = 10 ** 6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pools", type=int, nargs="?", default=200)
+    parser.add_argument("--round", type=float, default=0.5)
+    args = parser.parse_args()
+
+    node = StandInNode(args.round)
+    _, address = serve(node)
+    client = PooledAlgodClient("", address, maxPerHost=64)
+    dispenser = Account(account.generate_account()[0])
+    node.fund(dispenser.getAddress(), 10 ** 15)
+    creator = getTemporaryAccount(client, dispenser, 10 ** 12)
+    tokenA = createDummyAsset(client, 10 ** 15, creator)
+    tokenB = createDummyAsset(client, 10 ** 15, creator)
+
+    start, first = time.perf_counter(), node.lastRound()
+    for _ in range(SERIAL_POOLS):
+        appID = createApp(client, creator, tokenA, tokenB, 30, 1000)
+        setupApp(client, appID, creator, tokenA, tokenB)
+        optInToPoolToken(client, appID, creator)
+        supply(client, appID, LIQUIDITY, LIQUIDITY, creator)
+    serialRounds = (node.lastRound() - first) / SERIAL_POOLS
+    serialTime = (time.perf_counter() - start) / SERIAL_POOLS
+
+    specs = [
+        PoolSpec(tokenA, tokenB, 30, 1000, LIQUIDITY, LIQUIDITY)
+        for _ in range(args.pools)
+    ]
+    start, first = time.perf_counter(), node.lastRound()
+    deployments = deployPools(client, creator, specs)
+    rounds = node.lastRound() - first
+    elapsed = time.perf_counter() - start
+
+    failed = [d for d in deployments if d.error]
+    funded = sum(
+        1
+        for d in deployments
+        if not d.error
+        and getAppGlobalState(client, d.appID)[b"pool_tokens_outstanding_key"] > 0
+        and getBalances(client, creator.getAddress()).get(d.poolToken, 0) > 0
+    )
+    print(
+        "serial           {:>8.1f} rounds/pool {:>8.2f} s/pool".format(
+            serialRounds, serialTime
+        )
+    )
+    print("pipelined pools  {:>8}".format(args.pools))
+    print("  rounds         {:>8}".format(rounds))
+    print("  seconds        {:>8.2f}".format(elapsed))
+    print("  failed         {:>8}".format(len(failed)))
+    print("  with liquidity {:>8}".format(funded))
+    if failed:
+        print("  first error    {}".format(failed[0].error))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""Differential fuzzing of the approval program against deposit.model.
+
+Generates random and edge-case pools (reserves and outstanding pool tokens up
+to the uint64 limit, unusual fees and minimum increments, wrapped price
+accumulators) with swap, supply, withdraw and zap groups against them, plus
+direct calls to the math subroutines with unconstrained arguments. Each case
+runs through the compiled approval program on deposit.teal and through
+deposit.model, and the two must agree on accept/reject and, when accepted,
+on the tokens sent, the pool tokens outstanding and the price accumulators.
+
+Cases are split into chunks run in worker processes. Reports, per target,
+accepted and rejected cases, arithmetic panics (uint64 overflow, division
+by zero) by opcode, mismatches with examples, the highest opcode cost seen,
+and evaluations per second.
+
+    python -m benchmarks.fuzz [cases] [--workers N] [--seed S]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from deposit import model
+from deposit.contracts.contracts import approval_program
+from deposit.model import (
+    POOL_TOKEN_DEFAULT_AMOUNT,
+    PRICE_CUMULATIVE_MODULUS,
+    UINT64_MAX,
+    ContractReject,
+    PoolModel,
+)
+from deposit.teal import NAMED_INTS, EvalContext, Program, TealError
+
+CHUNK = 2_000
+EXAMPLES = 3
+APP_ID = 1
+TOKEN_A, TOKEN_B, POOL_TOKEN = 11, 12, 13
+SENDER = bytes([1]) * 32
+APP_ADDRESS = bytes([2]) * 32
+START = 1_700_000_000
+
+EDGE_VALUES = (
+    0,
+    1,
+    2,
+    999,
+    1000,
+    1001,
+    10_000,
+    2 ** 32 - 1,
+    2 ** 32,
+    2 ** 32 + 1,
+    POOL_TOKEN_DEFAULT_AMOUNT - 1,
+    POOL_TOKEN_DEFAULT_AMOUNT,
+    2 ** 63,
+    UINT64_MAX - 1,
+    UINT64_MAX,
+)
+
+# set in each worker by _init
+_program: Optional[Program] = None
+
+
+def uint(rng: random.Random) -> int:
+    """A uint64, mostly log-uniform, with a share of edge values."""
+    roll = rng.random()
+    if roll < 0.15:
+        return rng.choice(EDGE_VALUES)
+    if roll < 0.25:
+        # around the square root of the uint64 range, where products overflow
+        return 2 ** 32 + rng.randrange(-(2 ** 20), 2 ** 20)
+    return rng.getrandbits(rng.randint(1, 64))
+
+
+def feeBps(rng: random.Random) -> int:
+    # the contract takes any fee at create; only 0..9999 are sane
+    roll = rng.random()
+    if roll < 0.6:
+        return 30
+    if roll < 0.9:
+        return rng.randrange(0, 10_000)
+    return rng.choice((9_999, 10_000, 10_001, UINT64_MAX))
+
+
+def minIncrement(rng: random.Random) -> int:
+    return rng.choice((0, 1, 1000, 1000, 1000, uint(rng)))
+
+
+def outstanding(rng: random.Random) -> int:
+    roll = rng.random()
+    if roll < 0.1:
+        return 0
+    if roll < 0.2:
+        return rng.choice((1, POOL_TOKEN_DEFAULT_AMOUNT - 1, POOL_TOKEN_DEFAULT_AMOUNT))
+    return rng.randint(1, POOL_TOKEN_DEFAULT_AMOUNT)
+
+
+def cumulative(rng: random.Random) -> bytes:
+    # zero, near the 2^128 wrap, or anywhere
+    value = rng.choice(
+        (0, PRICE_CUMULATIVE_MODULUS - 1 - rng.getrandbits(80), rng.getrandbits(128))
+    )
+    return value.to_bytes(16, "big")
+
+
+def elapsed(rng: random.Random) -> int:
+    return rng.choice((0, 1, rng.randrange(1, 3600), rng.getrandbits(32)))
+
+
+class Pool:
+    """A random pool and the app context it is evaluated in."""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.fee = feeBps(rng)
+        self.minIncrement = minIncrement(rng)
+        self.reserveA = uint(rng)
+        self.reserveB = uint(rng)
+        self.outstanding = outstanding(rng)
+        self.priceA = cumulative(rng)
+        self.priceB = cumulative(rng)
+        self.elapsed = elapsed(rng)
+
+    def model(self, reserveA: int, reserveB: int) -> PoolModel:
+        return PoolModel(
+            self.fee, self.minIncrement, reserveA, reserveB, self.outstanding
+        )
+
+    def context(
+        self, transfers: List[Tuple[int, int]], method: bytes, received: Dict[int, int]
+    ) -> EvalContext:
+        """The group ``transfers`` (asset, amount) + app call ``method``, with
+        the app holding the reserves plus ``received``."""
+        group = [
+            {
+                "TypeEnum": NAMED_INTS["axfer"],
+                "Sender": SENDER,
+                "AssetReceiver": APP_ADDRESS,
+                "XferAsset": asset,
+                "AssetAmount": amount,
+            }
+            for asset, amount in transfers
+        ]
+        group.append(
+            {
+                "TypeEnum": NAMED_INTS["appl"],
+                "Sender": SENDER,
+                "ApplicationID": APP_ID,
+                "OnCompletion": NAMED_INTS["NoOp"],
+                "ApplicationArgs": [method],
+            }
+        )
+        state = {
+            b"creator_key": SENDER,
+            b"token_a_key": TOKEN_A,
+            b"token_b_key": TOKEN_B,
+            b"pool_token_key": POOL_TOKEN,
+            b"fee_bps_key": self.fee,
+            b"min_increment_key": self.minIncrement,
+            b"pool_tokens_outstanding_key": self.outstanding,
+            b"price_a_cumulative_key": self.priceA,
+            b"price_b_cumulative_key": self.priceB,
+            b"last_price_update_key": START,
+        }
+        holdings = {
+            (APP_ADDRESS, TOKEN_A): self.reserveA + received.get(TOKEN_A, 0),
+            (APP_ADDRESS, TOKEN_B): self.reserveB + received.get(TOKEN_B, 0),
+            (APP_ADDRESS, POOL_TOKEN): POOL_TOKEN_DEFAULT_AMOUNT
+            - self.outstanding
+            + received.get(POOL_TOKEN, 0),
+        }
+        for asset in (TOKEN_A, TOKEN_B, POOL_TOKEN):
+            holdings[(SENDER, asset)] = 0
+        return EvalContext(
+            group,
+            len(group) - 1,
+            APP_ID,
+            APP_ADDRESS,
+            state,
+            holdings,
+            START + self.elapsed,
+        )
+
+    def prices(self, reserveA: int, reserveB: int) -> Tuple[bytes, bytes]:
+        """The accumulators after an update with these reserves."""
+        if self.elapsed == 0 or reserveA == 0 or reserveB == 0:
+            return self.priceA, self.priceB
+        return tuple(
+            model.accumulatePrice(
+                int.from_bytes(before, "big"), num, den, self.elapsed
+            ).to_bytes(16, "big")
+            for before, num, den in (
+                (self.priceA, reserveB, reserveA),
+                (self.priceB, reserveA, reserveB),
+            )
+        )
+
+
+def amountFor(rng: random.Random, reserve: int) -> int:
+    # the app's holding after the transfer must still be a uint64
+    return min(uint(rng), UINT64_MAX - reserve)
+
+
+# A case returns (model outcome, context, expected reserves for the price
+# update). An outcome is None for a rejection, else (sends, outstanding).
+Outcome = Optional[Tuple[Tuple[Tuple[int, bytes, int], ...], int]]
+
+
+def swapCase(rng: random.Random, pool: Pool) -> Tuple[Outcome, EvalContext, Any]:
+    givenIsA = rng.random() < 0.5
+    given, other = (TOKEN_A, TOKEN_B) if givenIsA else (TOKEN_B, TOKEN_A)
+    amount = amountFor(rng, pool.reserveA if givenIsA else pool.reserveB)
+    ctx = pool.context([(given, amount)], b"swap", {given: amount})
+    try:
+        out = pool.model(pool.reserveA, pool.reserveB).swap(givenIsA, amount)
+        outcome: Outcome = (((other, SENDER, out),), pool.outstanding)
+    except ContractReject:
+        outcome = None
+    return outcome, ctx, (pool.reserveA, pool.reserveB)
+
+
+def supplyCase(rng: random.Random, pool: Pool) -> Tuple[Outcome, EvalContext, Any]:
+    if rng.random() < 0.3:
+        # first supply, through the Sqrt initial mint
+        pool.reserveA = pool.reserveB = 0
+    qA = amountFor(rng, pool.reserveA)
+    qB = amountFor(rng, pool.reserveB)
+    ctx = pool.context(
+        [(TOKEN_A, qA), (TOKEN_B, qB)], b"supply", {TOKEN_A: qA, TOKEN_B: qB}
+    )
+    pm = pool.model(pool.reserveA, pool.reserveB)
+    try:
+        minted, refundA, refundB = pm.supply(qA, qB)
+        sends = []
+        if refundB:
+            sends.append((TOKEN_B, SENDER, refundB))
+        if refundA:
+            sends.append((TOKEN_A, SENDER, refundA))
+        sends.append((POOL_TOKEN, SENDER, minted))
+        outcome: Outcome = (tuple(sends), pm.outstanding)
+    except ContractReject:
+        outcome = None
+    return outcome, ctx, (pool.reserveA, pool.reserveB)
+
+
+def withdrawCase(rng: random.Random, pool: Pool) -> Tuple[Outcome, EvalContext, Any]:
+    amount = rng.choice(
+        (uint(rng), rng.randint(0, pool.outstanding), pool.outstanding)
+    ) % (2 ** 62)
+    ctx = pool.context([(POOL_TOKEN, amount)], b"withdraw", {POOL_TOKEN: amount})
+    pm = pool.model(pool.reserveA, pool.reserveB)
+    try:
+        outA, outB = pm.withdraw(amount)
+        outcome: Outcome = (
+            ((TOKEN_A, SENDER, outA), (TOKEN_B, SENDER, outB)),
+            pm.outstanding,
+        )
+    except ContractReject:
+        outcome = None
+    return outcome, ctx, (pool.reserveA, pool.reserveB)
+
+
+def zapCase(rng: random.Random, pool: Pool) -> Tuple[Outcome, EvalContext, Any]:
+    givenIsA = rng.random() < 0.5
+    given = TOKEN_A if givenIsA else TOKEN_B
+    amount = amountFor(rng, pool.reserveA if givenIsA else pool.reserveB)
+    ctx = pool.context([(given, amount)], b"zap", {given: amount})
+    pm = pool.model(pool.reserveA, pool.reserveB)
+    try:
+        minted, _, _ = pm.zap(givenIsA, amount)
+        outcome: Outcome = (((POOL_TOKEN, SENDER, minted),), pm.outstanding)
+    except ContractReject:
+        outcome = None
+    return outcome, ctx, (pool.reserveA, pool.reserveB)
+
+
+PROGRAM_TARGETS: Dict[str, Callable[..., Tuple[Outcome, EvalContext, Any]]] = {
+    "swap": swapCase,
+    "supply": supplyCase,
+    "withdraw": withdrawCase,
+    "zap": zapCase,
+}
+# subroutine name -> (model function, argument generator)
+SUBROUTINE_TARGETS: Dict[str, Tuple[Callable[..., int], Callable[..., List[int]]]] = {
+    "computeOtherTokenOutputPerGivenTokenInput": (
+        model.computeOtherTokenOutputPerGivenTokenInput,
+        lambda rng: [uint(rng), uint(rng), uint(rng), feeBps(rng)],
+    ),
+    "computeZapSwapAmount": (
+        model.computeZapSwapAmount,
+        lambda rng: [uint(rng), uint(rng), feeBps(rng)],
+    ),
+    "assessFee": (model.assessFee, lambda rng: [uint(rng), feeBps(rng)]),
+}
+TARGETS = list(PROGRAM_TARGETS) + list(SUBROUTINE_TARGETS)
+
+
+def _init() -> None:
+    global _program
+    _program = Program.fromExpr(approval_program())
+
+
+def runProgramCase(
+    rng: random.Random, target: str, stats: Counter, examples: List[str]
+) -> None:
+    pool = Pool(rng)
+    expected, ctx, reserves = PROGRAM_TARGETS[target](rng, pool)
+    try:
+        approved, cost = _program.eval(ctx)
+        stats[target, "cost"] = max(stats[target, "cost"], cost)
+        error = None
+    except TealError as e:
+        approved, error = False, e
+
+    if approved:
+        sends = tuple(
+            (txn["XferAsset"], txn["AssetReceiver"], txn.get("AssetAmount", 0))
+            for txn in ctx.inner
+        )
+        actual: Outcome = (sends, ctx.state[b"pool_tokens_outstanding_key"])
+    else:
+        actual = None
+    if error is not None:
+        stats[target, error.kind] += 1
+        if error.kind == "overflow":
+            stats[target, "overflow", error.op] += 1
+
+    mismatch = actual != expected
+    if approved and not mismatch:
+        prices = (
+            ctx.state[b"price_a_cumulative_key"],
+            ctx.state[b"price_b_cumulative_key"],
+        )
+        mismatch = prices != pool.prices(*reserves)
+    record(
+        target,
+        approved,
+        mismatch,
+        stats,
+        examples,
+        vars(pool),
+        expected,
+        error or actual,
+    )
+
+
+def runSubroutineCase(
+    rng: random.Random, target: str, stats: Counter, examples: List[str]
+) -> None:
+    f, arguments = SUBROUTINE_TARGETS[target]
+    args = arguments(rng)
+    try:
+        expected: Optional[int] = f(*args)
+    except ContractReject:
+        expected = None
+    try:
+        actual: Any = _program.call(_program.subroutine(target), args)[-1]
+    except TealError as e:
+        actual = None
+        stats[target, e.kind] += 1
+        if e.kind == "overflow":
+            stats[target, "overflow", e.op] += 1
+    record(
+        target,
+        actual is not None,
+        actual != expected,
+        stats,
+        examples,
+        args,
+        expected,
+        actual,
+    )
+
+
+def record(
+    target: str,
+    accepted: bool,
+    mismatch: bool,
+    stats: Counter,
+    examples: List[str],
+    inputs: Any,
+    expected: Any,
+    actual: Any,
+) -> None:
+    stats[target, "cases"] += 1
+    stats[target, "accepted" if accepted else "rejected"] += 1
+    if mismatch:
+        stats[target, "mismatches"] += 1
+        if len(examples) < EXAMPLES:
+            examples.append(
+                "{} {}: model {} teal {}".format(target, inputs, expected, actual)
+            )
+
+
+def runChunk(seed: int, chunk: int, cases: int) -> Tuple[Counter, List[str]]:
+    rng = random.Random(seed * 1_000_003 + chunk)
+    stats: Counter = Counter()
+    examples: List[str] = []
+    for _ in range(cases):
+        target = rng.choice(TARGETS)
+        if target in PROGRAM_TARGETS:
+            runProgramCase(rng, target, stats, examples)
+        else:
+            runSubroutineCase(rng, target, stats, examples)
+    return stats, examples
+
+
+def report(stats: Counter, examples: List[str], elapsed: float, workers: int) -> int:
+    total = sum(stats[target, "cases"] for target in TARGETS)
+    print(
+        "{:<42} {:>9} {:>9} {:>9} {:>9} {:>7} {:>6} {:>5}".format(
+            "target",
+            "cases",
+            "accepted",
+            "rejected",
+            "overflow",
+            "budget",
+            "cost",
+            "diff",
+        )
+    )
+    for target in TARGETS:
+        print(
+            "{:<42} {:>9} {:>9} {:>9} {:>9} {:>7} {:>6} {:>5}".format(
+                target,
+                stats[target, "cases"],
+                stats[target, "accepted"],
+                stats[target, "rejected"],
+                stats[target, "overflow"],
+                stats[target, "budget"],
+                stats[target, "cost"] or "-",
+                stats[target, "mismatches"],
+            )
+        )
+    print("arithmetic panics by opcode:")
+    for key, count in sorted(stats.items()):
+        if len(key) == 3:
+            print("  {:<42} {:<8} {:>9}".format(key[0], key[2], count))
+    mismatches = sum(stats[target, "mismatches"] for target in TARGETS)
+    print("mismatches {}".format(mismatches))
+    for example in examples:
+        print("  " + example)
+    print(
+        "{} evaluations in {:.1f} s on {} workers: {:.0f} evals/s".format(
+            total, elapsed, workers, total / elapsed
+        )
+    )
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cases", type=int, nargs="?", default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    chunks = [
+        (args.seed, i, min(CHUNK, args.cases - start))
+        for i, start in enumerate(range(0, args.cases, CHUNK))
+    ]
+    stats: Counter = Counter()
+    examples: List[str] = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=_init) as executor:
+        for chunkStats, chunkExamples in executor.map(runChunk, *zip(*chunks)):
+            for key, value in chunkStats.items():
+                if key[1] == "cost":
+                    stats[key] = max(stats[key], value)
+                else:
+                    stats[key] += value
+            examples.extend(chunkExamples[: EXAMPLES - len(examples)])
+    if report(stats, examples, time.perf_counter() - start, args.workers):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Signatures per second: SDK ``txn.sign(privateKey)`` vs. cached Account keys.
+
+    python -m benchmarks.signing
+"""
+from base64 import b64decode, b64encode
+from time import perf_counter
+
+from algosdk import account, encoding
+from algosdk.future import transaction
+
+from deposit.account import Account
+
+SUGGESTED_PARAMS = transaction.SuggestedParams(
+    fee=1000,
+    first=1000,
+    last=2000,
+    gh=b64encode(bytes(range(32))).decode(),
+    flat_fee=True,
+)
+
+
+def rate(fn, n: int) -> float:
+    start = perf_counter()
+    fn()
+    return n / (perf_counter() - start)
+
+
+def main(n: int = 5000) -> None:
+    signer = Account(account.generate_account()[0])
+    txns = [
+        transaction.PaymentTxn(signer.getAddress(), SUGGESTED_PARAMS, signer.getAddress(), i)
+        for i in range(1, n + 1)
+    ]
+    encoded = [b64decode(encoding.msgpack_encode(t)) for t in txns]
+
+    assert signer.sign(txns[0]).signature == txns[0].sign(signer.getPrivateKey()).signature
+
+    sdk = rate(lambda: [t.sign(signer.getPrivateKey()) for t in txns], n)
+    cached = rate(lambda: [signer.sign(t) for t in txns], n)
+    batch = rate(lambda: signer.signMany(encoded), n)
+    print(f"txn.sign(sk)      {sdk:10.0f} sig/s")
+    print(f"Account.sign      {cached:10.0f} sig/s ({cached / sdk:.1f}x)")
+    print(f"Account.signMany  {batch:10.0f} sig/s ({batch / sdk:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
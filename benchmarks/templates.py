@@ -0,0 +1,62 @@
+"""Per-group build cost: SDK transaction objects vs. pre-encoded templates.
+
+Runs offline; no algod node is needed.
+
+    python -m benchmarks.templates
+"""
+from base64 import b64decode, b64encode
+from timeit import timeit
+
+from algosdk import account, encoding
+from algosdk.future import transaction
+
+from deposit.account import Account
+from deposit.operations import getSupplyTxns
+from deposit.templates import TemplateCache
+
+APP_ID = 1234
+APP_GLOBAL_STATE = {
+    b"token_a_key": 11,
+    b"token_b_key": 12,
+    b"pool_token_key": 13,
+}
+SUGGESTED_PARAMS = transaction.SuggestedParams(
+    fee=0,
+    first=1000,
+    last=2000,
+    gh=b64encode(bytes(range(32))).decode(),
+    gen="sandnet-v1",
+    min_fee=1000,
+)
+
+
+def sdkPath(supplier: Account, qA: int, qB: int) -> bytes:
+    txns = getSupplyTxns(
+        APP_ID, APP_GLOBAL_STATE, qA, qB, supplier.getAddress(), SUGGESTED_PARAMS
+    )
+    transaction.assign_group_id(txns)
+    signed = [txn.sign(supplier.getPrivateKey()) for txn in txns]
+    return b"".join(b64decode(encoding.msgpack_encode(s)) for s in signed)
+
+
+def templatePath(cache: TemplateCache, supplier: Account, qA: int, qB: int) -> bytes:
+    signed, _ = cache.supply(
+        APP_ID, APP_GLOBAL_STATE, qA, qB, supplier, SUGGESTED_PARAMS
+    )
+    return b"".join(signed)
+
+
+def main(n: int = 2000) -> None:
+    supplier = Account(account.generate_account()[0])
+    cache = TemplateCache()
+
+    assert sdkPath(supplier, 500_000, 7) == templatePath(cache, supplier, 500_000, 7)
+
+    sdk = timeit(lambda: sdkPath(supplier, 500_000, 7), number=n) / n
+    template = timeit(lambda: templatePath(cache, supplier, 500_000, 7), number=n) / n
+    print(f"sdk      {sdk * 1e6:9.1f} us/group")
+    print(f"template {template * 1e6:9.1f} us/group ({sdk / template:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Request latency: SDK AlgodClient (a new connection per request) vs.
+PooledAlgodClient (keep-alive connections), against a local stand-in node.
+
+    python -m benchmarks.transport
+"""
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from algosdk.v2client.algod import AlgodClient
+
+from deposit.standin import serve
+from deposit.transport import PooledAlgodClient
+
+TOKEN = "a" * 64
+
+
+def measure(client: AlgodClient, n: int, threads: int) -> float:
+    start = perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda _: client.suggested_params(), range(n)))
+    return (perf_counter() - start) / n
+
+
+def main(n: int = 2000) -> None:
+    server, address = serve()
+    sdk = AlgodClient(TOKEN, address)
+    pooled = PooledAlgodClient(TOKEN, address)
+
+    assert sdk.suggested_params().gh == pooled.suggested_params().gh
+
+    for threads in (1, 8):
+        before = measure(sdk, n, threads)
+        after = measure(pooled, n, threads)
+        print(f"threads={threads}")
+        print(f"  AlgodClient       {before * 1e6:9.1f} us/request")
+        print(f"  PooledAlgodClient {after * 1e6:9.1f} us/request ({before / after:.1f}x)")
+    print(f"connections opened by the pool: {pooled.pool.created}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Group pre-validation: vectorized batch vs. one group at a time.
+
+Builds random supply, withdraw and swap groups, some malformed, against
+random pool states (including reserves near the uint64 limit), checks that
+validateBatch and validateGroup agree on every group, and times both.
+Runs offline; no algod node is needed.
+
+    python -m benchmarks.validator [groups]
+"""
+
+import random
+import sys
+import time
+from base64 import b64encode
+
+import numpy as np
+from algosdk import account, encoding
+from algosdk.future import transaction
+
+from deposit.model import UINT64_MAX, ContractReject
+from deposit.operations import getSupplyTxns, getSwapTxns, getWithdrawTxns
+from deposit.validator import PoolState, swapAccepted, validateBatch, validateGroup
+
+SUGGESTED_PARAMS = transaction.SuggestedParams(
+    fee=1000,
+    first=1000,
+    last=2000,
+    gh=b64encode(bytes(range(32))).decode(),
+    gen="sandnet-v1",
+    flat_fee=True,
+)
+TOKEN_A, TOKEN_B, POOL_TOKEN = 11, 12, 13
+
+
+def randomAmount(rng: random.Random) -> int:
+    # mostly plausible trades, with a tail of zero and near-overflow amounts
+    if rng.random() < 0.8:
+        return rng.randrange(1000, 10 ** 6)
+    return rng.choice(
+        [
+            0,
+            rng.randrange(1, 1000),
+            rng.randrange(1, 10 ** 6),
+            rng.randrange(1, 10 ** 12),
+            rng.randrange(1, 2 ** 63),
+        ]
+    )
+
+
+def randomPool(rng: random.Random, appID: int) -> PoolState:
+    creator = account.generate_account()[1]
+    if rng.random() < 0.8:
+        # a healthy pool; the swap math needs reserveA * reserveB < 2 ** 64
+        return PoolState(
+            appID,
+            {
+                b"creator_key": encoding.decode_address(creator),
+                b"token_a_key": TOKEN_A,
+                b"token_b_key": TOKEN_B,
+                b"pool_token_key": POOL_TOKEN,
+                b"fee_bps_key": 30,
+                b"min_increment_key": 1000,
+                b"pool_tokens_outstanding_key": rng.randrange(10 ** 6, 10 ** 12),
+            },
+            {
+                TOKEN_A: rng.randrange(10 ** 7, 10 ** 9),
+                TOKEN_B: rng.randrange(10 ** 7, 10 ** 9),
+            },
+        )
+
+    state = {
+        b"creator_key": encoding.decode_address(creator),
+        b"token_a_key": TOKEN_A,
+        b"token_b_key": TOKEN_B,
+        b"pool_token_key": POOL_TOKEN,
+        b"fee_bps_key": rng.choice([0, 30, 100, 10_000]),
+        b"min_increment_key": rng.choice([0, 1000]),
+        b"pool_tokens_outstanding_key": rng.choice([0, randomAmount(rng), 10 ** 13 - 1]),
+    }
+    balances = {
+        TOKEN_A: rng.choice([0, randomAmount(rng), UINT64_MAX - rng.randrange(10)]),
+        TOKEN_B: rng.choice([0, randomAmount(rng)]),
+    }
+    return PoolState(appID, state, balances)
+
+
+def randomGroup(rng: random.Random, pool: PoolState, sender: str):
+    state = {
+        b"token_a_key": pool.tokenA,
+        b"token_b_key": pool.tokenB,
+        b"pool_token_key": pool.poolToken,
+    }
+    kind = rng.random()
+    if kind < 0.4:
+        txns = getSwapTxns(
+            pool.appID,
+            state,
+            rng.choice([TOKEN_A, TOKEN_B]),
+            randomAmount(rng),
+            sender,
+            SUGGESTED_PARAMS,
+        )
+    elif kind < 0.7:
+        txns = getSupplyTxns(
+            pool.appID,
+            state,
+            randomAmount(rng),
+            randomAmount(rng),
+            sender,
+            SUGGESTED_PARAMS,
+        )
+    else:
+        txns = getWithdrawTxns(
+            pool.appID, state, randomAmount(rng), sender, SUGGESTED_PARAMS
+        )
+
+    corruption = rng.random()
+    if corruption < 0.03 and len(txns) > 3:
+        txns[1], txns[2] = txns[2], txns[1]
+    elif corruption < 0.06:
+        txns[-1].foreign_assets = txns[-1].foreign_assets[:1]
+    elif corruption < 0.09:
+        txns.pop(0)
+        txns.insert(-1, txns.pop(0))
+    return txns
+
+
+def main(n: int = 20_000) -> None:
+    rng = random.Random(1)
+    pools = {appID: randomPool(rng, appID) for appID in range(100, 150)}
+    senders = [account.generate_account()[1] for _ in range(16)]
+    groups = [
+        randomGroup(rng, rng.choice(list(pools.values())), rng.choice(senders))
+        for _ in range(n)
+    ]
+
+    start = time.perf_counter()
+    mask, _ = validateBatch(groups, pools, explain=False)
+    batchTime = time.perf_counter() - start
+    ok, reasons = validateBatch(groups, pools)
+
+    start = time.perf_counter()
+    scalar = [validateGroup(group, pools) for group in groups]
+    scalarTime = time.perf_counter() - start
+
+    mismatches = sum(
+        1
+        for g in range(n)
+        if bool(ok[g]) != (scalar[g] is None)
+        or reasons[g] != scalar[g]
+        or mask[g] != ok[g]
+    )
+    print("groups           {:>10}".format(n))
+    print("accepted         {:>10}".format(int(ok.sum())))
+    print("mismatches       {:>10}".format(mismatches))
+    print("batch            {:>10.2f} us/group".format(batchTime / n * 1e6))
+    print("one at a time    {:>10.2f} us/group".format(scalarTime / n * 1e6))
+
+    # amounts alone, before any transaction is built
+    pool = next(p for p in pools.values() if p.model.outstanding)
+    amounts = np.array([randomAmount(rng) for _ in range(n)], dtype=np.uint64)
+    givenIsA = np.arange(n) % 2 == 0
+    start = time.perf_counter()
+    accepted = swapAccepted(
+        amounts,
+        givenIsA,
+        pool.model.reserveA,
+        pool.model.reserveB,
+        pool.model.outstanding,
+        pool.model.feeBps,
+    )
+    arrayTime = time.perf_counter() - start
+
+    def scalarSwap(i: int) -> bool:
+        try:
+            pool.model.copy().swap(bool(givenIsA[i]), int(amounts[i]))
+            return True
+        except ContractReject:
+            return False
+
+    arrayMismatches = sum(1 for i in range(n) if accepted[i] != scalarSwap(i))
+    mismatches += arrayMismatches
+    print("swap amounts     {:>10.3f} us/swap".format(arrayTime / n * 1e6))
+    print("amount mismatches{:>10}".format(arrayMismatches))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""LP position valuation: vectorized limbs vs. Python integers.
+
+Values a random population of pool-token holders against a few pool states
+(including reserves near the uint64 limit and an outstanding supply close
+to 2 ** 63), checks every amount against PoolModel.withdraw on a sample and
+against exact Python arithmetic on all holders, then times a large run.
+Runs offline; no algod node is needed.
+
+    python -m benchmarks.valuation [holders]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from deposit.model import UINT64_MAX, ContractReject, PoolModel
+from deposit.valuation import withdrawable
+
+POOLS = [
+    (10 ** 9, 3 * 10 ** 8, 10 ** 13 - 12345),
+    (UINT64_MAX - 7, 10 ** 6, 10 ** 12 + 3),
+    (987_654_321, UINT64_MAX // 3, 2 ** 62 + 17),
+    (2 ** 63 + 5, 2 ** 40, 2 ** 63 - 1),
+]
+
+
+def holders(rng: np.random.Generator, n: int, outstanding: int) -> np.ndarray:
+    balances = rng.integers(0, min(outstanding, 10 ** 9), n, dtype=np.uint64)
+    whales = rng.random(n) < 0.01
+    balances[whales] = rng.integers(0, outstanding, int(whales.sum()), dtype=np.uint64)
+    balances[:3] = [0, 1, outstanding]
+    return balances
+
+
+def main(n: int = 1_000_000) -> None:
+    rng = np.random.default_rng(1)
+    sample = random.Random(1)
+    mismatches = 0
+    for reserveA, reserveB, outstanding in POOLS:
+        balances = holders(rng, n, outstanding)
+        start = time.perf_counter()
+        outA, outB, ok = withdrawable(balances, reserveA, reserveB, outstanding)
+        elapsed = time.perf_counter() - start
+
+        exactA = [reserveA * b // outstanding for b in balances.tolist()]
+        exactB = [reserveB * b // outstanding for b in balances.tolist()]
+        mismatches += int((outA != np.array(exactA, dtype=np.uint64)).sum())
+        mismatches += int((outB != np.array(exactB, dtype=np.uint64)).sum())
+
+        model = PoolModel(30, 1000, reserveA, reserveB, outstanding)
+        for i in sample.sample(range(n), 2000) + [0, 1, 2]:
+            try:
+                expected = model.copy().withdraw(int(balances[i]))
+            except ContractReject:
+                expected = None
+            got = (int(outA[i]), int(outB[i])) if ok[i] else None
+            mismatches += expected != got
+
+        print(
+            "outstanding {:>20}  {:>7.1f} ms  {:>7} accepted".format(
+                outstanding, elapsed * 1e3, int(ok.sum())
+            )
+        )
+    print("mismatches  {:>20}".format(mismatches))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
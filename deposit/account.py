@@ -1,12 +1,27 @@
-from algosdk import account, mnemonic
+from base64 import b64decode, b64encode
+from typing import List, Optional
+
+from algosdk import constants, encoding, mnemonic
+from algosdk.future import transaction
+from nacl.signing import SigningKey
 
 
 class Account:
-    """Represents a private key and address for an Algorand account"""
+    """Represents a private key and address for an Algorand account
+
+    The decoded seed, public key and signing key are derived once, so signing
+    does not re-decode the base64 private key each time.
+    """
+
+    __slots__ = ("sk", "addr", "seed", "publicKey", "signingKey", "_mnemonic")
 
     def __init__(self, privateKey: str) -> None:
         self.sk = privateKey
-        self.addr = account.address_from_private_key(privateKey)
+        self.seed: bytes = b64decode(privateKey)[: constants.key_len_bytes]
+        self.signingKey = SigningKey(self.seed)
+        self.publicKey: bytes = bytes(self.signingKey.verify_key)
+        self.addr = encoding.encode_address(self.publicKey)
+        self._mnemonic: Optional[str] = None
 
     def getAddress(self) -> str:
         return self.addr
@@ -15,8 +30,28 @@ class Account:
         return self.sk
 
     def getMnemonic(self) -> str:
-        return mnemonic.from_private_key(self.sk)
+        if self._mnemonic is None:
+            self._mnemonic = mnemonic.from_private_key(self.sk)
+        return self._mnemonic
+
+    def signBytes(self, encodedTxn: bytes) -> bytes:
+        """Signature over a canonical msgpack transaction encoding."""
+        return self.signingKey.sign(constants.txid_prefix + encodedTxn).signature
+
+    def signMany(self, encodedTxns: List[bytes]) -> List[bytes]:
+        """Signatures over a batch of canonical msgpack transaction encodings."""
+        sign = self.signingKey.sign
+        prefix = constants.txid_prefix
+        return [sign(prefix + e).signature for e in encodedTxns]
+
+    def sign(self, txn: transaction.Transaction) -> transaction.SignedTransaction:
+        """Equivalent to ``txn.sign(self.getPrivateKey())``."""
+        sig = self.signBytes(b64decode(encoding.msgpack_encode(txn)))
+        authorizingAddress = None if txn.sender == self.addr else self.addr
+        return transaction.SignedTransaction(
+            txn, b64encode(sig).decode(), authorizingAddress
+        )
 
     @classmethod
     def FromMnemonic(cls, m: str) -> "Account":
-        return cls(mnemonic.to_private_key(m))
\ No newline at end of file
+        return cls(mnemonic.to_private_key(m))
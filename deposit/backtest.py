@@ -0,0 +1,274 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+
+import numpy as np
+
+from .model import (
+    POOL_TOKEN_DEFAULT_AMOUNT,
+    checkedAdd,
+    isqrt,
+    checkedMul,
+    swapOutputBatch,
+    wideRatio,
+)
+
+SWAP_A = 0
+SWAP_B = 1
+SUPPLY = 2
+WITHDRAW = 3
+
+PPM = 1_000_000
+
+
+class TradeStream:
+    """A sequence of pool operations to replay.
+
+    Args:
+        kinds: one of SWAP_A, SWAP_B, SUPPLY, WITHDRAW per trade.
+        amountA: swap input amount for swaps, token A supplied for SUPPLY.
+        amountB: token B supplied for SUPPLY.
+        withdrawPpm: for WITHDRAW, the share (in parts per million) of the
+            other LPs' pool tokens being returned. Expressing withdrawals as a
+            share keeps the same stream meaningful for every parameter set,
+            since minted pool token amounts differ between them.
+    """
+
+    def __init__(
+        self,
+        kinds: np.ndarray,
+        amountA: np.ndarray,
+        amountB: Optional[np.ndarray] = None,
+        withdrawPpm: Optional[np.ndarray] = None,
+    ) -> None:
+        n = len(kinds)
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+        self.amountA = np.asarray(amountA, dtype=np.uint64)
+        self.amountB = (
+            np.zeros(n, dtype=np.uint64)
+            if amountB is None
+            else np.asarray(amountB, dtype=np.uint64)
+        )
+        self.withdrawPpm = (
+            np.zeros(n, dtype=np.uint64)
+            if withdrawPpm is None
+            else np.asarray(withdrawPpm, dtype=np.uint64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+
+def syntheticTradeStream(
+    n: int,
+    meanSwap: float = 10_000,
+    supplyShare: float = 0.02,
+    withdrawShare: float = 0.02,
+    priceRatio: float = 1.0,
+    seed: Optional[int] = None,
+) -> TradeStream:
+    """Random trade flow: lognormal swap sizes in either direction, plus
+    occasional supplies near the price ratio and partial withdrawals."""
+    rng = np.random.default_rng(seed)
+    kinds = rng.choice(
+        [SWAP_A, SWAP_B, SUPPLY, WITHDRAW],
+        size=n,
+        p=[
+            (1 - supplyShare - withdrawShare) / 2,
+            (1 - supplyShare - withdrawShare) / 2,
+            supplyShare,
+            withdrawShare,
+        ],
+    )
+    sizes = rng.lognormal(np.log(meanSwap), 1.0, size=n)
+    amountA = np.maximum(sizes, 1).astype(np.uint64)
+    amountB = np.maximum(sizes * priceRatio * rng.uniform(0.9, 1.1, n), 1).astype(
+        np.uint64
+    )
+    withdrawPpm = rng.integers(1, PPM // 10, size=n, dtype=np.uint64)
+    return TradeStream(kinds, amountA, amountB, withdrawPpm)
+
+
+def parameterGrid(
+    feeBps: Sequence[int], minIncrement: Sequence[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Cartesian product of fee tiers and min increments as flat arrays."""
+    fees, increments = np.meshgrid(
+        np.asarray(feeBps, dtype=np.uint64),
+        np.asarray(minIncrement, dtype=np.uint64),
+        indexing="ij",
+    )
+    return fees.ravel(), increments.ravel()
+
+
+def runBacktest(
+    stream: TradeStream,
+    feeBps: np.ndarray,
+    minIncrement: np.ndarray,
+    initialA: int,
+    initialB: int,
+) -> Dict[str, np.ndarray]:
+    """Replay ``stream`` against one pool per parameter set.
+
+    Trades are applied in order; each step is evaluated for all parameter
+    sets at once with the same integer math as the approval program. The
+    pool is seeded with (initialA, initialB) by a tracked LP who holds its
+    position to the end.
+
+    Returns:
+        A dict of per-parameter-set arrays: final reserves and outstanding
+        pool tokens, the tracked LP's final withdrawable value and HODL value
+        (both in token B at the final pool price), lpReturn relative to HODL,
+        mean swap slippage in bps, collected fees, and rejected counts per
+        operation kind.
+    """
+    feeBps = np.asarray(feeBps, dtype=np.uint64)
+    minIncrement = np.asarray(minIncrement, dtype=np.uint64)
+    p = len(feeBps)
+
+    seedOk = (initialA >= minIncrement) & (initialB >= minIncrement)
+    product, mulOk = checkedMul(initialA, initialB)
+    seedOk &= mulOk
+    lpTokens = np.where(seedOk, isqrt(np.where(mulOk, product, 0)), 0).astype(np.uint64)
+    resA = np.where(seedOk, np.uint64(initialA), np.uint64(0))
+    resB = np.where(seedOk, np.uint64(initialB), np.uint64(0))
+    outstanding = lpTokens.copy()
+
+    rejected = {kind: np.zeros(p, dtype=np.int64) for kind in (SWAP_A, SWAP_B, SUPPLY, WITHDRAW)}
+    slippage = np.zeros(p, dtype=np.float64)
+    swaps = np.zeros(p, dtype=np.int64)
+    fees = np.zeros(p, dtype=np.float64)
+
+    for kind, qA, qB, ppm in zip(
+        stream.kinds, stream.amountA, stream.amountB, stream.withdrawPpm
+    ):
+        if kind == SWAP_A or kind == SWAP_B:
+            given, other = (resA, resB) if kind == SWAP_A else (resB, resA)
+            out, ok = swapOutputBatch(qA, given, other, feeBps)
+            ok &= seedOk & (outstanding > 0)
+            newGiven = np.where(ok, given + qA, given)
+            newOther = np.where(ok, other - out, other)
+            if kind == SWAP_A:
+                resA, resB = newGiven, newOther
+            else:
+                resB, resA = newGiven, newOther
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mid = other.astype(np.float64) / given.astype(np.float64)
+                executed = out.astype(np.float64) / float(qA)
+                slip = 1.0 - executed / mid
+            slippage += np.where(ok & np.isfinite(slip), slip, 0.0)
+            fees += np.where(ok, float(qA) * feeBps.astype(np.float64) / 10_000, 0.0) * (
+                mid if kind == SWAP_A else 1.0
+            )
+            swaps += ok
+            rejected[kind] += ~ok
+
+        elif kind == SUPPLY:
+            ok = seedOk & (qA > 0) & (qB > 0) & (qA >= minIncrement) & (qB >= minIncrement)
+            ok &= checkedAdd(resA, qA)[1] & checkedAdd(resB, qB)[1]
+
+            # no liquidity yet: mint sqrt(qA * qB) and take everything
+            empty = (resA == 0) | (resB == 0)
+            product, productOk = checkedMul(qA, qB)
+            initialMint = isqrt(np.where(productOk, product, 0))
+            # keep all of A, matching B at the pool ratio
+            needB, okB = wideRatio(qA, resB, resA)
+            takeA = okB & (needB > 0) & (qB >= needB)
+            mintA, okMintA = wideRatio(outstanding, qA, resA)
+            # otherwise keep all of B, matching A
+            needA, okA = wideRatio(qB, resA, resB)
+            takeB = ~takeA & okA & (needA > 0) & (qA >= needA)
+            mintB, okMintB = wideRatio(outstanding, qB, resB)
+
+            ok &= np.where(
+                empty, productOk, okB & ((takeA & okMintA) | (takeB & okMintB))
+            )
+            minted = np.where(empty, initialMint, np.where(takeA, mintA, mintB))
+            # the app must hold pool tokens even if it would mint none
+            ok &= outstanding < np.uint64(POOL_TOKEN_DEFAULT_AMOUNT)
+            ok &= minted <= np.uint64(POOL_TOKEN_DEFAULT_AMOUNT) - outstanding
+
+            addA = np.where(empty | takeA, qA, needA)
+            addB = np.where(empty | takeB, qB, needB)
+            resA = np.where(ok, resA + addA, resA)
+            resB = np.where(ok, resB + addB, resB)
+            outstanding = np.where(ok, outstanding + minted, outstanding)
+            rejected[SUPPLY] += ~ok
+
+        elif kind == WITHDRAW:
+            others = outstanding - lpTokens
+            amount, _ = wideRatio(others, ppm, PPM)
+            outA, okA = wideRatio(resA, amount, outstanding)
+            outB, okB = wideRatio(resB, amount, outstanding)
+            ok = (
+                seedOk
+                & (resA > 0)
+                & (resB > 0)
+                & (amount > 0)
+                & okA
+                & okB
+                & (outA > 0)
+                & (outB > 0)
+            )
+            resA = np.where(ok, resA - outA, resA)
+            resB = np.where(ok, resB - outB, resB)
+            outstanding = np.where(ok, outstanding - amount, outstanding)
+            rejected[WITHDRAW] += ~ok
+
+    lpA, _ = wideRatio(resA, lpTokens, np.where(outstanding > 0, outstanding, 1))
+    lpB, _ = wideRatio(resB, lpTokens, np.where(outstanding > 0, outstanding, 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = resB.astype(np.float64) / resA.astype(np.float64)
+        lpValue = lpB.astype(np.float64) + lpA.astype(np.float64) * price
+        hodlValue = initialB + initialA * price
+        lpReturn = lpValue / hodlValue - 1.0
+        meanSlippageBps = np.where(swaps > 0, slippage / swaps * 10_000, 0.0)
+
+    return {
+        "feeBps": feeBps,
+        "minIncrement": minIncrement,
+        "valid": seedOk,
+        "reserveA": resA,
+        "reserveB": resB,
+        "poolTokensOutstanding": outstanding,
+        "lpValue": lpValue,
+        "hodlValue": hodlValue,
+        "lpReturn": lpReturn,
+        "meanSlippageBps": meanSlippageBps,
+        "feesCollectedB": fees,
+        "swaps": swaps,
+        "rejectedSwaps": rejected[SWAP_A] + rejected[SWAP_B],
+        "rejectedSupplies": rejected[SUPPLY],
+        "rejectedWithdrawals": rejected[WITHDRAW],
+    }
+
+
+def _runChunk(args: tuple) -> Dict[str, np.ndarray]:
+    return runBacktest(*args)
+
+
+def runBacktestParallel(
+    stream: TradeStream,
+    feeBps: np.ndarray,
+    minIncrement: np.ndarray,
+    initialA: int,
+    initialB: int,
+    workers: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """runBacktest with the parameter grid split across processes."""
+    workers = workers or os.cpu_count() or 1
+    chunks = [
+        c for c in np.array_split(np.arange(len(feeBps)), workers) if len(c) > 0
+    ]
+    if len(chunks) <= 1:
+        return runBacktest(stream, feeBps, minIncrement, initialA, initialB)
+
+    jobs = [
+        (stream, np.asarray(feeBps)[c], np.asarray(minIncrement)[c], initialA, initialB)
+        for c in chunks
+    ]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        results: List[Dict[str, np.ndarray]] = list(executor.map(_runChunk, jobs))
+
+    return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
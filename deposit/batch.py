@@ -0,0 +1,608 @@
+"""Batch runner: executes a JSONL file of pool operations and writes one JSONL
+result per operation.
+
+    python -m deposit.batch ops.jsonl --accounts accounts.json --results out.jsonl
+
+Each input line is an object with an "id", an "op" and the op's fields:
+
+    {"id": "p1", "op": "create", "signer": "alice", "tokenA": 1, "tokenB": 2,
+     "feeBps": 30, "minIncrement": 1000}
+    {"id": "o1", "op": "optin", "signer": "bob", "app": "@p1"}
+    {"id": "s1", "op": "supply", "signer": "bob", "app": "@p1", "qA": 10, "qB": 20}
+    {"id": "t1", "op": "swap", "signer": "bob", "app": 12, "token": "A", "amount": 5}
+    {"id": "z1", "op": "zap", "signer": "bob", "app": 12, "token": "B", "amount": 8}
+    {"id": "w1", "op": "withdraw", "signer": "bob", "app": 12, "amount": 3,
+     "after": "s1"}
+    {"id": "c1", "op": "close", "signer": "alice", "app": "@p1"}
+
+"signer" names an entry of the --accounts file, a JSON object mapping names to
+mnemonics, and "optin" opts the signer in to the app's pool token. An app of
+"@id" is the app made by the create op "id", and "after" lists ops that must
+finish first; the reader waits for those before going on. Everything else
+runs concurrently through a SubmissionPipeline, so results are written in
+completion order.
+
+Rerunning the same command resumes. Ops that already have a result are
+skipped (failed ones too, unless --retry-failed is given). Each signed group
+is checkpointed before it is sent, so a group that was in flight when the run
+died is looked up on the node or re-sent exactly as signed rather than built
+(and possibly executed) a second time. A create sends two groups, the app
+create and then the funding and setup call, and each is checkpointed the
+same way. With --journal every group is also
+recorded in a SQLite journal (deposit.journal).
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import msgpack
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+from .operations import (
+    getContracts,
+    getCreateAppTxn,
+    getSetupTxns,
+    getSupplyTxns,
+    getSwapTxns,
+    getWithdrawTxns,
+    getZapTxns,
+)
+from .journal import Journal
+from .pipeline import SubmissionPipeline
+from .resources import getAlgodClient
+from .submission import NonceAllocator, applyNonce, flatFeeParams
+from .utils import PendingTxnResponse, getAppGlobalState
+
+CONFIRMED = "confirmed"
+FAILED = "failed"
+# sent before a crash, expired since, and no longer known to the node
+UNKNOWN = "unknown"
+
+# what algod answers when a re-sent group is already in the ledger
+ALREADY_IN_LEDGER = "already in ledger"
+
+TxnBuilder = Callable[
+    [dict, dict, str, transaction.SuggestedParams], List[transaction.Transaction]
+]
+
+
+def _createTxns(op, state, sender, sp):
+    approval, clear = op["programs"]
+    return [
+        getCreateAppTxn(
+            sender,
+            approval,
+            clear,
+            op["tokenA"],
+            op["tokenB"],
+            op.get("feeBps", 30),
+            op.get("minIncrement", 1000),
+            sp,
+        )
+    ]
+
+
+def _setupTxns(op, state, sender, sp):
+    return getSetupTxns(op["app"], sender, op["tokenA"], op["tokenB"], sp)
+
+
+def _supplyTxns(op, state, sender, sp):
+    return getSupplyTxns(op["app"], state, op["qA"], op["qB"], sender, sp)
+
+
+def _token(op, state):
+    token = op["token"]
+    if token in ("A", "B"):
+        token = state[b"token_a_key" if token == "A" else b"token_b_key"]
+    return token
+
+
+def _swapTxns(op, state, sender, sp):
+    return getSwapTxns(op["app"], state, _token(op, state), op["amount"], sender, sp)
+
+
+def _zapTxns(op, state, sender, sp):
+    return getZapTxns(op["app"], state, _token(op, state), op["amount"], sender, sp)
+
+
+def _withdrawTxns(op, state, sender, sp):
+    return getWithdrawTxns(op["app"], state, op["amount"], sender, sp)
+
+
+def _optInTxns(op, state, sender, sp):
+    return [transaction.AssetOptInTxn(sender, sp, state[b"pool_token_key"])]
+
+
+def _closeTxns(op, state, sender, sp):
+    return [transaction.ApplicationDeleteTxn(sender=sender, index=op["app"], sp=sp)]
+
+
+BUILDERS: Dict[str, TxnBuilder] = {
+    "create": _createTxns,
+    # the second group of a create
+    "setup": _setupTxns,
+    "supply": _supplyTxns,
+    "swap": _swapTxns,
+    "zap": _zapTxns,
+    "withdraw": _withdrawTxns,
+    "optin": _optInTxns,
+    "close": _closeTxns,
+}
+
+# builders that do not read the app's global state
+STATELESS = {"create", "setup", "close"}
+
+# fields each op must have
+REQUIRED = {
+    "create": ("signer", "tokenA", "tokenB"),
+    "supply": ("signer", "app", "qA", "qB"),
+    "swap": ("signer", "app", "token", "amount"),
+    "zap": ("signer", "app", "token", "amount"),
+    "withdraw": ("signer", "app", "amount"),
+    "optin": ("signer", "app"),
+    "close": ("signer", "app"),
+}
+
+# op fields recorded as amounts in the journal
+AMOUNTS = ("qA", "qB", "token", "amount")
+
+
+def _decodeSigned(encoded: str) -> transaction.SignedTransaction:
+    # encoding.msgpack_decode goes through the legacy transaction module,
+    # which cannot decode application calls
+    return transaction.SignedTransaction.undictify(
+        msgpack.unpackb(base64.b64decode(encoded), raw=False)
+    )
+
+
+def readOps(lines: Iterable[str]) -> Iterator[dict]:
+    """Parse JSONL ops, skipping blank lines. An op without an "id" is
+    identified by its line number."""
+    for lineNo, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            op = json.loads(line)
+        except ValueError as e:
+            raise ValueError("line {}: {}".format(lineNo, e)) from None
+        op["id"] = str(op.get("id", lineNo))
+        yield op
+
+
+def loadAccounts(path: str) -> Dict[str, Account]:
+    with open(path) as f:
+        return {name: Account.FromMnemonic(m) for name, m in json.load(f).items()}
+
+
+def _readJsonl(path: str) -> Iterator[dict]:
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # a line cut short by a crash
+                continue
+
+
+class BatchRunner:
+    """Runs ops through a SubmissionPipeline, recording results and
+    checkpoints as JSONL (see the module docstring).
+
+    Args:
+        client: An algod client.
+        accounts: signer name -> account.
+        resultsPath: results file, appended to.
+        checkpointPath: signed-group checkpoint file, removed once every op
+            of a run has a result; defaults to ``resultsPath + ".checkpoint"``.
+        concurrency: groups in flight at once.
+        rate: maximum groups sent per second.
+        maxAttempts: send attempts per group.
+        retryFailed: run ops again whose earlier result is a failure.
+        journal: optional Journal the pipeline records every group in.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        accounts: Dict[str, Account],
+        resultsPath: str,
+        checkpointPath: Optional[str] = None,
+        concurrency: int = 8,
+        rate: float = 20.0,
+        maxAttempts: int = 5,
+        retryFailed: bool = False,
+        journal: Optional[Journal] = None,
+    ) -> None:
+        self.client = client
+        self.accounts = accounts
+        self.resultsPath = resultsPath
+        self.checkpointPath = checkpointPath or resultsPath + ".checkpoint"
+        self.concurrency = concurrency
+        self.rate = rate
+        self.maxAttempts = maxAttempts
+        self.retryFailed = retryFailed
+        self.journal = journal
+
+        self.allocator = NonceAllocator()
+        self.lock = threading.Lock()
+        self.futures: Dict[str, Future] = {}
+        self.counts: Counter = Counter()
+        self.states: Dict[int, Any] = {}
+
+        # from earlier runs; sent groups are keyed by (op id, stage), the
+        # stage being None but for the setup group of a create
+        self.finished: Dict[str, dict] = {}
+        self.retried: set = set()
+        self.sent: Dict[Tuple[str, Optional[str]], dict] = {}
+        self.created: Dict[str, int] = {}
+
+    def _load(self) -> None:
+        for record in _readJsonl(self.resultsPath):
+            if self.retryFailed and record["status"] == FAILED:
+                self.finished.pop(record["id"], None)
+                self.retried.add(record["id"])
+            else:
+                self.finished[record["id"]] = record
+        for record in _readJsonl(self.checkpointPath):
+            if "appID" in record:
+                self.created[record["id"]] = record["appID"]
+            else:
+                self.sent[(record["id"], record.get("stage"))] = record
+
+    def _write(self, f, record: dict) -> None:
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            f.write(line)
+            f.flush()
+
+    def _resolve(self, op: dict, future: Future, record: dict) -> None:
+        record = dict(record, id=op["id"], op=op.get("op"))
+        self._write(self.results, record)
+        with self.lock:
+            self.counts[record["status"]] += 1
+        future.set_result(record)
+
+    def _fail(self, op: dict, future: Future, error: Any) -> None:
+        self._resolve(op, future, {"status": FAILED, "error": str(error)})
+
+    def _result(self, opID: str) -> dict:
+        if opID not in self.futures:
+            raise ValueError("unknown op {!r}".format(opID))
+        result = self.futures[opID].result()
+        if result["status"] != CONFIRMED:
+            raise ValueError("op {!r} {}".format(opID, result["status"]))
+        return result
+
+    def _prepare(self, op: dict) -> Tuple[dict, Account]:
+        """Wait for the op's dependencies, then resolve its app and signer."""
+        after = op.get("after", [])
+        for dependency in [after] if isinstance(after, str) else after:
+            self._result(str(dependency))
+
+        op = dict(op)
+        if isinstance(op.get("app"), str) and op["app"].startswith("@"):
+            op["app"] = self._result(op["app"][1:])["appID"]
+
+        signer = self.accounts.get(op.get("signer"))
+        if signer is None:
+            raise ValueError("unknown signer {!r}".format(op.get("signer")))
+        return op, signer
+
+    def _state(self, appID: int):
+        # token ids never change once the app is set up
+        state = self.states.get(appID)
+        if state is None:
+            state = self.states[appID] = getAppGlobalState(self.client, appID)
+        return state
+
+    def _builder(
+        self, op: dict, signer: Account, txids: List[str], stage: Optional[str]
+    ):
+        makeTxns = BUILDERS[stage or op["op"]]
+        state = self._state(op["app"]) if (stage or op["op"]) not in STATELESS else None
+        stored = self.sent.get((op["id"], stage))
+
+        def build(sp: transaction.SuggestedParams) -> List[Any]:
+            nonlocal stored
+            if stored is not None:
+                # first attempt after a crash: the group exactly as signed
+                signedTxns = [_decodeSigned(s) for s in stored["group"]]
+                stored = None
+            else:
+                txns = makeTxns(op, state, signer.getAddress(), flatFeeParams(sp))
+                applyNonce(txns, self.allocator)
+                transaction.assign_group_id(txns)
+                signedTxns = [signer.sign(txn) for txn in txns]
+                record = {
+                    "id": op["id"],
+                    "lastValid": txns[0].last_valid_round,
+                    "group": [encoding.msgpack_encode(s) for s in signedTxns],
+                }
+                if stage is not None:
+                    record["stage"] = stage
+                self._write(self.checkpoint, record)
+            txids[:] = [s.get_txid() for s in signedTxns]
+            return signedTxns
+
+        return build
+
+    def _recover(self, key: Tuple[str, Optional[str]]) -> Optional[dict]:
+        """Outcome of a group sent before a crash, or None to send it again.
+
+        A group that failed or expired is built afresh when its op is being
+        retried; one that confirmed is never sent twice.
+        """
+        stored = self.sent[key]
+        txID = _decodeSigned(stored["group"][-1]).get_txid()
+        try:
+            info = self.client.pending_transaction_info(txID)
+        except AlgodHTTPError:
+            info = {}
+        if info.get("confirmed-round"):
+            record = {
+                "status": CONFIRMED,
+                "round": info["confirmed-round"],
+                "txid": txID,
+            }
+            if info.get("application-index"):
+                record["appID"] = info["application-index"]
+            return record
+        if info.get("pool-error"):
+            record = {"status": FAILED, "error": info["pool-error"], "txid": txID}
+        elif self.client.status()["last-round"] > stored["lastValid"]:
+            record = {
+                "status": UNKNOWN,
+                "error": "sent before a restart and expired since",
+                "txid": txID,
+            }
+        else:
+            return None
+        if key[0] in self.retried:
+            del self.sent[key]
+            return None
+        return record
+
+    def _outcome(self, txids: List[str], done: Future) -> dict:
+        error = done.exception()
+        if error is None:
+            response: PendingTxnResponse = done.result()
+            record = {
+                "status": CONFIRMED,
+                "round": response.confirmedRound,
+                "txid": txids[-1],
+            }
+            if response.applicationIndex:
+                record["appID"] = response.applicationIndex
+        elif ALREADY_IN_LEDGER in str(error):
+            record = {"status": CONFIRMED, "round": None, "txid": txids[-1]}
+        else:
+            record = {"status": FAILED, "error": str(error), "txid": txids[-1]}
+        return record
+
+    def _submit(
+        self,
+        op: dict,
+        signer: Account,
+        then: Callable[[dict], Any],
+        stage: Optional[str] = None,
+    ) -> None:
+        """Send the op's group (or the given stage of a create) and pass its
+        result record to ``then``. A group checkpointed by an earlier run is
+        recovered instead of built again."""
+        key = (op["id"], stage)
+        if key in self.sent:
+            record = self._recover(key)
+            if record is not None:
+                then(record)
+                return
+
+        txids: List[str] = []
+        done = self.pipeline.submit(
+            self._builder(op, signer, txids, stage),
+            operation=stage or op["op"],
+            appID=op.get("app"),
+            amounts={k: op[k] for k in AMOUNTS if k in op},
+        )
+        done.add_done_callback(lambda done: then(self._outcome(txids, done)))
+
+    def _create(self, op: dict, signer: Account, future: Future) -> None:
+        """Create the app, then fund and set it up; the follow-up steps run
+        on the executor so they do not hold up the pipeline's threads."""
+        appID = self.created.get(op["id"])
+        if appID is not None:
+            self.executor.submit(self._setup, op, signer, future, appID)
+            return
+
+        op["programs"] = getContracts(self.client)
+        self._submit(
+            op,
+            signer,
+            lambda record: self.executor.submit(
+                self._created, op, signer, future, record
+            ),
+        )
+
+    def _created(self, op: dict, signer: Account, future: Future, record: dict):
+        try:
+            if record["status"] != CONFIRMED:
+                self._resolve(op, future, record)
+                return
+            appID = record.get("appID")
+            if appID is None:
+                # a re-send the ledger already held carries no response
+                info = self.client.pending_transaction_info(record["txid"])
+                appID = info.get("application-index")
+            if not appID:
+                raise ValueError("create {} returned no app id".format(record["txid"]))
+            self._write(self.checkpoint, {"id": op["id"], "appID": appID})
+            self._setup(op, signer, future, appID)
+        except Exception as e:
+            self._fail(op, future, e)
+
+    def _setup(self, op: dict, signer: Account, future: Future, appID: int):
+        try:
+            state = getAppGlobalState(self.client, appID)
+            if b"pool_token_key" in state:
+                self._setUp(op, future, appID, {"status": CONFIRMED})
+                return
+            self._submit(
+                dict(op, app=appID),
+                signer,
+                lambda record: self.executor.submit(
+                    self._setUp, op, future, appID, record
+                ),
+                stage="setup",
+            )
+        except Exception as e:
+            self._fail(op, future, e)
+
+    def _setUp(self, op: dict, future: Future, appID: int, record: dict) -> None:
+        try:
+            if record["status"] != CONFIRMED:
+                self._resolve(op, future, dict(record, appID=appID))
+                return
+            poolToken = getAppGlobalState(self.client, appID)[b"pool_token_key"]
+            self._resolve(
+                op,
+                future,
+                {"status": CONFIRMED, "appID": appID, "poolToken": poolToken},
+            )
+        except Exception as e:
+            self._fail(op, future, e)
+
+    def _dispatch(self, op: dict) -> None:
+        opID = op["id"]
+        if opID in self.futures:
+            print("skipping duplicate op id {!r}".format(opID), file=sys.stderr)
+            return
+
+        future: Future = Future()
+        self.futures[opID] = future
+        if opID in self.finished:
+            self.counts["skipped"] += 1
+            future.set_result(self.finished[opID])
+            return
+
+        try:
+            if op.get("op") not in REQUIRED:
+                raise ValueError("unknown op {!r}".format(op.get("op")))
+            missing = [field for field in REQUIRED[op["op"]] if field not in op]
+            if missing:
+                raise ValueError("missing {}".format(", ".join(missing)))
+            op, signer = self._prepare(op)
+
+            if op["op"] == "create":
+                self._create(op, signer, future)
+            else:
+                self._submit(
+                    op, signer, lambda record: self._resolve(op, future, record)
+                )
+        except Exception as e:
+            self._fail(op, future, e)
+
+    def run(self, ops: Iterable[dict]) -> Dict[str, int]:
+        """Execute ``ops`` and return how many ended in each status."""
+        self._load()
+        with open(self.resultsPath, "a") as self.results, open(
+            self.checkpointPath, "a"
+        ) as self.checkpoint:
+            with SubmissionPipeline(
+                self.client,
+                concurrency=self.concurrency,
+                rate=self.rate,
+                maxQueue=self.concurrency * 4,
+                maxAttempts=self.maxAttempts,
+                journal=self.journal,
+            ) as self.pipeline, ThreadPoolExecutor(self.concurrency) as self.executor:
+                for op in ops:
+                    self._dispatch(op)
+                # a create's setup is submitted once its create confirms
+                wait(list(self.futures.values()))
+
+        # every op has its result now, so the signed groups are no longer needed
+        os.remove(self.checkpointPath)
+        return dict(self.counts)
+
+
+def parseArgs(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("ops", help="JSONL file of operations, - for stdin")
+    parser.add_argument(
+        "--accounts", required=True, help="JSON file of signer name -> mnemonic"
+    )
+    parser.add_argument("--results", required=True, help="JSONL results file")
+    parser.add_argument(
+        "--checkpoint", help="checkpoint file; default: RESULTS.checkpoint"
+    )
+    parser.add_argument("--algod-address", help="default: $ALGOD_ADDRESS or sandbox")
+    parser.add_argument("--algod-token", help="default: $ALGOD_TOKEN or sandbox")
+    parser.add_argument("--concurrency", type=int, default=8, help="groups in flight")
+    parser.add_argument(
+        "--rate", type=float, default=20.0, help="max groups sent per second"
+    )
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--journal", help="SQLite journal of every group sent")
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="run ops again whose earlier result is a failure",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parseArgs(argv)
+    journal = Journal(args.journal) if args.journal else None
+    runner = BatchRunner(
+        getAlgodClient(args.algod_address, args.algod_token),
+        loadAccounts(args.accounts),
+        args.results,
+        args.checkpoint,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        maxAttempts=args.max_attempts,
+        retryFailed=args.retry_failed,
+        journal=journal,
+    )
+
+    start = time.monotonic()
+    try:
+        if args.ops == "-":
+            counts = runner.run(readOps(sys.stdin))
+        else:
+            with open(args.ops) as f:
+                counts = runner.run(readOps(f))
+    finally:
+        if journal is not None:
+            journal.close()
+    elapsed = time.monotonic() - start
+
+    done = sum(n for status, n in counts.items() if status != "skipped")
+    print(
+        "{} ops in {:.1f}s ({:.1f}/s): {}".format(
+            done,
+            elapsed,
+            done / elapsed if elapsed > 0 else 0.0,
+            ", ".join("{} {}".format(n, s) for s, n in sorted(counts.items())),
+        ),
+        file=sys.stderr,
+    )
+    return 1 if counts.get(FAILED) or counts.get(UNKNOWN) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
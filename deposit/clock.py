@@ -0,0 +1,210 @@
+import threading
+import time
+from typing import Optional, Tuple
+
+import msgpack
+from algosdk.v2client.algod import AlgodClient
+
+# rounds filled in one by one when the clock falls behind; beyond this only
+# the newest round is recorded
+MAX_BACKFILL = 16
+
+
+class RoundRing:
+    """Fixed-capacity ring of (round, timestamp) pairs in increasing round order."""
+
+    __slots__ = ("capacity", "rounds", "timestamps", "start", "size")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.rounds = [0] * capacity
+        self.timestamps = [0] * capacity
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _at(self, i: int) -> int:
+        return (self.start + i) % self.capacity
+
+    def append(self, round: int, timestamp: int) -> None:
+        if self.size and round <= self.rounds[self._at(self.size - 1)]:
+            return
+        if self.size < self.capacity:
+            index = self._at(self.size)
+            self.size += 1
+        else:
+            index = self.start
+            self.start = self._at(1)
+        self.rounds[index] = round
+        self.timestamps[index] = timestamp
+
+    def last(self) -> Optional[Tuple[int, int]]:
+        if self.size == 0:
+            return None
+        index = self._at(self.size - 1)
+        return self.rounds[index], self.timestamps[index]
+
+    def _search(self, values, target: int) -> int:
+        """Number of entries whose value is <= target."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[self._at(mid)] <= target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def timestamp(self, round: int) -> Optional[int]:
+        i = self._search(self.rounds, round)
+        if i == 0 or self.rounds[self._at(i - 1)] != round:
+            return None
+        return self.timestamps[self._at(i - 1)]
+
+    def roundAt(self, timestamp: int) -> Optional[int]:
+        i = self._search(self.timestamps, timestamp)
+        if i == 0:
+            return None
+        return self.rounds[self._at(i - 1)]
+
+
+class RoundClock:
+    """Follows the chain tip from one background thread.
+
+    The thread blocks on ``status_after_block`` and records each new round's
+    block timestamp in a ring buffer, so current-round, timestamp and
+    round-at-time lookups are answered from memory, and any number of
+    threads can wait for a round without polling algod themselves.
+
+    Args:
+        client: An algod client.
+        capacity: number of recent rounds kept.
+        exact: read each round's timestamp from its block header; otherwise
+            estimate it from the status ``time-since-last-round``, which
+            saves a block fetch per round.
+        retryDelay: seconds to wait after a failed status call.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        capacity: int = 4096,
+        exact: bool = True,
+        retryDelay: float = 1.0,
+    ) -> None:
+        self.client = client
+        self.exact = exact
+        self.retryDelay = retryDelay
+        self.ring = RoundRing(capacity)
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.error: Optional[Exception] = None
+
+    def start(self) -> "RoundClock":
+        if self.thread is None:
+            # each thread gets its own event, so one that outlives stop()
+            # still exits after a restart
+            self.stopped = threading.Event()
+            self._record(self.client.status())
+            self.thread = threading.Thread(
+                target=self._run, args=(self.stopped,), daemon=True
+            )
+            self.thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop following. The thread exits after its current status call;
+        wait up to ``timeout`` seconds for it."""
+        self.stopped.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def __enter__(self) -> "RoundClock":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def _blockTimestamp(self, round: int) -> int:
+        block = msgpack.unpackb(
+            self.client.block_info(round, response_format="msgpack"), raw=False
+        )
+        return block["block"]["ts"]
+
+    def _record(self, status) -> None:
+        lastRound = status["last-round"]
+        if self.exact:
+            last = self.ring.last()
+            first = lastRound
+            if last is not None and lastRound - last[0] <= MAX_BACKFILL:
+                first = last[0] + 1
+            entries = [(r, self._blockTimestamp(r)) for r in range(first, lastRound + 1)]
+        else:
+            sinceLast = status.get("time-since-last-round", 0) / 1e9
+            entries = [(lastRound, int(time.time() - sinceLast))]
+
+        with self.condition:
+            for round, timestamp in entries:
+                self.ring.append(round, timestamp)
+            self.condition.notify_all()
+
+    def _run(self, stopped: threading.Event) -> None:
+        while not stopped.is_set():
+            try:
+                status = self.client.status_after_block(self.currentRound())
+                if stopped.is_set():
+                    return
+                self._record(status)
+                self.error = None
+            except Exception as e:
+                self.error = e
+                stopped.wait(self.retryDelay)
+
+    def currentRound(self) -> int:
+        last = self.ring.last()
+        if last is None:
+            raise RuntimeError("RoundClock has not been started")
+        return last[0]
+
+    def last(self) -> Tuple[int, int]:
+        """The latest (round, timestamp)."""
+        last = self.ring.last()
+        if last is None:
+            raise RuntimeError("RoundClock has not been started")
+        return last
+
+    def timestamp(self, round: Optional[int] = None) -> Optional[int]:
+        """Block timestamp of ``round`` (default: latest); None if not in the buffer."""
+        with self.condition:
+            if round is None:
+                return self.last()[1]
+            return self.ring.timestamp(round)
+
+    def roundAt(self, timestamp: int) -> Optional[int]:
+        """Latest buffered round whose block timestamp is <= ``timestamp``."""
+        with self.condition:
+            return self.ring.roundAt(timestamp)
+
+    def waitForRound(self, round: int, timeout: Optional[float] = None) -> int:
+        """Block until ``round`` is reached; return the current round.
+
+        Raises:
+            TimeoutError: if ``timeout`` seconds pass first.
+        """
+        with self.condition:
+            reached = self.condition.wait_for(
+                lambda: self.stopped.is_set() or self.currentRound() >= round, timeout
+            )
+            if not reached or self.currentRound() < round:
+                raise TimeoutError(
+                    "Round {} not reached, current round {}".format(
+                        round, self.currentRound()
+                    )
+                )
+            return self.currentRound()
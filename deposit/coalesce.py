@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from algosdk.v2client.algod import AlgodClient
+
+# reads that are merged and cached; everything else is passed straight through
+COALESCED_METHODS = ("account_info", "application_info", "asset_info")
+COALESCED_PATHS = ("/accounts/", "/applications/", "/assets/")
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time across threads; concurrent
+    callers with the same key wait for it and share its result or error."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.calls: Dict[Hashable, _Call] = dict()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared), where shared is True if another caller
+        made the request."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result, False
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop."""
+
+    def __init__(self) -> None:
+        self.calls: Dict[Hashable, "asyncio.Future[Any]"] = dict()
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        future = self.calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # retrieve it so an unawaited failure is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self.calls[key]
+        return result, False
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def requestKey(name: str, args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    return (name, _freeze(args), _freeze(kwargs))
+
+
+def isCoalesced(name: str, args: tuple, kwargs: Dict[str, Any]) -> bool:
+    if name in COALESCED_METHODS:
+        return True
+    if name != "algod_request":
+        return False
+    method = args[0] if args else kwargs.get("method")
+    requrl = args[1] if len(args) > 1 else kwargs.get("requrl", "")
+    return method == "GET" and requrl.startswith(COALESCED_PATHS)
+
+
+class CoalescingClient:
+    """Wraps an AlgodClient so identical concurrent account, application and
+    asset reads become one request, and their results are reused for
+    ``ttl`` seconds or until a newer round is observed, whichever is first.
+
+    Rounds are picked up from ``status`` and ``status_after_block`` calls
+    made through the wrapper (e.g. by waitForTransaction), or can be fed
+    with ``advance``. Results are shared between callers and must not be
+    mutated. Anything else is passed through, so the wrapper can be handed
+    to every function that takes a ``client``.
+
+    Args:
+        client: An algod client.
+        ttl: seconds a result is reused within the same round.
+    """
+
+    def __init__(self, client: AlgodClient, ttl: float = 1.0) -> None:
+        self._client = client
+        self.ttl = ttl
+        self.flight = SingleFlight()
+        self.lock = threading.Lock()
+        self.cache: Dict[Hashable, Tuple[float, Any]] = dict()
+        self.round = 0
+        self.counters = {"requests": 0, "shared": 0, "cached": 0}
+
+    def advance(self, round: int) -> None:
+        """Drop cached results once the chain moves past ``round``."""
+        with self.lock:
+            if round > self.round:
+                self.round = round
+                self.cache.clear()
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.cache.clear()
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        if not isCoalesced(name, args, kwargs):
+            result = getattr(self._client, name)(*args, **kwargs)
+            if name in ("status", "status_after_block"):
+                self.advance(result["last-round"])
+            return result
+
+        key = requestKey(name, args, kwargs)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] > now:
+                self.counters["cached"] += 1
+                return entry[1]
+            round = self.round
+
+        result, shared = self.flight.do(
+            key, lambda: getattr(self._client, name)(*args, **kwargs)
+        )
+        with self.lock:
+            if shared:
+                self.counters["shared"] += 1
+            else:
+                self.counters["requests"] += 1
+                # a round observed while the request was in flight may
+                # already have made this result stale
+                if self.round == round:
+                    self.cache[key] = (now + self.ttl, result)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+
+class AsyncCoalescingClient:
+    """Awaitable front for a CoalescingClient.
+
+    Every method of the wrapped client becomes a coroutine that runs the
+    blocking SDK call on ``executor``. Identical reads from coroutines on
+    the same loop are merged before they reach the executor, and the shared
+    CoalescingClient merges them with reads from other threads.
+
+    Args:
+        client: An algod client or CoalescingClient.
+        executor: executor for the blocking calls; the loop default if None.
+    """
+
+    def __init__(
+        self, client: AlgodClient, executor: Optional[Executor] = None
+    ) -> None:
+        self.client = (
+            client if isinstance(client, CoalescingClient) else CoalescingClient(client)
+        )
+        self.executor = executor
+        self.flight = AsyncSingleFlight()
+
+    async def call(self, name: str, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+
+        def run() -> Awaitable[Any]:
+            return loop.run_in_executor(
+                self.executor, lambda: self.client.call(name, *args, **kwargs)
+            )
+
+        if not isCoalesced(name, args, kwargs):
+            return await run()
+        result, _ = await self.flight.do(requestKey(name, args, kwargs), run)
+        return result
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
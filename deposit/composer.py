@@ -0,0 +1,283 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from algosdk import constants
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+from .operations import (
+    getSetupTxns,
+    getSupplyTxns,
+    getSwapTxns,
+    getWithdrawTxns,
+    getZapTxns,
+)
+from .pipeline import SubmissionPipeline
+from .submission import NonceAllocator, applyNonce
+from .utils import PendingTxnResponse, getAppGlobalState, waitForTransaction
+
+MAX_GROUP_SIZE = constants.tx_group_limit
+
+
+class Action(NamedTuple):
+    """One operation: a block of transactions that must stay contiguous.
+
+    The app call closing a block reads the transfers before it through
+    ``Txn.group_index() - reach``, so the ``reach`` transactions preceding
+    it have to be in the same group at those offsets. Keeping the whole
+    block together and in order guarantees that wherever it lands.
+
+    Args:
+        kind: operation name, for reporting.
+        signer: the account signing every transaction of the block.
+        size: number of transactions in the block.
+        reach: how far back the block's last transaction reads.
+        appID: app whose global state ``build`` needs, or None.
+        build: makes the block from suggested params and that state.
+    """
+
+    kind: str
+    signer: Account
+    size: int
+    reach: int
+    appID: Optional[int]
+    build: Callable[
+        [transaction.SuggestedParams, Optional[dict]], List[transaction.Transaction]
+    ]
+
+
+def pack(
+    sizes: Sequence[int], capacity: int = MAX_GROUP_SIZE, preserveOrder: bool = False
+) -> List[List[int]]:
+    """Pack blocks of the given sizes into as few groups as possible.
+
+    Returns the groups as lists of block indices, each list in ascending
+    order. With ``preserveOrder`` blocks are taken strictly in sequence
+    (next fit), so running the groups one after another runs the blocks in
+    the order given; otherwise first fit decreasing is used, which for
+    blocks of at most four transactions is within one group of optimal in
+    practice.
+    """
+    for i, size in enumerate(sizes):
+        if not 0 < size <= capacity:
+            raise ValueError(
+                "Block {} has {} transactions, groups hold 1 to {}".format(
+                    i, size, capacity
+                )
+            )
+
+    groups: List[List[int]] = []
+    free: List[int] = []
+
+    if preserveOrder:
+        for i, size in enumerate(sizes):
+            if not groups or free[-1] < size:
+                groups.append([])
+                free.append(capacity)
+            groups[-1].append(i)
+            free[-1] -= size
+        return groups
+
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        for g, room in enumerate(free):
+            if room >= sizes[i]:
+                groups[g].append(i)
+                free[g] -= sizes[i]
+                break
+        else:
+            groups.append([i])
+            free.append(capacity - sizes[i])
+    return [sorted(group) for group in groups]
+
+
+class Composer:
+    """Collects actions from any number of accounts and sends them packed into
+    the fewest 16-transaction atomic groups.
+
+    Each action is a contiguous block (see Action), so every app call still
+    finds its transfers at ``group_index - 1`` and ``- 2``. Every block gets
+    its own nonce, so repeating an action within a group or across runs does
+    not produce duplicate transaction ids.
+
+    Args:
+        client: An algod client, used to read app state.
+        allocator: nonce source; a private one is made if not given.
+    """
+
+    def __init__(
+        self, client: AlgodClient, allocator: Optional[NonceAllocator] = None
+    ) -> None:
+        self.client = client
+        self.allocator = allocator or NonceAllocator()
+        self.actions: List[Action] = []
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def add(self, action: Action) -> "Composer":
+        self.actions.append(action)
+        return self
+
+    def payment(self, sender: Account, receiver: str, amount: int) -> "Composer":
+        return self.add(
+            Action(
+                "payment",
+                sender,
+                1,
+                0,
+                None,
+                lambda sp, state: [
+                    transaction.PaymentTxn(sender.getAddress(), sp, receiver, amount)
+                ],
+            )
+        )
+
+    def setup(
+        self, appID: int, tokenA: int, tokenB: int, funder: Account
+    ) -> "Composer":
+        return self.add(
+            Action(
+                "setup",
+                funder,
+                2,
+                0,
+                None,
+                lambda sp, state: getSetupTxns(
+                    appID, funder.getAddress(), tokenA, tokenB, sp
+                ),
+            )
+        )
+
+    def supply(self, appID: int, qA: int, qB: int, supplier: Account) -> "Composer":
+        return self.add(
+            Action(
+                "supply",
+                supplier,
+                4,
+                2,
+                appID,
+                lambda sp, state: getSupplyTxns(
+                    appID, state, qA, qB, supplier.getAddress(), sp
+                ),
+            )
+        )
+
+    def withdraw(
+        self, appID: int, poolTokenAmount: int, withdrawAccount: Account
+    ) -> "Composer":
+        return self.add(
+            Action(
+                "withdraw",
+                withdrawAccount,
+                3,
+                1,
+                appID,
+                lambda sp, state: getWithdrawTxns(
+                    appID, state, poolTokenAmount, withdrawAccount.getAddress(), sp
+                ),
+            )
+        )
+
+    def swap(
+        self, appID: int, tokenId: int, amount: int, trader: Account
+    ) -> "Composer":
+        return self.add(
+            Action(
+                "swap",
+                trader,
+                3,
+                1,
+                appID,
+                lambda sp, state: getSwapTxns(
+                    appID, state, tokenId, amount, trader.getAddress(), sp
+                ),
+            )
+        )
+
+    def zap(
+        self, appID: int, tokenId: int, amount: int, supplier: Account
+    ) -> "Composer":
+        return self.add(
+            Action(
+                "zap",
+                supplier,
+                3,
+                1,
+                appID,
+                lambda sp, state: getZapTxns(
+                    appID, state, tokenId, amount, supplier.getAddress(), sp
+                ),
+            )
+        )
+
+    def groups(self, preserveOrder: bool = False) -> List[List[Action]]:
+        """The actions as they will be packed into atomic groups."""
+        packed = pack([a.size for a in self.actions], preserveOrder=preserveOrder)
+        return [[self.actions[i] for i in group] for group in packed]
+
+    def _states(self, actions: Sequence[Action]) -> Dict[int, dict]:
+        appIDs = {a.appID for a in actions if a.appID is not None}
+        return {appID: getAppGlobalState(self.client, appID) for appID in appIDs}
+
+    def _builder(self, actions: List[Action], states: Dict[int, dict]):
+        """Builder for one group, compatible with SubmissionPipeline."""
+
+        def build(
+            sp: transaction.SuggestedParams,
+        ) -> List[transaction.SignedTransaction]:
+            txns: List[transaction.Transaction] = []
+            signers: List[Account] = []
+            for action in actions:
+                block = action.build(sp, states.get(action.appID))
+                assert len(block) == action.size and action.reach < action.size
+                applyNonce(block, self.allocator)
+                txns += block
+                signers += [action.signer] * len(block)
+            transaction.assign_group_id(txns)
+            return [signer.sign(txn) for signer, txn in zip(signers, txns)]
+
+        return build
+
+    def build(
+        self, sp: transaction.SuggestedParams, preserveOrder: bool = False
+    ) -> List[List[transaction.SignedTransaction]]:
+        """Build and sign every group for ``sp``."""
+        groups = self.groups(preserveOrder)
+        states = self._states(self.actions)
+        return [self._builder(actions, states)(sp) for actions in groups]
+
+    def execute(
+        self, preserveOrder: bool = False, waitRounds: int = 10
+    ) -> List[PendingTxnResponse]:
+        """Send every group and wait for them; return each group's last
+        transaction. Without ``preserveOrder`` all groups are sent before
+        waiting so they can land in the same block; with it each group is
+        confirmed before the next is sent."""
+        signedGroups = self.build(self.client.suggested_params(), preserveOrder)
+
+        results = []
+        txids = []
+        for signedTxns in signedGroups:
+            self.client.send_transactions(signedTxns)
+            txids.append(signedTxns[-1].get_txid())
+            if preserveOrder:
+                results.append(waitForTransaction(self.client, txids[-1], waitRounds))
+        if not preserveOrder:
+            results = [
+                waitForTransaction(self.client, txid, waitRounds) for txid in txids
+            ]
+
+        self.actions = []
+        return results
+
+    def submit(self, pipeline: SubmissionPipeline) -> List[Future]:
+        """Queue every group on ``pipeline``; they run in parallel, so actions
+        are not ordered across groups."""
+        groups = self.groups()
+        states = self._states(self.actions)
+        futures = [
+            pipeline.submit(self._builder(actions, states)) for actions in groups
+        ]
+        self.actions = []
+        return futures
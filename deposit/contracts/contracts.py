@@ -11,8 +11,13 @@ POOL_TOKEN_KEY = Bytes("pool_token_key")
 FEE_BPS_KEY = Bytes("fee_bps_key")
 MIN_INCREMENT_KEY = Bytes("min_increment_key")
 POOL_TOKENS_OUTSTANDING_KEY = Bytes("pool_tokens_outstanding_key")
+PRICE_A_CUMULATIVE_KEY = Bytes("price_a_cumulative_key")
+PRICE_B_CUMULATIVE_KEY = Bytes("price_b_cumulative_key")
+LAST_PRICE_UPDATE_KEY = Bytes("last_price_update_key")
 SCALING_FACTOR = Int(10 ** 13)
 POOL_TOKEN_DEFAULT_AMOUNT = Int(10 ** 13)
+# cumulative prices are UQ64.64, kept modulo 2^128 in 16 bytes
+PRICE_CUMULATIVE_ZERO = Bytes("base16", "0x" + "00" * 16)
 
 
 def validateTokenReceived(
@@ -32,9 +37,8 @@ def xMulYDivZ(x, y, z) -> Expr:
     return WideRatio([x, y, SCALING_FACTOR], [z, SCALING_FACTOR])
 
 
-def sendToken(
-    token_key: TealType.bytes, receiver: TealType.bytes, amount: TealType.uint64
-) -> Expr:
+@Subroutine(TealType.none)
+def sendToken(token_key: Expr, receiver: Expr, amount: Expr) -> Expr:
     return Seq(
         InnerTxnBuilder.Begin(),
         InnerTxnBuilder.SetFields(
@@ -50,7 +54,8 @@ def sendToken(
 
 
 
-def createPoolToken(pool_token_amount: TealType.uint64) -> Expr:
+@Subroutine(TealType.none)
+def createPoolToken(pool_token_amount: Expr) -> Expr:
     return Seq(
         InnerTxnBuilder.Begin(),
         InnerTxnBuilder.SetFields(
@@ -69,15 +74,17 @@ def createPoolToken(pool_token_amount: TealType.uint64) -> Expr:
 
 
 
-def optIn(token_key: TealType.bytes) -> Expr:
+@Subroutine(TealType.none)
+def optIn(token_key: Expr) -> Expr:
     return sendToken(token_key, Global.current_application_address(), Int(0))
 
 
 
+@Subroutine(TealType.none)
 def returnRemainder(
-    token_key: TealType.bytes,
-    received_amount: TealType.uint64,
-    to_keep_amount: TealType.uint64,
+    token_key: Expr,
+    received_amount: Expr,
+    to_keep_amount: Expr,
 ) -> Expr:
     remainder = received_amount - to_keep_amount
     return Seq(
@@ -92,12 +99,13 @@ def returnRemainder(
 
 
 
+@Subroutine(TealType.uint64)
 def tryTakeAdjustedAmounts(
-    to_keep_token_txn_amt: TealType.uint64,
-    to_keep_token_before_txn_amt: TealType.uint64,
-    other_token_key: TealType.bytes,
-    other_token_txn_amt: TealType.uint64,
-    other_token_before_txn_amt: TealType.uint64,
+    to_keep_token_txn_amt: Expr,
+    to_keep_token_before_txn_amt: Expr,
+    other_token_key: Expr,
+    other_token_txn_amt: Expr,
+    other_token_before_txn_amt: Expr,
 ) -> Expr:
     """
     Given supplied token amounts, try to keep all of one token and the corresponding amount of other token
@@ -142,11 +150,12 @@ def tryTakeAdjustedAmounts(
 
 
 
+@Subroutine(TealType.none)
 def withdrawGivenPoolToken(
-    receiver: TealType.bytes,
-    to_withdraw_token_key: TealType.bytes,
-    pool_token_amount: TealType.uint64,
-    pool_tokens_outstanding: TealType.uint64,
+    receiver: Expr,
+    to_withdraw_token_key: Expr,
+    pool_token_amount: Expr,
+    pool_tokens_outstanding: Expr,
 ) -> Expr:
     token_holding = AssetHolding.balance(
         Global.current_application_address(), App.globalGet(to_withdraw_token_key)
@@ -185,18 +194,20 @@ def withdrawGivenPoolToken(
 
 
 
-def assessFee(amount: TealType.uint64, fee_bps: TealType.uint64):
+@Subroutine(TealType.uint64)
+def assessFee(amount: Expr, fee_bps: Expr):
     fee_num = Int(10000) - fee_bps
     fee_denom = Int(10000)
     return xMulYDivZ(amount, fee_num, fee_denom)
 
 
 
+@Subroutine(TealType.uint64)
 def computeOtherTokenOutputPerGivenTokenInput(
-    input_amount: TealType.uint64,
-    previous_given_token_amount: TealType.uint64,
-    previous_other_token_amount: TealType.uint64,
-    fee_bps: TealType.uint64,
+    input_amount: Expr,
+    previous_given_token_amount: Expr,
+    previous_other_token_amount: Expr,
+    fee_bps: Expr,
 ):
     k = previous_given_token_amount * previous_other_token_amount
     amount_sub_fee = assessFee(input_amount, fee_bps)
@@ -207,7 +218,140 @@ def computeOtherTokenOutputPerGivenTokenInput(
 
 
 
-def mintAndSendPoolToken(receiver: TealType.bytes, amount: TealType.uint64) -> Expr:
+def wrappingAdd(x: Expr, y: Expr) -> Expr:
+    return MultiValue(
+        Op.addw, [TealType.uint64, TealType.uint64], args=[x, y]
+    ).outputReducer(lambda carry, low: low)
+
+
+def wrappingMul(x: Expr, y: Expr) -> Expr:
+    return MultiValue(
+        Op.mulw, [TealType.uint64, TealType.uint64], args=[x, y]
+    ).outputReducer(lambda high, low: low)
+
+
+def wideProduct(x: Expr, y: Expr) -> Expr:
+    """x * y as 16 bytes, for byte math; cheaper than BytesMul of the two."""
+    return MultiValue(
+        Op.mulw, [TealType.uint64, TealType.uint64], args=[x, y]
+    ).outputReducer(lambda high, low: Concat(Itob(high), Itob(low)))
+
+
+@Subroutine(TealType.uint64)
+def computeZapSwapAmount(
+    input_amount: Expr,
+    previous_given_token_amount: Expr,
+    fee_bps: Expr,
+):
+    """
+    Part of a single-sided input to swap first, so that the rest of the input and the swap output
+    are in the ratio of the pool after the swap:
+    (sqrt(R^2 * (10000 + f)^2 + 4 * 10000 * f * R * input) - R * (10000 + f)) / (2 * f)
+    where R is the given token reserve and f = 10000 - fee_bps. Intermediates exceed uint64,
+    so this is done with byte math.
+    """
+    fee_num = Int(10000) - fee_bps
+    # computed once; byte math is costly
+    b = ScratchVar(TealType.bytes)
+    discriminant = BytesAdd(
+        BytesMul(b.load(), b.load()),
+        BytesMul(
+            Itob(Int(4) * Int(10000) * fee_num),
+            wideProduct(input_amount, previous_given_token_amount),
+        ),
+    )
+    return Seq(
+        b.store(wideProduct(previous_given_token_amount, Int(10000) + fee_num)),
+        Btoi(
+            BytesDiv(
+                BytesMinus(BytesSqrt(discriminant), b.load()), Itob(Int(2) * fee_num)
+            )
+        ),
+    )
+
+
+def accumulatePrice(
+    cumulative_key: Expr, numerator: Expr, denominator: Expr, elapsed: Expr
+) -> Expr:
+    """
+    cumulative + numerator / denominator * elapsed, modulo 2^128. The price is UQ64.64 and the
+    cumulative is kept as two uint64 words in a 16 byte value, so this costs a few dozen
+    opcodes where byte math would cost several times that.
+    """
+    cumulative = App.globalGet(cumulative_key)
+    price_high = numerator / denominator
+    price_low = Divw(numerator % denominator, Int(0), denominator)
+    return MultiValue(
+        Op.mulw, [TealType.uint64, TealType.uint64], args=[price_low, elapsed]
+    ).outputReducer(
+        lambda product_high, product_low: MultiValue(
+            Op.addw,
+            [TealType.uint64, TealType.uint64],
+            args=[ExtractUint64(cumulative, Int(8)), product_low],
+        ).outputReducer(
+            lambda carry, low: Concat(
+                Itob(
+                    wrappingAdd(
+                        wrappingAdd(
+                            ExtractUint64(cumulative, Int(0)),
+                            # the high word of price_low * elapsed is below elapsed
+                            product_high + carry,
+                        ),
+                        wrappingMul(price_high, elapsed),
+                    )
+                ),
+                Itob(low),
+            )
+        )
+    )
+
+
+@Subroutine(TealType.none)
+def updatePriceAccumulators(reserve_a: Expr, reserve_b: Expr) -> Expr:
+    """
+    Add the price in effect since the last update, weighted by the seconds elapsed, to the
+    cumulative prices (Uniswap v2 style). Must be called with the reserves before the current
+    operation changes them. A time-weighted average price between two reads of global state is
+    (cumulative_2 - cumulative_1) / (timestamp_2 - timestamp_1).
+    """
+    elapsed = ScratchVar(TealType.uint64)
+    return Seq(
+        If(Global.latest_timestamp() > App.globalGet(LAST_PRICE_UPDATE_KEY)).Then(
+            Seq(
+                If(And(reserve_a > Int(0), reserve_b > Int(0))).Then(
+                    Seq(
+                        elapsed.store(
+                            Global.latest_timestamp()
+                            - App.globalGet(LAST_PRICE_UPDATE_KEY)
+                        ),
+                        App.globalPut(
+                            PRICE_A_CUMULATIVE_KEY,
+                            accumulatePrice(
+                                PRICE_A_CUMULATIVE_KEY,
+                                reserve_b,
+                                reserve_a,
+                                elapsed.load(),
+                            ),
+                        ),
+                        App.globalPut(
+                            PRICE_B_CUMULATIVE_KEY,
+                            accumulatePrice(
+                                PRICE_B_CUMULATIVE_KEY,
+                                reserve_a,
+                                reserve_b,
+                                elapsed.load(),
+                            ),
+                        ),
+                    )
+                ),
+                App.globalPut(LAST_PRICE_UPDATE_KEY, Global.latest_timestamp()),
+            )
+        ),
+    )
+
+
+@Subroutine(TealType.none)
+def mintAndSendPoolToken(receiver: Expr, amount: Expr) -> Expr:
     return Seq(
         sendToken(POOL_TOKEN_KEY, receiver, amount),
         App.globalPut(
@@ -281,6 +425,7 @@ def get_supply_program():
         token_b_before_txn.store(
             token_b_holding.value() - Gtxn[token_b_txn_index].asset_amount()
         ),
+        updatePriceAccumulators(token_a_before_txn.load(), token_b_before_txn.load()),
         If(
             Or(
                 token_a_before_txn.load() == Int(0),
@@ -339,6 +484,7 @@ def get_withdraw_program():
                 validateTokenReceived(pool_token_txn_index, POOL_TOKEN_KEY),
             )
         ),
+        updatePriceAccumulators(token_a_holding.value(), token_b_holding.value()),
         If(Gtxn[pool_token_txn_index].asset_amount() > Int(0)).Then(
             Seq(
                 withdrawGivenPoolToken(
@@ -394,6 +540,10 @@ def get_swap_program():
                     token_a_holding.value() - Gtxn[on_swap_txn_index].asset_amount()
                 ),
                 other_token_amt_before_txn.store(token_b_holding.value()),
+                updatePriceAccumulators(
+                    given_token_amt_before_txn.load(),
+                    other_token_amt_before_txn.load(),
+                ),
                 to_send_key.store(TOKEN_B_KEY),
             )
         )
@@ -404,6 +554,10 @@ def get_swap_program():
                     token_b_holding.value() - Gtxn[on_swap_txn_index].asset_amount()
                 ),
                 other_token_amt_before_txn.store(token_a_holding.value()),
+                updatePriceAccumulators(
+                    other_token_amt_before_txn.load(),
+                    given_token_amt_before_txn.load(),
+                ),
                 to_send_key.store(TOKEN_A_KEY),
             )
         )
@@ -429,6 +583,109 @@ def get_swap_program():
     return on_swap
 
 
+def get_zap_program():
+    on_zap_txn_index = Txn.group_index() - Int(1)
+    given_token_amt_before_txn = ScratchVar(TealType.uint64)
+    other_token_amt_before_txn = ScratchVar(TealType.uint64)
+    swap_amount = ScratchVar(TealType.uint64)
+    swap_output = ScratchVar(TealType.uint64)
+    given_minted = ScratchVar(TealType.uint64)
+    other_minted = ScratchVar(TealType.uint64)
+
+    on_zap = Seq(
+        token_a_holding,
+        token_b_holding,
+        Assert(
+            And(
+                App.globalGet(POOL_TOKENS_OUTSTANDING_KEY) > Int(0),
+                Or(
+                    validateTokenReceived(on_zap_txn_index, TOKEN_A_KEY),
+                    validateTokenReceived(on_zap_txn_index, TOKEN_B_KEY),
+                ),
+                Gtxn[on_zap_txn_index].asset_amount()
+                >= App.globalGet(MIN_INCREMENT_KEY),
+            )
+        ),
+        If(Gtxn[on_zap_txn_index].xfer_asset() == App.globalGet(TOKEN_A_KEY))
+        .Then(
+            Seq(
+                given_token_amt_before_txn.store(
+                    token_a_holding.value() - Gtxn[on_zap_txn_index].asset_amount()
+                ),
+                other_token_amt_before_txn.store(token_b_holding.value()),
+                updatePriceAccumulators(
+                    given_token_amt_before_txn.load(),
+                    other_token_amt_before_txn.load(),
+                ),
+            )
+        )
+        .Else(
+            Seq(
+                given_token_amt_before_txn.store(
+                    token_b_holding.value() - Gtxn[on_zap_txn_index].asset_amount()
+                ),
+                other_token_amt_before_txn.store(token_a_holding.value()),
+                updatePriceAccumulators(
+                    other_token_amt_before_txn.load(),
+                    given_token_amt_before_txn.load(),
+                ),
+            )
+        ),
+        Assert(
+            And(
+                given_token_amt_before_txn.load() > Int(0),
+                other_token_amt_before_txn.load() > Int(0),
+            )
+        ),
+        # swap part of the input inside the pool; its output never leaves the app
+        swap_amount.store(
+            computeZapSwapAmount(
+                Gtxn[on_zap_txn_index].asset_amount(),
+                given_token_amt_before_txn.load(),
+                App.globalGet(FEE_BPS_KEY),
+            )
+        ),
+        swap_output.store(
+            computeOtherTokenOutputPerGivenTokenInput(
+                swap_amount.load(),
+                given_token_amt_before_txn.load(),
+                other_token_amt_before_txn.load(),
+                App.globalGet(FEE_BPS_KEY),
+            )
+        ),
+        Assert(
+            And(
+                swap_output.load() > Int(0),
+                swap_output.load() < other_token_amt_before_txn.load(),
+            )
+        ),
+        # then supply the rest and the output against the reserves after the swap,
+        # minting for the smaller share so rounding favours the pool
+        given_minted.store(
+            xMulYDivZ(
+                App.globalGet(POOL_TOKENS_OUTSTANDING_KEY),
+                Gtxn[on_zap_txn_index].asset_amount() - swap_amount.load(),
+                given_token_amt_before_txn.load() + swap_amount.load(),
+            )
+        ),
+        other_minted.store(
+            xMulYDivZ(
+                App.globalGet(POOL_TOKENS_OUTSTANDING_KEY),
+                swap_output.load(),
+                other_token_amt_before_txn.load() - swap_output.load(),
+            )
+        ),
+        If(other_minted.load() < given_minted.load()).Then(
+            given_minted.store(other_minted.load())
+        ),
+        Assert(given_minted.load() > Int(0)),
+        mintAndSendPoolToken(Txn.sender(), given_minted.load()),
+        Approve(),
+    )
+
+    return on_zap
+
+
 def approval_program():
     on_create = Seq(
         App.globalPut(CREATOR_KEY, Txn.application_args[0]),
@@ -436,6 +693,9 @@ def approval_program():
         App.globalPut(TOKEN_B_KEY, Btoi(Txn.application_args[2])),
         App.globalPut(FEE_BPS_KEY, Btoi(Txn.application_args[3])),
         App.globalPut(MIN_INCREMENT_KEY, Btoi(Txn.application_args[4])),
+        App.globalPut(PRICE_A_CUMULATIVE_KEY, PRICE_CUMULATIVE_ZERO),
+        App.globalPut(PRICE_B_CUMULATIVE_KEY, PRICE_CUMULATIVE_ZERO),
+        App.globalPut(LAST_PRICE_UPDATE_KEY, Global.latest_timestamp()),
         Approve(),
     )
 
@@ -443,6 +703,7 @@ def approval_program():
     on_supply = get_supply_program()
     on_withdraw = get_withdraw_program()
     on_swap = get_swap_program()
+    on_zap = get_zap_program()
 
     on_call_method = Txn.application_args[0]
     on_call = Cond(
@@ -450,6 +711,7 @@ def approval_program():
         [on_call_method == Bytes("supply"), on_supply],
         [on_call_method == Bytes("withdraw"), on_withdraw],
         [on_call_method == Bytes("swap"), on_swap],
+        [on_call_method == Bytes("zap"), on_zap],
     )
 
     on_delete = Seq(
@@ -0,0 +1,223 @@
+"""Concurrent deployment of many pools.
+
+Bringing up a pool takes three dependent steps: create the app, fund it and
+call setup (which creates the pool token), then opt the creator in to the
+pool token and supply the initial liquidity. Done one pool at a time with a
+confirmation wait after each, that is four rounds per pool.
+
+PoolDeployer runs the steps for chunks of eight pools: a chunk's creates go
+out as one group, its eight fund + setup pairs fill a second, and its
+opt-in + supply blocks fill three more. Chunks run concurrently through one
+SubmissionPipeline and every create reuses the same compiled programs, so
+any number of pools the pipeline's rate allows takes about three rounds.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+from .composer import MAX_GROUP_SIZE, Action, Composer
+from .operations import getContracts, getCreateAppTxn, getPoolTokenId, getSupplyTxns
+from .pipeline import SubmissionPipeline
+from .submission import NonceAllocator, applyNonce
+from .utils import (
+    PendingTxnResponse,
+    PoolError,
+    getAppGlobalState,
+    getPendingTransaction,
+)
+
+# a fund + setup pair is two transactions
+POOLS_PER_CHUNK = MAX_GROUP_SIZE // 2
+
+
+class PoolSpec(NamedTuple):
+    """One pool to deploy. With liquidity given, the creator opts in to the
+    pool token and supplies ``liquidityA`` and ``liquidityB``."""
+
+    tokenA: int
+    tokenB: int
+    feeBps: int = 30
+    minIncrement: int = 1000
+    liquidityA: int = 0
+    liquidityB: int = 0
+
+
+class Deployment(NamedTuple):
+    """Outcome for one PoolSpec. ``error`` names the failed step; the ids
+    are those of the steps that got through."""
+
+    spec: PoolSpec
+    appID: Optional[int] = None
+    poolToken: Optional[int] = None
+    error: Optional[str] = None
+
+
+class PoolDeployer:
+    """Deploys pools from a single creator, overlapping the steps of many pools.
+
+    A failed group fails every pool in it: a chunk's creates and setups
+    share one group each, the supplies share theirs three to a group.
+
+    Args:
+        client: An algod client.
+        creator: creates the apps, funds them and supplies the liquidity.
+        pipeline: sends and confirms the groups; size its concurrency for
+            several groups per chunk in flight.
+        allocator: nonce source, so identical specs get distinct txIDs.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        creator: Account,
+        pipeline: SubmissionPipeline,
+        allocator: Optional[NonceAllocator] = None,
+    ) -> None:
+        self.client = client
+        self.creator = creator
+        self.pipeline = pipeline
+        self.allocator = allocator or NonceAllocator()
+        self.approval, self.clear = getContracts(client)
+
+    def deploy(
+        self, specs: Sequence[PoolSpec], concurrency: int = 32
+    ) -> List[Deployment]:
+        """Deploy every spec; results are in the order of ``specs``."""
+        chunks = [
+            specs[i : i + POOLS_PER_CHUNK]
+            for i in range(0, len(specs), POOLS_PER_CHUNK)
+        ]
+        with ThreadPoolExecutor(max(1, min(concurrency, len(chunks)))) as executor:
+            results = executor.map(self._chunk, chunks)
+            return [deployment for chunk in results for deployment in chunk]
+
+    def _chunk(self, specs: Sequence[PoolSpec]) -> List[Deployment]:
+        try:
+            appIDs = self._create(specs)
+        except Exception as e:
+            return [Deployment(spec, error="create: {}".format(e)) for spec in specs]
+
+        try:
+            self._setup(specs, appIDs)
+        except Exception as e:
+            return [
+                Deployment(spec, appID, error="setup: {}".format(e))
+                for spec, appID in zip(specs, appIDs)
+            ]
+
+        states = [getAppGlobalState(self.client, appID) for appID in appIDs]
+        errors = self._supply(specs, appIDs, states)
+        return [
+            Deployment(spec, appID, getPoolTokenId(state), errors.get(appID))
+            for spec, appID, state in zip(specs, appIDs, states)
+        ]
+
+    def _create(self, specs: Sequence[PoolSpec]) -> List[int]:
+        """Create the apps in one group; return their ids."""
+        address = self.creator.getAddress()
+        signed: List[List[transaction.SignedTransaction]] = []
+
+        def build(
+            sp: transaction.SuggestedParams,
+        ) -> List[transaction.SignedTransaction]:
+            txns = [
+                getCreateAppTxn(
+                    address,
+                    self.approval,
+                    self.clear,
+                    spec.tokenA,
+                    spec.tokenB,
+                    spec.feeBps,
+                    spec.minIncrement,
+                    sp,
+                )
+                for spec in specs
+            ]
+            for txn in txns:
+                applyNonce([txn], self.allocator)
+            transaction.assign_group_id(txns)
+            # the pipeline rebuilds a group that expired unconfirmed, so
+            # every build is kept to find the one that landed
+            signed.append([self.creator.sign(txn) for txn in txns])
+            return signed[-1]
+
+        self.pipeline.submit(build, operation="create").result()
+        landed = [
+            group
+            for group in signed
+            if PendingTxnResponse(
+                getPendingTransaction(self.client, group[-1].get_txid())
+            ).confirmedRound
+        ]
+        if len(landed) != 1:
+            raise PoolError(
+                signed[-1][-1].get_txid(),
+                "{} of {} create groups confirmed".format(len(landed), len(signed)),
+            )
+
+        appIDs = [
+            PendingTxnResponse(
+                getPendingTransaction(self.client, s.get_txid())
+            ).applicationIndex
+            for s in landed[0]
+        ]
+        if not all(appID is not None and appID > 0 for appID in appIDs):
+            raise PoolError(landed[0][-1].get_txid(), "create group returned no app id")
+        return appIDs
+
+    def _setup(self, specs: Sequence[PoolSpec], appIDs: Sequence[int]) -> None:
+        composer = Composer(self.client, self.allocator)
+        for spec, appID in zip(specs, appIDs):
+            composer.setup(appID, spec.tokenA, spec.tokenB, self.creator)
+        for future in composer.submit(self.pipeline):
+            future.result()
+
+    def _supply(
+        self, specs: Sequence[PoolSpec], appIDs: Sequence[int], states: Sequence[dict]
+    ) -> Dict[int, str]:
+        """Opt in and supply where liquidity is given; return errors by app id."""
+        composer = Composer(self.client, self.allocator)
+        owners: Dict[int, int] = {}
+        for spec, appID, state in zip(specs, appIDs, states):
+            if spec.liquidityA and spec.liquidityB:
+                action = self._supplyAction(spec, appID, state)
+                owners[id(action)] = appID
+                composer.add(action)
+
+        # groups() is the packing submit() uses
+        groups = composer.groups()
+        futures = composer.submit(self.pipeline)
+        errors = {}
+        for actions, future in zip(groups, futures):
+            error = future.exception()
+            if error is not None:
+                for action in actions:
+                    errors[owners[id(action)]] = "supply: {}".format(error)
+        return errors
+
+    def _supplyAction(self, spec: PoolSpec, appID: int, state: dict) -> Action:
+        address = self.creator.getAddress()
+
+        def build(sp: transaction.SuggestedParams, _) -> List[transaction.Transaction]:
+            optIn = transaction.AssetOptInTxn(address, sp, getPoolTokenId(state))
+            return [optIn] + getSupplyTxns(
+                appID, state, spec.liquidityA, spec.liquidityB, address, sp
+            )
+
+        # the state is already read, so the composer need not fetch it
+        return Action("optin_supply", self.creator, 5, 2, None, build)
+
+
+def deployPools(
+    client: AlgodClient,
+    creator: Account,
+    specs: Sequence[PoolSpec],
+    concurrency: int = 32,
+    rate: float = 100.0,
+) -> List[Deployment]:
+    """Deploy ``specs`` through a pipeline of its own; see PoolDeployer."""
+    with SubmissionPipeline(client, concurrency=4 * concurrency, rate=rate) as pipeline:
+        return PoolDeployer(client, creator, pipeline).deploy(specs, concurrency)
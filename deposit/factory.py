@@ -0,0 +1,308 @@
+import json
+import os
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from algosdk import account, constants
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+from .pipeline import SubmissionPipeline
+from .submission import flatFeeParams
+from .utils import getBalances
+
+MAX_GROUP_SIZE = constants.tx_group_limit
+
+# minimum balance of an account and the extra per asset it opts in to
+ACCOUNT_MIN_BALANCE = 100_000
+ASSET_MIN_BALANCE = 100_000
+
+# a signer and a function building its transaction from suggested params
+Member = Tuple[
+    Account, Callable[[transaction.SuggestedParams], transaction.Transaction]
+]
+
+
+class AccountSet:
+    """Generated accounts together with how far each has been prepared.
+
+    Args:
+        accounts: the accounts.
+        assets: asset ids every account should be opted in to.
+        funded: addresses that have been funded.
+        optedIn: address -> asset ids it is opted in to.
+    """
+
+    def __init__(
+        self,
+        accounts: List[Account],
+        assets: Sequence[int] = (),
+        funded: Optional[Sequence[str]] = None,
+        optedIn: Optional[Dict[str, List[int]]] = None,
+    ) -> None:
+        self.accounts = accounts
+        self.assets = list(assets)
+        self.funded = set(funded or ())
+        self.optedIn = {address: set(ids) for address, ids in (optedIn or {}).items()}
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def __iter__(self):
+        return iter(self.accounts)
+
+    def missingOptIns(self) -> List[Tuple[Account, int]]:
+        return [
+            (a, assetID)
+            for a in self.accounts
+            for assetID in self.assets
+            if assetID not in self.optedIn.get(a.getAddress(), ())
+        ]
+
+    def save(self, path: str) -> None:
+        """Write the set as JSON, readable only by the owner: it holds private keys."""
+        data = {
+            "assets": self.assets,
+            "accounts": [
+                {
+                    "privateKey": a.getPrivateKey(),
+                    "funded": a.getAddress() in self.funded,
+                    "optedIn": sorted(self.optedIn.get(a.getAddress(), ())),
+                }
+                for a in self.accounts
+            ],
+        }
+        tmpPath = path + ".tmp"
+        fd = os.open(tmpPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmpPath, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AccountSet":
+        with open(path) as f:
+            data = json.load(f)
+
+        accounts = [Account(entry["privateKey"]) for entry in data["accounts"]]
+        return cls(
+            accounts,
+            data["assets"],
+            funded=[
+                a.getAddress()
+                for a, entry in zip(accounts, data["accounts"])
+                if entry["funded"]
+            ],
+            optedIn={
+                a.getAddress(): entry["optedIn"]
+                for a, entry in zip(accounts, data["accounts"])
+            },
+        )
+
+
+def generateAccounts(n: int) -> List[Account]:
+    return [Account(account.generate_account()[0]) for _ in range(n)]
+
+
+def chunks(items: Sequence, size: int = MAX_GROUP_SIZE) -> List[Sequence]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _groupBuilder(members: List[Member]):
+    """Builder for SubmissionPipeline: rebuilds and re-signs the whole group
+    for whatever suggested params it is given."""
+
+    def build(sp: transaction.SuggestedParams) -> List[transaction.SignedTransaction]:
+        txns = [makeTxn(sp) for _, makeTxn in members]
+        transaction.assign_group_id(txns)
+        return [signer.sign(txn) for (signer, _), txn in zip(members, txns)]
+
+    return build
+
+
+class AccountFactory:
+    """Creates and prepares many test accounts at once.
+
+    Funding payments and asset opt-ins are packed into 16-transaction atomic
+    groups, which are sent in parallel through a SubmissionPipeline. Each
+    phase waits for all of its groups before the next begins, since an
+    account must be funded before it can opt in. The pipeline only re-signs
+    a group once it can no longer confirm, and accounts of a failed funding
+    group are checked on chain before they are left unfunded, so resuming
+    with ``prepare`` does not pay an account twice.
+
+    Args:
+        client: An algod client.
+        dispenser: The account paying for the funding.
+        concurrency: threads sending groups.
+        rate: maximum groups sent per second.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        dispenser: Account,
+        concurrency: int = 8,
+        rate: float = 20.0,
+    ) -> None:
+        self.client = client
+        self.dispenser = dispenser
+        self.concurrency = concurrency
+        self.rate = rate
+
+    def _submit(self, groups: List[List[Member]]) -> List[Optional[Exception]]:
+        """Send the groups in parallel; return each group's error or None."""
+        with SubmissionPipeline(
+            self.client,
+            concurrency=self.concurrency,
+            rate=self.rate,
+            maxQueue=self.concurrency * 2,
+        ) as pipeline:
+            futures: List[Future] = []
+            for members in groups:
+                build = _groupBuilder(members)
+                futures.append(
+                    pipeline.submit(
+                        lambda sp, build=build: build(flatFeeParams(sp))
+                    )
+                )
+        return [future.exception() for future in futures]
+
+    def minimumFunding(self, assetCount: int) -> int:
+        return (
+            ACCOUNT_MIN_BALANCE
+            + ASSET_MIN_BALANCE * assetCount
+            + constants.min_txn_fee * assetCount
+        )
+
+    def fund(self, accountSet: AccountSet, amount: int) -> List[Exception]:
+        """Pay ``amount`` to every account in the set that is not funded yet."""
+        if amount < self.minimumFunding(len(accountSet.assets)):
+            raise ValueError(
+                "Funding {} does not cover the minimum balance of {} for {} assets".format(
+                    amount,
+                    self.minimumFunding(len(accountSet.assets)),
+                    len(accountSet.assets),
+                )
+            )
+
+        pending = [a for a in accountSet if a.getAddress() not in accountSet.funded]
+        groups = [
+            [
+                (
+                    self.dispenser,
+                    lambda sp, receiver=a.getAddress(): transaction.PaymentTxn(
+                        self.dispenser.getAddress(), sp, receiver, amount
+                    ),
+                )
+                for a in chunk
+            ]
+            for chunk in chunks(pending)
+        ]
+
+        errors = []
+        for chunk, error in zip(chunks(pending), self._submit(groups)):
+            if error is None:
+                accountSet.funded.update(a.getAddress() for a in chunk)
+                continue
+            # a group whose status could not be read may still have landed
+            landed = [
+                a.getAddress()
+                for a in chunk
+                if getBalances(self.client, a.getAddress(), [])[0] >= amount
+            ]
+            accountSet.funded.update(landed)
+            if len(landed) < len(chunk):
+                errors.append(error)
+        return errors
+
+    def optIn(self, accountSet: AccountSet) -> List[Exception]:
+        """Opt every funded account in to each of the set's assets."""
+        pending = [
+            (a, assetID)
+            for a, assetID in accountSet.missingOptIns()
+            if a.getAddress() in accountSet.funded
+        ]
+        groups = [
+            [
+                (
+                    a,
+                    lambda sp, sender=a.getAddress(), assetID=assetID: (
+                        transaction.AssetOptInTxn(sender, sp, assetID)
+                    ),
+                )
+                for a, assetID in chunk
+            ]
+            for chunk in chunks(pending)
+        ]
+
+        errors = []
+        for chunk, error in zip(chunks(pending), self._submit(groups)):
+            if error is None:
+                for a, assetID in chunk:
+                    accountSet.optedIn.setdefault(a.getAddress(), set()).add(assetID)
+            else:
+                errors.append(error)
+        return errors
+
+    def distribute(
+        self, accountSet: AccountSet, holder: Account, assetID: int, amount: int
+    ) -> List[Exception]:
+        """Send ``amount`` of an asset from ``holder`` to every opted-in account."""
+        receivers = [
+            a
+            for a in accountSet
+            if assetID in accountSet.optedIn.get(a.getAddress(), ())
+        ]
+        groups = [
+            [
+                (
+                    holder,
+                    lambda sp, receiver=a.getAddress(): transaction.AssetTransferTxn(
+                        holder.getAddress(), sp, receiver, amount, assetID
+                    ),
+                )
+                for a in chunk
+            ]
+            for chunk in chunks(receivers)
+        ]
+        return [error for error in self._submit(groups) if error is not None]
+
+    def prepare(
+        self,
+        accountSet: AccountSet,
+        amount: int,
+        path: Optional[str] = None,
+    ) -> List[Exception]:
+        """Fund and opt in whatever part of the set is not done yet, saving
+        the set to ``path`` after each phase so an interrupted run resumes."""
+        errors = self.fund(accountSet, amount)
+        if path:
+            accountSet.save(path)
+        errors += self.optIn(accountSet)
+        if path:
+            accountSet.save(path)
+        return errors
+
+    def create(
+        self,
+        n: int,
+        assets: Sequence[int],
+        amount: int,
+        path: Optional[str] = None,
+    ) -> AccountSet:
+        """Generate ``n`` accounts, fund them and opt them in to ``assets``.
+
+        Raises:
+            RuntimeError: if any group failed; the set saved at ``path``
+                records what succeeded, and ``prepare`` resumes from it.
+        """
+        accountSet = AccountSet(generateAccounts(n), assets)
+        if path:
+            accountSet.save(path)
+        errors = self.prepare(accountSet, amount, path)
+        if errors:
+            raise RuntimeError(
+                "{} group(s) failed, first error: {}".format(len(errors), errors[0])
+            )
+        return accountSet
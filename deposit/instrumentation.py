@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from algosdk.v2client.algod import AlgodClient
+
+# seconds; roughly x2.5 steps from 1ms to 60s
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+ROUND_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Instrumentation:
+    """Collects latency histograms, counters and trace spans.
+
+    Args:
+        maxSpans: number of most recent spans kept for the Chrome trace export.
+    """
+
+    def __init__(self, maxSpans: int = 100_000) -> None:
+        self.lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = dict()
+        self.counters: Dict[Tuple[str, Labels], float] = dict()
+        self.spans: Deque[Dict[str, Any]] = deque(maxlen=maxSpans)
+        self.origin = time.perf_counter()
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+        **labels: str,
+    ) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def span(self, name: str, metric: str, **labels: str) -> Iterator[None]:
+        """Time the block into histogram ``metric`` and record a trace span."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe(metric, duration, **labels)
+            if error is not None:
+                self.increment(metric.replace("_seconds", "_errors_total"), **labels)
+            self.spans.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": dict(labels, error=error) if error else dict(labels),
+                }
+            )
+
+    def toPrometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        typed = set()
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append("# TYPE {} histogram".format(name))
+                typed.add(name)
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    "{}_bucket{} {}".format(
+                        name, _formatLabels(labels + (("le", le),)), cumulative
+                    )
+                )
+            lines.append("{}_sum{} {}".format(name, _formatLabels(labels), histogram.sum))
+            lines.append(
+                "{}_count{} {}".format(name, _formatLabels(labels), histogram.count)
+            )
+
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append("# TYPE {} counter".format(name))
+                typed.add(name)
+            lines.append("{}{} {}".format(name, _formatLabels(labels), value))
+
+        return "\n".join(lines) + "\n"
+
+    def toChromeTrace(self) -> str:
+        """Spans as Chrome trace-event JSON (load in chrome://tracing or Perfetto)."""
+        return json.dumps({"traceEvents": list(self.spans)})
+
+
+def _formatLabels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join('{}="{}"'.format(k, _escapeLabelValue(v)) for k, v in labels)
+        + "}"
+    )
+
+
+def _escapeLabelValue(value: Any) -> str:
+    # the text format requires backslash, double quote and newline escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class InstrumentedClient:
+    """Wraps an AlgodClient so every method call is timed as
+    ``algod_request_seconds{method=...}``. Anything else is passed through,
+    so it can be handed to every function that takes a ``client``."""
+
+    def __init__(self, client: AlgodClient, instrumentation: Instrumentation) -> None:
+        self._client = client
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        instrumentation = self._instrumentation
+
+        def timed(*args, **kwargs):
+            with instrumentation.span(name, "algod_request_seconds", method=name):
+                return attr(*args, **kwargs)
+
+        return timed
+
+
+# process-wide instrumentation used by the operations; None means disabled
+INSTRUMENTATION: Optional[Instrumentation] = None
+_DISABLED = nullcontext()
+
+
+def enable(instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+    global INSTRUMENTATION
+    INSTRUMENTATION = instrumentation or Instrumentation()
+    return INSTRUMENTATION
+
+
+def disable() -> None:
+    global INSTRUMENTATION
+    INSTRUMENTATION = None
+
+
+def phase(name: str, operation: str):
+    """Time an operation phase (build, sign, send, confirm, ...) when enabled.
+
+    When disabled this returns a shared no-op context manager.
+    """
+    if INSTRUMENTATION is None:
+        return _DISABLED
+    return INSTRUMENTATION.span(
+        operation + "." + name, "operation_phase_seconds", operation=operation, phase=name
+    )
+
+
+def observeRoundsToConfirm(rounds: int) -> None:
+    if INSTRUMENTATION is not None:
+        INSTRUMENTATION.observe("rounds_to_confirm", rounds, buckets=ROUND_BUCKETS)
@@ -0,0 +1,310 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from base64 import b64encode
+from queue import Empty, Queue
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from algosdk.future import transaction
+
+from .utils import PendingTxnResponse
+
+BUILT = "built"
+SENT = "sent"
+CONFIRMED = "confirmed"
+EXPIRED = "expired"
+FAILED = "failed"
+UNRESOLVED = (BUILT, SENT)
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    id TEXT PRIMARY KEY,
+    operation TEXT,
+    app_id INTEGER,
+    sender TEXT,
+    amounts TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    last_valid INTEGER,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    confirmed_round INTEGER,
+    inner_txns TEXT,
+    logs TEXT,
+    global_delta TEXT,
+    local_delta TEXT
+);
+CREATE TABLE IF NOT EXISTS txns (
+    txid TEXT PRIMARY KEY,
+    group_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT,
+    sender TEXT,
+    receiver TEXT
+);
+CREATE INDEX IF NOT EXISTS groups_app ON groups (app_id, created);
+CREATE INDEX IF NOT EXISTS groups_round ON groups (confirmed_round);
+CREATE INDEX IF NOT EXISTS groups_status ON groups (status);
+CREATE INDEX IF NOT EXISTS txns_group ON txns (group_id);
+CREATE INDEX IF NOT EXISTS txns_sender ON txns (sender);
+CREATE INDEX IF NOT EXISTS txns_receiver ON txns (receiver);
+"""
+
+INSERT_GROUP = """
+INSERT OR REPLACE INTO groups
+    (id, operation, app_id, sender, amounts, status, last_valid, created, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_TXN = """
+INSERT OR REPLACE INTO txns (txid, group_id, position, type, sender, receiver)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+UPDATE_STATUS = "UPDATE groups SET status = ?, error = ?, updated = ? WHERE id = ?"
+UPDATE_CONFIRMED = """
+UPDATE groups SET status = ?, updated = ?, confirmed_round = ?, inner_txns = ?,
+    logs = ?, global_delta = ?, local_delta = ?
+WHERE id = ?
+"""
+
+
+def _jsonDefault(value: Any) -> Any:
+    # msgpack responses carry addresses, notes and keys as raw bytes
+    if isinstance(value, bytes):
+        return b64encode(value).decode()
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, default=_jsonDefault)
+
+
+def _row(cursor: sqlite3.Cursor, row: Tuple) -> Dict[str, Any]:
+    record = {column[0]: value for column, value in zip(cursor.description, row)}
+    for key in ("amounts", "inner_txns", "logs", "global_delta", "local_delta"):
+        if record.get(key) is not None:
+            record[key] = json.loads(record[key])
+    return record
+
+
+class Journal:
+    """Local record of the groups we build, their submission status and
+    their confirmed results, kept in SQLite.
+
+    Each group is keyed by the txID of its last transaction, the one that
+    is waited on. Writes are queued and committed by a background thread
+    in batches of up to ``batchSize`` statements, at least every
+    ``flushInterval`` seconds; the database runs in WAL mode so queries
+    from other threads or processes do not block the writer. Queries see
+    committed writes only, call ``flush`` first to include queued ones.
+
+    Args:
+        path: database file.
+        batchSize: most statements committed in one transaction.
+        flushInterval: longest time a write waits in the queue.
+    """
+
+    def __init__(
+        self, path: str, batchSize: int = 512, flushInterval: float = 0.2
+    ) -> None:
+        self.path = path
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self.queue: "Queue[Any]" = Queue()
+        self.local = threading.local()
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # WAL is durable across crashes of the process with NORMAL syncing
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _write(self) -> None:
+        connection = self._connect()
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flushInterval
+            while len(batch) < self.batchSize:
+                try:
+                    batch.append(
+                        self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    )
+                except Empty:
+                    break
+
+            statements = []
+            flushed = []
+            for item in batch:
+                if item is None:
+                    closing = True
+                elif isinstance(item, threading.Event):
+                    flushed.append(item)
+                else:
+                    statements.append(item)
+            try:
+                with connection:
+                    for statement in statements:
+                        connection.execute(*statement)
+            except Exception:
+                # the batch is rolled back; keep the writer alive for the rest
+                log.exception("journal dropped a batch of %d writes", len(statements))
+            for event in flushed:
+                event.set()
+        connection.close()
+
+    def _put(self, sql: str, params: Sequence[Any]) -> None:
+        self.queue.put((sql, params))
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is committed."""
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.writer.join()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def built(
+        self,
+        signedTxns: List[transaction.SignedTransaction],
+        operation: Optional[str] = None,
+        appID: Optional[int] = None,
+        amounts: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Record a newly signed group; return its id."""
+        txids = [s.get_txid() for s in signedTxns]
+        groupID = txids[-1]
+        first = signedTxns[0].transaction
+        now = time.time()
+        self._put(
+            INSERT_GROUP,
+            (
+                groupID,
+                operation,
+                appID,
+                first.sender,
+                _dumps(amounts),
+                BUILT,
+                first.last_valid_round,
+                now,
+                now,
+            ),
+        )
+        for position, (txid, signed) in enumerate(zip(txids, signedTxns)):
+            txn = signed.transaction
+            self._put(
+                INSERT_TXN,
+                (
+                    txid,
+                    groupID,
+                    position,
+                    txn.type,
+                    txn.sender,
+                    getattr(txn, "receiver", None),
+                ),
+            )
+        return groupID
+
+    def sent(self, groupID: str) -> None:
+        self._put(UPDATE_STATUS, (SENT, None, time.time(), groupID))
+
+    def failed(self, groupID: str, error: Any, status: str = FAILED) -> None:
+        self._put(UPDATE_STATUS, (status, str(error), time.time(), groupID))
+
+    def confirmed(self, groupID: str, response: PendingTxnResponse) -> None:
+        self._put(
+            UPDATE_CONFIRMED,
+            (
+                CONFIRMED,
+                time.time(),
+                response.confirmedRound,
+                _dumps(response.innerTxns or None),
+                _dumps([log.hex() for log in response.logs] or None),
+                _dumps(response.globalStateDelta),
+                _dumps(response.localStateDelta),
+                groupID,
+            ),
+        )
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self._connect()
+        cursor = connection.execute(sql, params)
+        return [_row(cursor, row) for row in cursor.fetchall()]
+
+    def group(self, groupID: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM groups WHERE id = ?", (groupID,))
+        return rows[0] if rows else None
+
+    def groupOf(self, txid: str) -> Optional[Dict[str, Any]]:
+        """The group containing ``txid``, whichever position it is at."""
+        rows = self._query(
+            "SELECT g.* FROM txns t JOIN groups g ON g.id = t.group_id"
+            " WHERE t.txid = ?",
+            (txid,),
+        )
+        return rows[0] if rows else None
+
+    def txns(self, groupID: str) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT * FROM txns WHERE group_id = ? ORDER BY position", (groupID,)
+        )
+
+    def byAccount(self, address: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Groups sending from or paying to ``address``, newest first."""
+        return self._query(
+            "SELECT * FROM groups WHERE id IN ("
+            " SELECT group_id FROM txns WHERE sender = ?"
+            " UNION SELECT group_id FROM txns WHERE receiver = ?)"
+            " ORDER BY created DESC LIMIT ?",
+            (address, address, limit),
+        )
+
+    def byPool(self, appID: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Groups calling app ``appID``, newest first."""
+        return self._query(
+            "SELECT * FROM groups WHERE app_id = ? ORDER BY created DESC LIMIT ?",
+            (appID, limit),
+        )
+
+    def byRound(self, first: int, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Groups confirmed in rounds ``first`` to ``last`` inclusive."""
+        return self._query(
+            "SELECT * FROM groups WHERE confirmed_round BETWEEN ? AND ?"
+            " ORDER BY confirmed_round",
+            (first, first if last is None else last),
+        )
+
+    def unresolved(self) -> List[Dict[str, Any]]:
+        """Groups built or sent whose outcome was never recorded, e.g. after
+        a crash; compare ``last_valid`` with the current round to tell
+        whether they can still land. A group stays ``sent`` until it
+        confirms or the round passes its ``last_valid`` and it is marked
+        ``expired``, so one that can still land is always listed here."""
+        return self._query(
+            "SELECT * FROM groups WHERE status IN (?, ?) ORDER BY created", UNRESOLVED
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._query("SELECT status, COUNT(*) AS n FROM groups GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
@@ -0,0 +1,462 @@
+"""Load generator: deploys pools and drives simulated traders and liquidity
+providers against them, then reports throughput, confirmation latency and
+rejection rates.
+
+    python -m deposit.loadgen --pools 2 --traders 16 --lps 4 --duration 60
+
+Without --algod-address an in-process stand-in node (deposit.standin) is
+started; otherwise DISPENSER_MNEMONIC must name a funded account.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from algosdk import account
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+from .factory import AccountFactory
+from .operations import (
+    createApp,
+    getSupplyTxns,
+    getSwapTxns,
+    getWithdrawTxns,
+    optInToPoolToken,
+    setupApp,
+    supply,
+)
+from .pipeline import SubmissionPipeline
+from .resources import createDummyAsset, getDispenser, getTemporaryAccount
+from .submission import NonceAllocator, applyNonce
+from .transport import PooledAlgodClient
+from .utils import (
+    PendingTxnResponse,
+    PoolError,
+    getAppGlobalState,
+)
+
+SWAP = "swap"
+SUPPLY = "supply"
+WITHDRAW = "withdraw"
+KINDS = (SWAP, SUPPLY, WITHDRAW)
+TXNS_PER_GROUP = {SWAP: 3, SUPPLY: 4, WITHDRAW: 3}
+
+TOKEN_TOTAL = 10 ** 15
+
+
+class Pool:
+    __slots__ = ("appID", "appGlobalState", "tokenA", "tokenB", "poolToken", "price")
+
+    def __init__(self, appID: int, appGlobalState, price: float) -> None:
+        self.appID = appID
+        self.appGlobalState = appGlobalState
+        self.tokenA = appGlobalState[b"token_a_key"]
+        self.tokenB = appGlobalState[b"token_b_key"]
+        self.poolToken = appGlobalState[b"pool_token_key"]
+        # initial token B per token A
+        self.price = price
+
+
+class Actor:
+    """A trader or liquidity provider bound to one pool."""
+
+    def __init__(self, account: Account, pool: Pool) -> None:
+        self.account = account
+        self.pool = pool
+        self.poolTokens = 0
+        self.lock = threading.Lock()
+
+    def takePoolTokens(self, fraction: float) -> int:
+        """Set aside ``fraction`` of the actor's pool tokens for a withdraw,
+        at least one while it holds any."""
+        with self.lock:
+            amount = min(self.poolTokens, max(1, int(self.poolTokens * fraction)))
+            self.poolTokens -= amount
+            return amount
+
+    def addPoolTokens(self, amount: int) -> None:
+        with self.lock:
+            self.poolTokens += amount
+
+
+def parseMix(mix: str) -> Dict[str, float]:
+    """Parse "swap=0.8,supply=0.15,withdraw=0.05" into normalized weights."""
+    weights = {kind: 0.0 for kind in KINDS}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in weights:
+            raise ValueError("Unknown action {!r} in mix".format(kind))
+        weights[kind.strip()] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Mix weights must add up to more than 0")
+    return {kind: weight / total for kind, weight in weights.items()}
+
+
+def deployPool(
+    client: AlgodClient,
+    dispenser: Account,
+    feeBps: int,
+    minIncrement: int,
+    liquidityA: int,
+    price: float,
+    fund: int,
+) -> Tuple[Pool, Account]:
+    """Create both tokens and the app, set it up and supply initial liquidity."""
+    creator = getTemporaryAccount(client, dispenser, fund)
+    tokenA = createDummyAsset(client, TOKEN_TOTAL, creator)
+    tokenB = createDummyAsset(client, TOKEN_TOTAL, creator)
+
+    appID = createApp(client, creator, tokenA, tokenB, feeBps, minIncrement)
+    setupApp(client, appID, creator, tokenA, tokenB)
+    optInToPoolToken(client, appID, creator)
+    supply(client, appID, liquidityA, int(liquidityA * price), creator)
+
+    return Pool(appID, getAppGlobalState(client, appID), price), creator
+
+
+def setupActors(
+    factory: AccountFactory,
+    creator: Account,
+    pool: Pool,
+    count: int,
+    tokens: int,
+    fund: int,
+) -> List[Actor]:
+    """Create ``count`` funded accounts opted in to the pool's assets, each
+    holding ``tokens`` of token A and the same value of token B."""
+    accountSet = factory.create(count, [pool.tokenA, pool.tokenB, pool.poolToken], fund)
+    errors = factory.distribute(accountSet, creator, pool.tokenA, tokens)
+    errors += factory.distribute(
+        accountSet, creator, pool.tokenB, int(tokens * pool.price)
+    )
+    if errors:
+        raise RuntimeError("Token distribution failed: {}".format(errors[0]))
+    return [Actor(a, pool) for a in accountSet]
+
+
+class LoadGenerator:
+    """Submits randomly drawn actions through a SubmissionPipeline and
+    records per-group latency and outcome.
+
+    Latency is measured from when a group is built and signed (right before
+    its first send) to its confirmation, so time spent queued behind the
+    rate limiter is not counted.
+    """
+
+    def __init__(
+        self,
+        pipeline: SubmissionPipeline,
+        traders: List[Actor],
+        lps: List[Actor],
+        mix: Dict[str, float],
+        swapRange: Tuple[int, int],
+        supplyRange: Tuple[int, int],
+        seed: Optional[int] = None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.actors = {SWAP: traders, SUPPLY: lps, WITHDRAW: lps}
+        self.kinds = [kind for kind in KINDS if mix[kind] > 0 and self.actors[kind]]
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.swapRange = swapRange
+        self.supplyRange = supplyRange
+        self.random = random.Random(seed)
+        self.allocator = NonceAllocator()
+
+        self.lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.confirmed = {kind: 0 for kind in KINDS}
+        self.rejected = {kind: 0 for kind in KINDS}
+        self.errors = {kind: 0 for kind in KINDS}
+        self.submitted = {kind: 0 for kind in KINDS}
+        self.confirmedTxns = 0
+
+    def _builder(
+        self, kind: str, actor: Actor, started: List[float], withdrawn: List[int]
+    ):
+        pool = actor.pool
+        address = actor.account.getAddress()
+
+        if kind == SWAP:
+            tokenId = self.random.choice((pool.tokenA, pool.tokenB))
+            amount = self.random.randint(*self.swapRange)
+            if tokenId == pool.tokenB:
+                amount = max(1, int(amount * pool.price))
+
+            def txns(sp):
+                return getSwapTxns(
+                    pool.appID, pool.appGlobalState, tokenId, amount, address, sp
+                )
+
+        elif kind == SUPPLY:
+            qA = self.random.randint(*self.supplyRange)
+            # a little extra B, refunded by the pool at the current price
+            qB = int(qA * pool.price * 1.02) + 1
+
+            def txns(sp):
+                return getSupplyTxns(
+                    pool.appID, pool.appGlobalState, qA, qB, address, sp
+                )
+
+        else:
+            amount = actor.takePoolTokens(self.random.uniform(0.1, 0.5))
+            withdrawn[0] = amount
+
+            def txns(sp):
+                return getWithdrawTxns(
+                    pool.appID, pool.appGlobalState, amount, address, sp
+                )
+
+        def build(sp: transaction.SuggestedParams) -> List[Any]:
+            group = txns(sp)
+            applyNonce(group, self.allocator)
+            transaction.assign_group_id(group)
+            signed = [actor.account.sign(txn) for txn in group]
+            started[0] = time.monotonic()
+            return signed
+
+        return build
+
+    def submitOne(self) -> Optional[Future]:
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        actor = self.random.choice(self.actors[kind])
+        if kind == WITHDRAW and actor.poolTokens == 0:
+            kind = SUPPLY
+
+        started = [time.monotonic()]
+        withdrawn = [0]
+        future = self.pipeline.submit(self._builder(kind, actor, started, withdrawn))
+        with self.lock:
+            self.submitted[kind] += 1
+        future.add_done_callback(
+            lambda f: self._done(kind, actor, started[0], withdrawn[0], f)
+        )
+        return future
+
+    def _done(
+        self,
+        kind: str,
+        actor: Actor,
+        started: float,
+        withdrawn: int,
+        future: Future,
+    ) -> None:
+        elapsed = time.monotonic() - started
+        error = future.exception()
+        with self.lock:
+            if error is None:
+                self.confirmed[kind] += 1
+                self.confirmedTxns += TXNS_PER_GROUP[kind]
+                self.latencies.append(elapsed)
+            elif isinstance(error, PoolError) or (
+                isinstance(error, AlgodHTTPError)
+                and getattr(error, "code", None) == 400
+            ):
+                # refused by the node or the approval program
+                self.rejected[kind] += 1
+            else:
+                self.errors[kind] += 1
+
+        if error is None and kind == SUPPLY:
+            response: PendingTxnResponse = future.result()
+            for inner in response.innerTxns:
+                txn = inner["txn"]["txn"]
+                if txn.get("xaid") == actor.pool.poolToken:
+                    actor.addPoolTokens(txn.get("aamt", 0))
+        elif error is not None and kind == WITHDRAW:
+            # the group never executed, so the tokens are still the actor's
+            actor.addPoolTokens(withdrawn)
+
+    def run(self, duration: float) -> float:
+        """Keep the pipeline busy for ``duration`` seconds, then drain it.
+        Returns the wall time from the first submission until the last
+        group resolved."""
+        start = time.monotonic()
+        while time.monotonic() - start < duration:
+            self.submitOne()
+        self.pipeline.close()
+        return time.monotonic() - start
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        groups = sum(self.confirmed.values())
+        attempted = sum(self.submitted.values())
+        return {
+            "elapsed": elapsed,
+            "submitted": dict(self.submitted),
+            "confirmed": dict(self.confirmed),
+            "rejected": dict(self.rejected),
+            "errors": dict(self.errors),
+            "tps": self.confirmedTxns / elapsed,
+            "groupsPerSecond": groups / elapsed,
+            "confirmP50": float(np.percentile(latencies, 50)),
+            "confirmP99": float(np.percentile(latencies, 99)),
+            "rejectedRate": (
+                sum(self.rejected.values()) / attempted if attempted else 0.0
+            ),
+            "errorRate": sum(self.errors.values()) / attempted if attempted else 0.0,
+        }
+
+
+def printReport(report: Dict[str, Any]) -> None:
+    print("elapsed          {:10.1f} s".format(report["elapsed"]))
+    print("sustained TPS    {:10.1f} txn/s".format(report["tps"]))
+    print("groups           {:10.1f} /s".format(report["groupsPerSecond"]))
+    print("confirm p50      {:10.3f} s".format(report["confirmP50"]))
+    print("confirm p99      {:10.3f} s".format(report["confirmP99"]))
+    print("rejected         {:10.2%}".format(report["rejectedRate"]))
+    print("errors           {:10.2%}".format(report["errorRate"]))
+    print(
+        "{:10} {:>10} {:>10} {:>10} {:>10}".format(
+            "action", "submitted", "confirmed", "rejected", "errors"
+        )
+    )
+    for kind in KINDS:
+        print(
+            "{:10} {:>10} {:>10} {:>10} {:>10}".format(
+                kind,
+                report["submitted"][kind],
+                report["confirmed"][kind],
+                report["rejected"][kind],
+                report["errors"][kind],
+            )
+        )
+
+
+def parseArgs(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--algod-address", help="algod URL; default: in-process stand-in node"
+    )
+    parser.add_argument("--algod-token", default="a" * 64)
+    parser.add_argument(
+        "--block-interval",
+        type=float,
+        default=1.0,
+        help="stand-in node round time in seconds",
+    )
+    parser.add_argument("--pools", type=int, default=1)
+    parser.add_argument("--traders", type=int, default=8, help="traders per pool")
+    parser.add_argument(
+        "--lps", type=int, default=2, help="liquidity providers per pool"
+    )
+    parser.add_argument(
+        "--mix",
+        default="swap=0.8,supply=0.15,withdraw=0.05",
+        help="relative weights of swap, supply and withdraw groups",
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument(
+        "--rate", type=float, default=50.0, help="max groups sent per second"
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="sender threads")
+    parser.add_argument("--fee-bps", type=int, default=30)
+    parser.add_argument("--min-increment", type=int, default=1000)
+    parser.add_argument(
+        "--liquidity",
+        type=int,
+        default=10 ** 9,
+        help="initial token A supplied to each pool",
+    )
+    parser.add_argument(
+        "--price", type=float, default=2.0, help="initial token B per token A"
+    )
+    parser.add_argument(
+        "--fund",
+        type=int,
+        default=10_000_000,
+        help="microAlgos given to each simulated account",
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parseArgs(argv)
+    poolSize = max(args.concurrency * 2, 8)
+
+    if args.algod_address:
+        client = PooledAlgodClient(
+            args.algod_token, args.algod_address, maxPerHost=poolSize
+        )
+        dispenser = getDispenser()
+    else:
+        from .standin import StandInNode, serve
+
+        node = StandInNode(args.block_interval)
+        _, address = serve(node)
+        client = PooledAlgodClient(args.algod_token, address, maxPerHost=poolSize)
+        dispenser = Account(account.generate_account()[0])
+        node.fund(dispenser.getAddress(), 10 ** 15)
+
+    mix = parseMix(args.mix)
+    tokens = args.liquidity // 10
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        print("deploying {} pool(s)...".format(args.pools))
+        deployed = list(
+            executor.map(
+                lambda _: deployPool(
+                    client,
+                    dispenser,
+                    args.fee_bps,
+                    args.min_increment,
+                    args.liquidity,
+                    args.price,
+                    args.fund,
+                ),
+                range(args.pools),
+            )
+        )
+
+    print("setting up {} traders and {} LPs per pool...".format(args.traders, args.lps))
+    factory = AccountFactory(client, dispenser, args.concurrency, args.rate)
+    traders: List[Actor] = []
+    lps: List[Actor] = []
+    for pool, creator in deployed:
+        actors = setupActors(
+            factory, creator, pool, args.traders + args.lps, tokens, args.fund
+        )
+        traders += actors[: args.traders]
+        lps += actors[args.traders :]
+
+    pipeline = SubmissionPipeline(
+        client,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        maxQueue=args.concurrency * 2,
+        # rejected groups are final; only transport errors are retried
+        maxAttempts=3,
+    )
+    generator = LoadGenerator(
+        pipeline,
+        traders,
+        lps,
+        mix,
+        swapRange=(args.min_increment, max(args.min_increment, tokens // 1000)),
+        supplyRange=(args.min_increment, max(args.min_increment, tokens // 100)),
+        seed=args.seed,
+    )
+
+    print("running for {:.0f}s...".format(args.duration))
+    elapsed = generator.run(args.duration)
+    report = generator.report(elapsed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        printReport(report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
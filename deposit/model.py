@@ -0,0 +1,346 @@
+"""Python model of the integer math in deposit/contracts/contracts.py.
+
+Every function here returns exactly what the approval program computes, and
+fails (raises ContractReject, or reports ok=False in the vectorized
+variants) in exactly the cases where the program would panic or reject:
+uint64 overflow on ``*``/``+``, underflow on ``-``, division by zero, a
+WideRatio whose intermediate product does not fit in 128 bits or whose
+result does not fit in 64 bits, and the explicit Asserts.
+"""
+from math import isqrt as _isqrt
+from typing import Tuple, Union
+
+import numpy as np
+
+UINT64_MAX = 2 ** 64 - 1
+UINT128_LIMIT = 2 ** 128
+SCALING_FACTOR = 10 ** 13
+POOL_TOKEN_DEFAULT_AMOUNT = 10 ** 13
+FEE_DENOMINATOR = 10_000
+# cumulative prices are UQ64.64 and wrap around at 2^128
+PRICE_ONE = 2 ** 64
+PRICE_CUMULATIVE_MODULUS = 2 ** 128
+
+ArrayLike = Union[int, np.ndarray]
+
+
+class ContractReject(Exception):
+    """Raised when the approval program would reject or panic."""
+
+
+def _checkUint64(value: int) -> int:
+    if value < 0 or value > UINT64_MAX:
+        raise ContractReject("uint64 overflow")
+    return value
+
+
+def xMulYDivZ(x: int, y: int, z: int) -> int:
+    """WideRatio([x, y, SCALING_FACTOR], [z, SCALING_FACTOR])."""
+    if z == 0:
+        raise ContractReject("division by zero")
+    numerator = x * y * SCALING_FACTOR
+    if numerator >= UINT128_LIMIT:
+        raise ContractReject("WideRatio numerator overflow")
+    return _checkUint64(numerator // (z * SCALING_FACTOR))
+
+
+def assessFee(amount: int, fee_bps: int) -> int:
+    return xMulYDivZ(amount, _checkUint64(FEE_DENOMINATOR - fee_bps), FEE_DENOMINATOR)
+
+
+def computeOtherTokenOutputPerGivenTokenInput(
+    input_amount: int,
+    previous_given_token_amount: int,
+    previous_other_token_amount: int,
+    fee_bps: int,
+) -> int:
+    k = _checkUint64(previous_given_token_amount * previous_other_token_amount)
+    amount_sub_fee = assessFee(input_amount, fee_bps)
+    denominator = _checkUint64(previous_given_token_amount + amount_sub_fee)
+    if denominator == 0:
+        raise ContractReject("division by zero")
+    return _checkUint64(previous_other_token_amount - k // denominator)
+
+
+def computeZapSwapAmount(
+    input_amount: int, previous_given_token_amount: int, fee_bps: int
+) -> int:
+    """Part of a single-sided zap input that is swapped before supplying."""
+    fee_num = _checkUint64(FEE_DENOMINATOR - fee_bps)
+    if fee_num == 0:
+        raise ContractReject("division by zero")
+    b = previous_given_token_amount * (FEE_DENOMINATOR + fee_num)
+    discriminant = (
+        b * b
+        + 4 * FEE_DENOMINATOR * fee_num * input_amount * previous_given_token_amount
+    )
+    return _checkUint64((_isqrt(discriminant) - b) // (2 * fee_num))
+
+
+def accumulatePrice(
+    cumulative: int, numerator: int, denominator: int, elapsed: int
+) -> int:
+    """Cumulative price after ``numerator / denominator`` held for ``elapsed``
+    seconds, as updatePriceAccumulators computes it."""
+    if denominator == 0:
+        raise ContractReject("division by zero")
+    price = numerator * PRICE_ONE // denominator
+    return (cumulative + price * elapsed) % PRICE_CUMULATIVE_MODULUS
+
+
+def initialMint(qA: int, qB: int) -> int:
+    """Sqrt(qA * qB) minted to the first supplier."""
+    return _isqrt(_checkUint64(qA * qB))
+
+
+class PoolModel:
+    """State of a single pool as the approval program sees it.
+
+    Reserves are the app's holdings of token A and B before a group is
+    applied; ``outstanding`` is pool_tokens_outstanding_key.
+    """
+
+    __slots__ = ("reserveA", "reserveB", "outstanding", "feeBps", "minIncrement")
+
+    def __init__(
+        self,
+        feeBps: int,
+        minIncrement: int,
+        reserveA: int = 0,
+        reserveB: int = 0,
+        outstanding: int = 0,
+    ) -> None:
+        self.feeBps = feeBps
+        self.minIncrement = minIncrement
+        self.reserveA = reserveA
+        self.reserveB = reserveB
+        self.outstanding = outstanding
+
+    def copy(self) -> "PoolModel":
+        return PoolModel(
+            self.feeBps,
+            self.minIncrement,
+            self.reserveA,
+            self.reserveB,
+            self.outstanding,
+        )
+
+    def supply(self, qA: int, qB: int) -> Tuple[int, int, int]:
+        """Apply a supply group. Returns (minted, refundA, refundB)."""
+        if self.outstanding >= POOL_TOKEN_DEFAULT_AMOUNT:
+            raise ContractReject("app holds no pool tokens")
+        if qA <= 0 or qB <= 0:
+            raise ContractReject("token transfer must be positive")
+        if qA < self.minIncrement or qB < self.minIncrement:
+            raise ContractReject("amount below min increment")
+        _checkUint64(self.reserveA + qA)
+        _checkUint64(self.reserveB + qB)
+
+        if self.reserveA == 0 or self.reserveB == 0:
+            minted, refundA, refundB = initialMint(qA, qB), 0, 0
+        else:
+            minted, refundA, refundB = self._adjustedSupply(qA, qB)
+
+        if minted > POOL_TOKEN_DEFAULT_AMOUNT - self.outstanding:
+            raise ContractReject("app pool token balance exhausted")
+
+        self.reserveA += qA - refundA
+        self.reserveB += qB - refundB
+        self.outstanding = _checkUint64(self.outstanding + minted)
+        return minted, refundA, refundB
+
+    def _adjustedSupply(self, qA: int, qB: int) -> Tuple[int, int, int]:
+        # tryTakeAdjustedAmounts keeping all of A, then keeping all of B
+        correspondingB = xMulYDivZ(qA, self.reserveB, self.reserveA)
+        if correspondingB > 0 and qB >= correspondingB:
+            minted = xMulYDivZ(self.outstanding, qA, self.reserveA)
+            return minted, 0, qB - correspondingB
+
+        correspondingA = xMulYDivZ(qB, self.reserveA, self.reserveB)
+        if correspondingA > 0 and qA >= correspondingA:
+            minted = xMulYDivZ(self.outstanding, qB, self.reserveB)
+            return minted, qA - correspondingA, 0
+
+        raise ContractReject("supplied ratio cannot be matched")
+
+    def withdraw(self, poolTokenAmount: int) -> Tuple[int, int]:
+        """Apply a withdraw group. Returns (outA, outB)."""
+        if self.reserveA <= 0 or self.reserveB <= 0:
+            raise ContractReject("pool is empty")
+        if poolTokenAmount <= 0:
+            raise ContractReject("token transfer must be positive")
+        if self.outstanding == 0:
+            raise ContractReject("no pool tokens outstanding")
+
+        outA = xMulYDivZ(self.reserveA, poolTokenAmount, self.outstanding)
+        outB = xMulYDivZ(self.reserveB, poolTokenAmount, self.outstanding)
+        if outA == 0 or outB == 0:
+            raise ContractReject("withdrawal rounds to zero")
+        if outA > self.reserveA or outB > self.reserveB:
+            raise ContractReject("insufficient reserves")
+        if poolTokenAmount > self.outstanding:
+            raise ContractReject("uint64 underflow")
+
+        self.reserveA -= outA
+        self.reserveB -= outB
+        self.outstanding -= poolTokenAmount
+        return outA, outB
+
+    def zap(self, givenIsA: bool, amount: int) -> Tuple[int, int, int]:
+        """Apply a zap group of ``amount`` of token A (or B) alone.
+
+        Returns (minted, swapped, swapOutput): part of the input is swapped
+        inside the pool and the rest is supplied with the swap output.
+        """
+        if self.outstanding == 0:
+            raise ContractReject("no pool tokens outstanding")
+        if amount <= 0:
+            raise ContractReject("token transfer must be positive")
+        if amount < self.minIncrement:
+            raise ContractReject("amount below min increment")
+
+        given, other = (
+            (self.reserveA, self.reserveB) if givenIsA else (self.reserveB, self.reserveA)
+        )
+        _checkUint64(given + amount)
+        if given == 0 or other == 0:
+            raise ContractReject("pool is empty")
+
+        swapped = computeZapSwapAmount(amount, given, self.feeBps)
+        out = computeOtherTokenOutputPerGivenTokenInput(
+            swapped, given, other, self.feeBps
+        )
+        if not (0 < out < other):
+            raise ContractReject("swap output out of range")
+        minted = min(
+            xMulYDivZ(self.outstanding, amount - swapped, given + swapped),
+            xMulYDivZ(self.outstanding, out, other - out),
+        )
+        if minted == 0:
+            raise ContractReject("zap rounds to zero")
+        if minted > POOL_TOKEN_DEFAULT_AMOUNT - self.outstanding:
+            raise ContractReject("app pool token balance exhausted")
+
+        if givenIsA:
+            self.reserveA += amount
+        else:
+            self.reserveB += amount
+        self.outstanding = _checkUint64(self.outstanding + minted)
+        return minted, swapped, out
+
+    def swap(self, givenIsA: bool, amount: int) -> int:
+        """Apply a swap group of ``amount`` of token A (or B). Returns the output."""
+        if self.outstanding == 0:
+            raise ContractReject("no pool tokens outstanding")
+        if amount <= 0:
+            raise ContractReject("token transfer must be positive")
+
+        given, other = (
+            (self.reserveA, self.reserveB) if givenIsA else (self.reserveB, self.reserveA)
+        )
+        _checkUint64(given + amount)
+        out = computeOtherTokenOutputPerGivenTokenInput(
+            amount, given, other, self.feeBps
+        )
+        if not (0 < out < other):
+            raise ContractReject("swap output out of range")
+
+        if givenIsA:
+            self.reserveA += amount
+            self.reserveB -= out
+        else:
+            self.reserveB += amount
+            self.reserveA -= out
+        return out
+
+
+# Vectorized variants. Inputs broadcast against each other; each returns the
+# result together with a boolean mask of elements the contract would accept.
+# Values of failed elements are unspecified.
+
+_MAX = np.uint64(UINT64_MAX)
+
+
+def _u64(*values: ArrayLike) -> Tuple[np.ndarray, ...]:
+    return tuple(np.asarray(v, dtype=np.uint64) for v in values)
+
+
+def wideRatio(x: ArrayLike, y: ArrayLike, z: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized xMulYDivZ.
+
+    Products that fit in 64 bits are computed natively; the (rare) elements
+    whose product overflows fall back to exact Python integers.
+    """
+    x, y, z = np.broadcast_arrays(*_u64(x, y, z))
+    result = np.zeros(x.shape, dtype=np.uint64)
+    ok = np.array(z != 0)
+
+    safeX = np.where(x == 0, np.uint64(1), x)
+    wide = y > _MAX // safeX
+    fast = ok & ~wide
+    result[fast] = x[fast] * y[fast] // z[fast]
+
+    for i in zip(*np.nonzero(ok & wide)):
+        try:
+            result[i] = xMulYDivZ(int(x[i]), int(y[i]), int(z[i]))
+        except ContractReject:
+            ok[i] = False
+
+    return result, ok
+
+
+def checkedMul(x: ArrayLike, y: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    x, y = _u64(x, y)
+    safeX = np.where(x == 0, np.uint64(1), x)
+    return x * y, y <= _MAX // safeX
+
+
+def checkedAdd(x: ArrayLike, y: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    x, y = _u64(x, y)
+    return x + y, y <= _MAX - x
+
+
+def isqrt(n: ArrayLike) -> np.ndarray:
+    """Exact floor square root of uint64 values."""
+    (n,) = _u64(n)
+    root = np.floor(np.sqrt(n.astype(np.float64))).astype(np.uint64)
+    root = np.minimum(root, np.uint64(2 ** 32 - 1))
+    for _ in range(2):
+        tooBig = root * root > n
+        root = np.where(tooBig, root - np.uint64(1), root)
+        nxt = root + np.uint64(1)
+        tooSmall = nxt <= n // nxt
+        root = np.where(tooSmall, nxt, root)
+    return root
+
+
+def assessFeeBatch(amount: ArrayLike, fee_bps: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized assessFee. Splitting by the denominator keeps it in 64 bits."""
+    amount, fee_bps = _u64(amount, fee_bps)
+    ok = fee_bps <= FEE_DENOMINATOR
+    feeNum = np.where(ok, np.uint64(FEE_DENOMINATOR) - fee_bps, np.uint64(0))
+    denominator = np.uint64(FEE_DENOMINATOR)
+    return (
+        amount // denominator * feeNum + amount % denominator * feeNum // denominator,
+        ok,
+    )
+
+
+def swapOutputBatch(
+    amount: ArrayLike, given: ArrayLike, other: ArrayLike, fee_bps: ArrayLike
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized computeOtherTokenOutputPerGivenTokenInput plus the swap Asserts.
+
+    ``given`` and ``other`` are reserves before the trade.
+    """
+    amount, given, other, fee_bps = _u64(amount, given, other, fee_bps)
+    k, ok = checkedMul(given, other)
+    amountSubFee, feeOk = assessFeeBatch(amount, fee_bps)
+    denominator, addOk = checkedAdd(given, amountSubFee)
+    ok = ok & feeOk & addOk & (denominator != 0) & (amount > 0)
+    ok = ok & checkedAdd(given, amount)[1]
+
+    safeDenominator = np.where(ok, denominator, np.uint64(1))
+    out = other - k // safeDenominator
+    ok = ok & (out > 0) & (out < other)
+    return out, ok
@@ -0,0 +1,284 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .pipeline import LANDED, RETRIABLE, classifyError
+
+# methods that submit transactions and are sent to several nodes at once
+BROADCAST_METHODS = ("send_transaction", "send_transactions", "send_raw_transaction")
+
+
+class NodeState:
+    """Health of one algod endpoint as seen by a ClientPool."""
+
+    __slots__ = ("client", "name", "latency", "lastRound", "failures", "downUntil")
+
+    def __init__(self, client: AlgodClient, name: str) -> None:
+        self.client = client
+        self.name = name
+        self.latency: Optional[float] = None
+        self.lastRound = 0
+        self.failures = 0
+        self.downUntil = 0.0
+
+    def observe(self, seconds: float, alpha: float) -> None:
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += alpha * (seconds - self.latency)
+        self.failures = 0
+
+    def observeRound(self, round: int) -> None:
+        if round > self.lastRound:
+            self.lastRound = round
+
+    def isUp(self, now: float) -> bool:
+        return now >= self.downUntil
+
+
+class ClientPool:
+    """Routes algod calls across several nodes.
+
+    Reads go to the fastest node within ``maxLag`` rounds of the most recent
+    round seen on any node; a node that fails with a connection, timeout or
+    5xx error is taken out of rotation for a cooldown and the call is retried
+    on the next best node. Transaction submissions are broadcast to the
+    ``broadcast`` best nodes and succeed if any of them accepts the group.
+    The nodes that accepted a group sent with ``send_transaction(s)`` are
+    remembered, and ``pending_transaction_info`` for its transactions asks
+    only them, since another node may not have seen the group yet.
+
+    Any other attribute is forwarded to the chosen node's client, so the pool
+    can be passed as ``client`` to every function in deposit.operations.
+
+    Args:
+        clients: one AlgodClient per node.
+        maxLag: rounds a node may trail the tip and still serve reads.
+        broadcast: number of nodes each submission is sent to.
+        cooldown: base seconds a failed node is skipped; doubles per failure.
+        alpha: smoothing factor of the latency moving average.
+        maxPinned: transactions whose accepting nodes are remembered.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[AlgodClient],
+        maxLag: int = 2,
+        broadcast: int = 2,
+        cooldown: float = 5.0,
+        alpha: float = 0.2,
+        maxPinned: int = 100_000,
+    ) -> None:
+        if not clients:
+            raise ValueError("ClientPool needs at least one client")
+        self.nodes = [
+            NodeState(client, getattr(client, "algod_address", str(i)))
+            for i, client in enumerate(clients)
+        ]
+        self.maxLag = maxLag
+        self.broadcast = max(1, broadcast)
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.maxPinned = maxPinned
+        # txID -> nodes that accepted its group, oldest first
+        self.pinned: "OrderedDict[str, List[NodeState]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=len(self.nodes))
+        self.stopped = threading.Event()
+        self.monitor: Optional[threading.Thread] = None
+
+    def ranked(self) -> List[NodeState]:
+        """Nodes in routing order: in-sync and up first, by latency."""
+        now = time.monotonic()
+        with self.lock:
+            tip = max(node.lastRound for node in self.nodes)
+
+            def key(node: NodeState):
+                return (
+                    not node.isUp(now),
+                    node.lastRound + self.maxLag < tip,
+                    node.latency if node.latency is not None else 0.0,
+                )
+
+            return sorted(self.nodes, key=key)
+
+    def _markDown(self, node: NodeState) -> None:
+        with self.lock:
+            node.failures += 1
+            node.downUntil = time.monotonic() + self.cooldown * 2 ** (node.failures - 1)
+
+    def _call(self, node: NodeState, name: str, args, kwargs) -> Any:
+        start = time.perf_counter()
+        result = getattr(node.client, name)(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            node.observe(elapsed, self.alpha)
+            round = _roundOf(result)
+            if round is not None:
+                node.observeRound(round)
+        return result
+
+    def _route(
+        self,
+        name: str,
+        args,
+        kwargs,
+        nodes: Optional[List[NodeState]] = None,
+        skipMissing: bool = False,
+    ) -> Any:
+        """Call the first of ``nodes`` (default: all, ranked) that answers;
+        with ``skipMissing`` a 404 also moves on to the next node."""
+        error: Optional[Exception] = None
+        for node in self.ranked() if nodes is None else nodes:
+            try:
+                return self._call(node, name, args, kwargs)
+            except Exception as e:
+                if skipMissing and getattr(e, "code", None) == 404:
+                    error = e
+                    continue
+                if classifyError(e) != RETRIABLE:
+                    raise
+                self._markDown(node)
+                error = error or e
+        assert error is not None
+        raise error
+
+    def _pin(self, txIDs: List[str], nodes: List[NodeState]) -> None:
+        with self.lock:
+            for txID in txIDs:
+                self.pinned[txID] = nodes
+                self.pinned.move_to_end(txID)
+            while len(self.pinned) > self.maxPinned:
+                self.pinned.popitem(last=False)
+
+    def _broadcast(self, name: str, args, kwargs) -> Any:
+        targets = self.ranked()[: self.broadcast]
+        futures = [
+            self.executor.submit(self._call, node, name, args, kwargs) for node in targets
+        ]
+
+        error: Optional[Exception] = None
+        result: Any = None
+        accepted = False
+        holding: List[NodeState] = []
+        for node, future in zip(targets, futures):
+            try:
+                value = future.result()
+            except Exception as e:
+                kind = classifyError(e)
+                if kind == LANDED:
+                    holding.append(node)
+                elif kind == RETRIABLE:
+                    self._markDown(node)
+                error = error or e
+                continue
+            holding.append(node)
+            if not accepted:
+                result, accepted = value, True
+
+        if holding:
+            self._pin(_txIDsOf(name, args, kwargs), holding)
+        if accepted:
+            return result
+        assert error is not None
+        raise error
+
+    def algod_request(self, method, requrl, *args, **kwargs) -> Any:
+        if method == "POST" and requrl == "/transactions":
+            return self._broadcast("algod_request", (method, requrl) + args, kwargs)
+        return self._route("algod_request", (method, requrl) + args, kwargs)
+
+    def suggested_params(self, **kwargs) -> transaction.SuggestedParams:
+        return self._route("suggested_params", (), kwargs)
+
+    def pending_transaction_info(self, transaction_id, **kwargs) -> Any:
+        with self.lock:
+            pinned = self.pinned.get(transaction_id)
+        if not pinned:
+            return self._route("pending_transaction_info", (transaction_id,), kwargs)
+        nodes = [node for node in self.ranked() if node in pinned]
+        return self._route(
+            "pending_transaction_info", (transaction_id,), kwargs, nodes, True
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.nodes[0].client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        if name in BROADCAST_METHODS:
+            return lambda *args, **kwargs: self._broadcast(name, args, kwargs)
+        return lambda *args, **kwargs: self._route(name, args, kwargs)
+
+    def refresh(self) -> None:
+        """Probe every node's status to update its latency and round."""
+
+        def probe(node: NodeState) -> None:
+            try:
+                self._call(node, "status", (), {})
+            except Exception:
+                self._markDown(node)
+
+        list(self.executor.map(probe, self.nodes))
+
+    def start(self, interval: float = 2.0) -> None:
+        """Probe nodes in the background every ``interval`` seconds."""
+        if self.monitor is not None:
+            return
+        self.stopped.clear()
+
+        def run() -> None:
+            while not self.stopped.is_set():
+                self.refresh()
+                self.stopped.wait(interval)
+
+        self.monitor = threading.Thread(target=run, daemon=True)
+        self.monitor.start()
+
+    def close(self) -> None:
+        self.stopped.set()
+        if self.monitor is not None:
+            self.monitor.join()
+            self.monitor = None
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> "ClientPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _txIDsOf(name: str, args, kwargs) -> List[str]:
+    """txIDs of a submission; raw submissions are not decoded."""
+    if name == "send_transactions":
+        txns = args[0] if args else kwargs["txns"]
+    elif name == "send_transaction":
+        txns = [args[0] if args else kwargs["txn"]]
+    else:
+        return []
+    return [txn.get_txid() for txn in txns]
+
+
+def _roundOf(result: Any) -> Optional[int]:
+    if isinstance(result, dict):
+        round = result.get("last-round", result.get("round"))
+        return round if isinstance(round, int) else None
+    if isinstance(result, transaction.SuggestedParams):
+        return result.first
+    return None
+
+
+def fromAddresses(
+    addresses: Sequence[str],
+    token: str,
+    clientClass: Callable[..., AlgodClient] = AlgodClient,
+    **options,
+) -> ClientPool:
+    """Build a ClientPool with one ``clientClass`` client per address."""
+    return ClientPool([clientClass(token, address) for address in addresses], **options)
@@ -1,10 +1,12 @@
-from typing import Tuple
+from typing import List, Tuple
 
+from algosdk import encoding
 from algosdk.v2client.algod import AlgodClient
 from algosdk.future import transaction
 from algosdk.logic import get_application_address
 
 from .account import Account
+from .instrumentation import phase
 from deposit.contracts.contracts import approval_program, clear_state_program
 from .utils import (
     waitForTransaction,
@@ -15,13 +17,15 @@ from .utils import (
 
 APPROVAL_PROGRAM = b""
 CLEAR_STATE_PROGRAM = b""
+# approval + clear program bytes per page; an app may take up to 3 extra pages
+MAX_PROGRAM_PAGE_SIZE = 2048
 
-""" MIN_BALANCE_REQUIREMENT = (
+MIN_BALANCE_REQUIREMENT = (
     # min account balance
     100_000
     # additional min balance for 3 assets
     + 100_000 * 3
-) """
+)
 
 
 def getContracts(client: AlgodClient) -> Tuple[bytes, bytes]:
@@ -45,36 +49,173 @@ def getContracts(client: AlgodClient) -> Tuple[bytes, bytes]:
 def createApp(
     client: AlgodClient,
     creator: Account,
+    tokenA: int,
+    tokenB: int,
+    feeBps: int,
+    minIncrement: int,
 ) -> int:
     """Create a new amm.
     Args:
         client: An algod client.
-        creator: The account that will create the deposit application.
+        creator: The account that will create the amm application.
+        tokenA: The id of token A in the liquidity pool.
+        tokenB: The id of token B in the liquidity pool.
+        feeBps: The basis point fee to be charged per swap.
+        minIncrement: The minimum amount of each token that can be supplied.
     Returns:
         The ID of the newly created amm app.
     """
-    approval, clear = getContracts(client)
+    with phase("compile", "create"):
+        approval, clear = getContracts(client)
+
+    txn = getCreateAppTxn(
+        creator.getAddress(),
+        approval,
+        clear,
+        tokenA,
+        tokenB,
+        feeBps,
+        minIncrement,
+        client.suggested_params(),
+    )
+
+    signedTxn = creator.sign(txn)
+
+    client.send_transaction(signedTxn)
+
+    response = waitForTransaction(client, signedTxn.get_txid())
+    assert response.applicationIndex is not None and response.applicationIndex > 0
+    return response.applicationIndex
+
 
-    globalSchema = transaction.StateSchema(num_uints=0, num_byte_slices=0)
+def getCreateAppTxn(
+    creator: str,
+    approval: bytes,
+    clear: bytes,
+    tokenA: int,
+    tokenB: int,
+    feeBps: int,
+    minIncrement: int,
+    suggestedParams: transaction.SuggestedParams,
+) -> transaction.ApplicationCreateTxn:
+    """Build the app create transaction from compiled programs (see getContracts).
+
+    The approval program reads its parameters from the create call's app
+    args: the creator's address, then tokenA, tokenB, feeBps and
+    minIncrement as 8-byte big-endian ints. The global schema reserves
+    the 7 ints and 3 byte slices it stores.
+    """
+    # tokenA, tokenB, poolToken, fee, minIncrement, poolTokensOutstanding,
+    # lastPriceUpdate; priceACumulative, priceBCumulative
+    globalSchema = transaction.StateSchema(num_uints=7, num_byte_slices=3)
     localSchema = transaction.StateSchema(num_uints=0, num_byte_slices=0)
+    # the approval program outgrew the 2048 bytes a single page holds
+    extraPages = (len(approval) + len(clear) - 1) // MAX_PROGRAM_PAGE_SIZE
 
-    txn = transaction.ApplicationCreateTxn(
-        sender=creator.getAddress(),
+    return transaction.ApplicationCreateTxn(
+        sender=creator,
         on_complete=transaction.OnComplete.NoOpOC,
         approval_program=approval,
         clear_program=clear,
         global_schema=globalSchema,
         local_schema=localSchema,
-        sp=client.suggested_params(),
+        app_args=[
+            encoding.decode_address(creator),
+            tokenA.to_bytes(8, "big"),
+            tokenB.to_bytes(8, "big"),
+            feeBps.to_bytes(8, "big"),
+            minIncrement.to_bytes(8, "big"),
+        ],
+        sp=suggestedParams,
+        extra_pages=extraPages,
     )
 
-    signedTxn = txn.sign(creator.getPrivateKey())
 
-    client.send_transaction(signedTxn)
+def setupApp(
+    client: AlgodClient,
+    appID: int,
+    funder: Account,
+    tokenA: int,
+    tokenB: int,
+) -> int:
+    """Finish setting up an amm.
+    This operation funds the pool account, creates pool token,
+    and opts app into tokens A and B, all in one atomic transaction group.
+    Args:
+        client: An algod client.
+        appID: The app ID of the amm.
+        funder: The account providing the funding for the escrow account.
+        tokenA: Token A id.
+        tokenB: Token B id.
+    Return: pool token id
+    """
+    fundAppTxn, setupTxn = getSetupTxns(
+        appID, funder.getAddress(), tokenA, tokenB, client.suggested_params()
+    )
 
-    response = waitForTransaction(client, signedTxn.get_txid())
-    assert response.applicationIndex is not None and response.applicationIndex > 0
-    return response.applicationIndex
+    transaction.assign_group_id([fundAppTxn, setupTxn])
+
+    signedFundAppTxn = funder.sign(fundAppTxn)
+    signedSetupTxn = funder.sign(setupTxn)
+
+    client.send_transactions([signedFundAppTxn, signedSetupTxn])
+
+    waitForTransaction(client, signedFundAppTxn.get_txid())
+
+    return getPoolTokenId(getAppGlobalState(client, appID))
+
+
+def getSetupTxns(
+    appID: int,
+    funder: str,
+    tokenA: int,
+    tokenB: int,
+    suggestedParams: transaction.SuggestedParams,
+) -> List[transaction.Transaction]:
+    """Build the ungrouped setup transactions: funding payment, then the app call."""
+    appAddr = get_application_address(appID)
+
+    fundingAmount = (
+        MIN_BALANCE_REQUIREMENT
+        # additional balance to create pool token and opt into tokens A and B
+        + 1_000 * 3
+    )
+
+    fundAppTxn = transaction.PaymentTxn(
+        sender=funder,
+        receiver=appAddr,
+        amt=fundingAmount,
+        sp=suggestedParams,
+    )
+
+    setupTxn = transaction.ApplicationCallTxn(
+        sender=funder,
+        index=appID,
+        on_complete=transaction.OnComplete.NoOpOC,
+        app_args=[b"setup"],
+        foreign_assets=[tokenA, tokenB],
+        sp=suggestedParams,
+    )
+
+    return [fundAppTxn, setupTxn]
+
+
+def optInToPoolToken(client: AlgodClient, appID: int, account: Account) -> None:
+    """Opt an account in to the pool token of an amm so it can receive it.
+    Args:
+        client: An algod client.
+        appID: The app ID of the amm.
+        account: The account opting in.
+    """
+    poolToken = getPoolTokenId(getAppGlobalState(client, appID))
+
+    optInTxn = transaction.AssetOptInTxn(
+        sender=account.getAddress(), index=poolToken, sp=client.suggested_params()
+    )
+
+    signedOptInTxn = account.sign(optInTxn)
+    client.send_transaction(signedOptInTxn)
+    waitForTransaction(client, signedOptInTxn.get_txid())
 
 
 def deposit_asa(
@@ -94,21 +235,41 @@ def deposit_asa(
         tokenB: Token B id.
     Return: pool token id
     """
-    appAddr = get_application_address(appID)
+    fundAppTxn, setupTxn = getDepositAsaTxns(
+        appID, funder.getAddress(), client.suggested_params()
+    )
+
+    transaction.assign_group_id([fundAppTxn, setupTxn])
+
+    signedFundAppTxn = funder.sign(fundAppTxn)
+    signedSetupTxn = funder.sign(setupTxn)
+
+    client.send_transactions([signedFundAppTxn, signedSetupTxn])
+
+    response = waitForTransaction(client, signedFundAppTxn.get_txid())
+
+    return response
 
-    suggestedParams = client.suggested_params()
+
+def getDepositAsaTxns(
+    appID: int,
+    funder: str,
+    suggestedParams: transaction.SuggestedParams,
+) -> List[transaction.Transaction]:
+    """Build the ungrouped asa_deposit transactions: funding payment, then the app call."""
+    appAddr = get_application_address(appID)
 
     fundingAmount = (1_000)
 
     fundAppTxn = transaction.PaymentTxn(
-        sender=funder.getAddress(),
+        sender=funder,
         receiver=appAddr,
         amt=fundingAmount,
         sp=suggestedParams,
     )
 #decouple this two
     setupTxn = transaction.ApplicationCallTxn(
-        sender=funder.getAddress(),
+        sender=funder,
         index=appID,
         on_complete=transaction.OnComplete.NoOpOC,
         app_args=[b"asa_deposit"],
@@ -116,16 +277,7 @@ def deposit_asa(
         sp=suggestedParams,
     )
 
-    transaction.assign_group_id([fundAppTxn, setupTxn])
-
-    signedFundAppTxn = fundAppTxn.sign(funder.getPrivateKey())
-    signedSetupTxn = setupTxn.sign(funder.getPrivateKey())
-
-    client.send_transactions([signedFundAppTxn, signedSetupTxn])
-
-    response = waitForTransaction(client, signedFundAppTxn.get_txid())
-
-    return response
+    return [fundAppTxn, setupTxn]
 
 
 def supply(
@@ -146,32 +298,59 @@ def supply(
         qB: amount of token B to supply to the pool
         supplier: supplier account
     """
-    assertSetup(client, appID)
-    appAddr = get_application_address(appID)
-    appGlobalState = getAppGlobalState(client, appID)
-    suggestedParams = client.suggested_params()
+    with phase("read", "supply"):
+        assertSetup(client, appID)
+        appGlobalState = getAppGlobalState(client, appID)
+        suggestedParams = client.suggested_params()
+
+    with phase("build", "supply"):
+        txns = getSupplyTxns(
+            appID, appGlobalState, qA, qB, supplier.getAddress(), suggestedParams
+        )
+        transaction.assign_group_id(txns)
+
+    with phase("sign", "supply"):
+        signedTxns = [supplier.sign(txn) for txn in txns]
+
+    with phase("send", "supply"):
+        client.send_transactions(signedTxns)
+
+    with phase("confirm", "supply"):
+        waitForTransaction(client, signedTxns[-1].get_txid())
 
+
+def getSupplyTxns(
+    appID: int,
+    appGlobalState: dict,
+    qA: int,
+    qB: int,
+    supplier: str,
+    suggestedParams: transaction.SuggestedParams,
+) -> List[transaction.Transaction]:
+    """Build the ungrouped supply transactions: fee payment, token A and token B
+    transfers, then the app call that reads them at group_index - 2 and - 1."""
+    appAddr = get_application_address(appID)
     tokenA = appGlobalState[b"token_a_key"]
     tokenB = appGlobalState[b"token_b_key"]
     poolToken = getPoolTokenId(appGlobalState)
 
     # pay for the fee incurred by AMM for sending back the pool token
     feeTxn = transaction.PaymentTxn(
-        sender=supplier.getAddress(),
+        sender=supplier,
         receiver=appAddr,
         amt=2_000,
         sp=suggestedParams,
     )
 
     tokenATxn = transaction.AssetTransferTxn(
-        sender=supplier.getAddress(),
+        sender=supplier,
         receiver=appAddr,
         index=tokenA,
         amt=qA,
         sp=suggestedParams,
     )
     tokenBTxn = transaction.AssetTransferTxn(
-        sender=supplier.getAddress(),
+        sender=supplier,
         receiver=appAddr,
         index=tokenB,
         amt=qB,
@@ -179,7 +358,7 @@ def supply(
     )
 
     appCallTxn = transaction.ApplicationCallTxn(
-        sender=supplier.getAddress(),
+        sender=supplier,
         index=appID,
         on_complete=transaction.OnComplete.NoOpOC,
         app_args=[b"supply"],
@@ -187,16 +366,7 @@ def supply(
         sp=suggestedParams,
     )
 
-    transaction.assign_group_id([feeTxn, tokenATxn, tokenBTxn, appCallTxn])
-    signedFeeTxn = feeTxn.sign(supplier.getPrivateKey())
-    signedTokenATxn = tokenATxn.sign(supplier.getPrivateKey())
-    signedTokenBTxn = tokenBTxn.sign(supplier.getPrivateKey())
-    signedAppCallTxn = appCallTxn.sign(supplier.getPrivateKey())
-
-    client.send_transactions(
-        [signedFeeTxn, signedTokenATxn, signedTokenBTxn, signedAppCallTxn]
-    )
-    waitForTransaction(client, signedAppCallTxn.get_txid())
+    return [feeTxn, tokenATxn, tokenBTxn, appCallTxn]
 
 
 def withdraw(
@@ -210,14 +380,45 @@ def withdraw(
         poolTokenAmount: pool token quantity,
         withdrawAccount: supplier account,
     """
-    assertSetup(client, appID)
+    with phase("read", "withdraw"):
+        assertSetup(client, appID)
+        appGlobalState = getAppGlobalState(client, appID)
+        suggestedParams = client.suggested_params()
+
+    with phase("build", "withdraw"):
+        txns = getWithdrawTxns(
+            appID,
+            appGlobalState,
+            poolTokenAmount,
+            withdrawAccount.getAddress(),
+            suggestedParams,
+        )
+        transaction.assign_group_id(txns)
+
+    with phase("sign", "withdraw"):
+        signedTxns = [withdrawAccount.sign(txn) for txn in txns]
+
+    with phase("send", "withdraw"):
+        client.send_transactions(signedTxns)
+
+    with phase("confirm", "withdraw"):
+        waitForTransaction(client, signedTxns[-1].get_txid())
+
+
+def getWithdrawTxns(
+    appID: int,
+    appGlobalState: dict,
+    poolTokenAmount: int,
+    withdrawer: str,
+    suggestedParams: transaction.SuggestedParams,
+) -> List[transaction.Transaction]:
+    """Build the ungrouped withdraw transactions: fee payment, pool token
+    transfer, then the app call that reads it at group_index - 1."""
     appAddr = get_application_address(appID)
-    appGlobalState = getAppGlobalState(client, appID)
-    suggestedParams = client.suggested_params()
 
     # pay for the fee incurred by AMM for sending back tokens A and B
     feeTxn = transaction.PaymentTxn(
-        sender=withdrawAccount.getAddress(),
+        sender=withdrawer,
         receiver=appAddr,
         amt=2_000,
         sp=suggestedParams,
@@ -228,7 +429,7 @@ def withdraw(
     poolToken = getPoolTokenId(appGlobalState)
 
     poolTokenTxn = transaction.AssetTransferTxn(
-        sender=withdrawAccount.getAddress(),
+        sender=withdrawer,
         receiver=appAddr,
         index=poolToken,
         amt=poolTokenAmount,
@@ -236,7 +437,7 @@ def withdraw(
     )
 
     appCallTxn = transaction.ApplicationCallTxn(
-        sender=withdrawAccount.getAddress(),
+        sender=withdrawer,
         index=appID,
         on_complete=transaction.OnComplete.NoOpOC,
         app_args=[b"withdraw"],
@@ -244,13 +445,7 @@ def withdraw(
         sp=suggestedParams,
     )
 
-    transaction.assign_group_id([feeTxn, poolTokenTxn, appCallTxn])
-    signedFeeTxn = feeTxn.sign(withdrawAccount.getPrivateKey())
-    signedPoolTokenTxn = poolTokenTxn.sign(withdrawAccount.getPrivateKey())
-    signedAppCallTxn = appCallTxn.sign(withdrawAccount.getPrivateKey())
-
-    client.send_transactions([signedFeeTxn, signedPoolTokenTxn, signedAppCallTxn])
-    waitForTransaction(client, signedAppCallTxn.get_txid())
+    return [feeTxn, poolTokenTxn, appCallTxn]
 
 
 def swap(client: AlgodClient, appID: int, tokenId: int, amount: int, trader: Account):
@@ -258,13 +453,41 @@ def swap(client: AlgodClient, appID: int, tokenId: int, amount: int, trader: Acc
     This action can only happen if there is liquidity in the pool
     A fee (in bps, configured on app creation) is taken out of the input amount before calculating the output amount
     """
-    assertSetup(client, appID)
+    with phase("read", "swap"):
+        assertSetup(client, appID)
+        appGlobalState = getAppGlobalState(client, appID)
+        suggestedParams = client.suggested_params()
+
+    with phase("build", "swap"):
+        txns = getSwapTxns(
+            appID, appGlobalState, tokenId, amount, trader.getAddress(), suggestedParams
+        )
+        transaction.assign_group_id(txns)
+
+    with phase("sign", "swap"):
+        signedTxns = [trader.sign(txn) for txn in txns]
+
+    with phase("send", "swap"):
+        client.send_transactions(signedTxns)
+
+    with phase("confirm", "swap"):
+        waitForTransaction(client, signedTxns[-1].get_txid())
+
+
+def getSwapTxns(
+    appID: int,
+    appGlobalState: dict,
+    tokenId: int,
+    amount: int,
+    trader: str,
+    suggestedParams: transaction.SuggestedParams,
+) -> List[transaction.Transaction]:
+    """Build the ungrouped swap transactions: fee payment, input token
+    transfer, then the app call that reads it at group_index - 1."""
     appAddr = get_application_address(appID)
-    appGlobalState = getAppGlobalState(client, appID)
-    suggestedParams = client.suggested_params()
 
     feeTxn = transaction.PaymentTxn(
-        sender=trader.getAddress(),
+        sender=trader,
         receiver=appAddr,
         amt=1000,
         sp=suggestedParams,
@@ -274,7 +497,7 @@ def swap(client: AlgodClient, appID: int, tokenId: int, amount: int, trader: Acc
     tokenB = appGlobalState[b"token_b_key"]
 
     tradeTxn = transaction.AssetTransferTxn(
-        sender=trader.getAddress(),
+        sender=trader,
         receiver=appAddr,
         index=tokenId,
         amt=amount,
@@ -282,7 +505,7 @@ def swap(client: AlgodClient, appID: int, tokenId: int, amount: int, trader: Acc
     )
 
     appCallTxn = transaction.ApplicationCallTxn(
-        sender=trader.getAddress(),
+        sender=trader,
         index=appID,
         on_complete=transaction.OnComplete.NoOpOC,
         app_args=[b"swap"],
@@ -290,13 +513,88 @@ def swap(client: AlgodClient, appID: int, tokenId: int, amount: int, trader: Acc
         sp=suggestedParams,
     )
 
-    transaction.assign_group_id([feeTxn, tradeTxn, appCallTxn])
-    signedFeeTxn = feeTxn.sign(trader.getPrivateKey())
-    signedTradeTxn = tradeTxn.sign(trader.getPrivateKey())
-    signedAppCallTxn = appCallTxn.sign(trader.getPrivateKey())
+    return [feeTxn, tradeTxn, appCallTxn]
+
+
+def zap(client: AlgodClient, appID: int, tokenId: int, amount: int, supplier: Account):
+    """Supply liquidity with only one of the pool's tokens, in one app call.
+    The pool swaps the part of the input that leaves the rest and the swap output in
+    the post-swap reserve ratio, keeps both and mints pool tokens for them, so
+    nothing is refunded. Replaces a swap group followed by a supply group.
+    Args:
+        client: AlgodClient,
+        appID: amm app id,
+        tokenId: token A or token B of the pool,
+        amount: amount of tokenId to supply,
+        supplier: supplier account, opted in to the pool token
+    """
+    with phase("read", "zap"):
+        assertSetup(client, appID)
+        appGlobalState = getAppGlobalState(client, appID)
+        suggestedParams = client.suggested_params()
+
+    with phase("build", "zap"):
+        txns = getZapTxns(
+            appID,
+            appGlobalState,
+            tokenId,
+            amount,
+            supplier.getAddress(),
+            suggestedParams,
+        )
+        transaction.assign_group_id(txns)
+
+    with phase("sign", "zap"):
+        signedTxns = [supplier.sign(txn) for txn in txns]
+
+    with phase("send", "zap"):
+        client.send_transactions(signedTxns)
+
+    with phase("confirm", "zap"):
+        waitForTransaction(client, signedTxns[-1].get_txid())
+
+
+def getZapTxns(
+    appID: int,
+    appGlobalState: dict,
+    tokenId: int,
+    amount: int,
+    supplier: str,
+    suggestedParams: transaction.SuggestedParams,
+) -> List[transaction.Transaction]:
+    """Build the ungrouped zap transactions: fee payment, input token
+    transfer, then the app call that reads it at group_index - 1."""
+    appAddr = get_application_address(appID)
+    tokenA = appGlobalState[b"token_a_key"]
+    tokenB = appGlobalState[b"token_b_key"]
+    poolToken = getPoolTokenId(appGlobalState)
+
+    # pays for the single inner transaction sending the pool token
+    feeTxn = transaction.PaymentTxn(
+        sender=supplier,
+        receiver=appAddr,
+        amt=1000,
+        sp=suggestedParams,
+    )
+
+    tokenTxn = transaction.AssetTransferTxn(
+        sender=supplier,
+        receiver=appAddr,
+        index=tokenId,
+        amt=amount,
+        sp=suggestedParams,
+    )
+
+    appCallTxn = transaction.ApplicationCallTxn(
+        sender=supplier,
+        index=appID,
+        on_complete=transaction.OnComplete.NoOpOC,
+        app_args=[b"zap"],
+        foreign_assets=[tokenA, tokenB, poolToken],
+        sp=suggestedParams,
+    )
 
-    client.send_transactions([signedFeeTxn, signedTradeTxn, signedAppCallTxn])
-    waitForTransaction(client, signedAppCallTxn.get_txid())
+    return [feeTxn, tokenTxn, appCallTxn]
 
 
 def closeAmm(client: AlgodClient, appID: int, closer: Account):
@@ -313,7 +611,7 @@ def closeAmm(client: AlgodClient, appID: int, closer: Account):
         index=appID,
         sp=client.suggested_params(),
     )
-    signedDeleteTxn = deleteTxn.sign(closer.getPrivateKey())
+    signedDeleteTxn = closer.sign(deleteTxn)
 
     client.send_transaction(signedDeleteTxn)
 
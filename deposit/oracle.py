@@ -0,0 +1,85 @@
+"""Time-weighted average prices from the pool's cumulative price accumulators.
+
+Every supply, withdraw, swap and zap adds the price in effect since the
+previous one, times the seconds it held, to ``price_a_cumulative_key`` and
+``price_b_cumulative_key`` and stamps ``last_price_update_key``. The average
+price over any interval is then the difference of two reads of global state
+divided by the time between them, with no need to replay the trades in
+between. Prices are UQ64.64 (``PRICE_ONE`` is 1.0) and the accumulators wrap
+around at 2^128, so differences are taken modulo that; an interval is read
+correctly as long as its average price times its length stays below 2^64.
+
+    older = observe(getAppGlobalState(client, appID))
+    ...
+    newer = observe(getAppGlobalState(client, appID))
+    priceA, priceB = twap(older, newer)
+
+An accumulator only moves when the pool is called, so a read taken after a
+quiet spell is stale by the time since the last call. ``extend`` brings an
+observation forward to a given timestamp with the current reserves, which
+is what the next call would add.
+"""
+from typing import Mapping, NamedTuple, Tuple, Union
+
+from .model import PRICE_CUMULATIVE_MODULUS, PRICE_ONE, accumulatePrice
+
+PRICE_A_CUMULATIVE_KEY = b"price_a_cumulative_key"
+PRICE_B_CUMULATIVE_KEY = b"price_b_cumulative_key"
+LAST_PRICE_UPDATE_KEY = b"last_price_update_key"
+
+
+class Observation(NamedTuple):
+    """The accumulators at ``timestamp``. priceACumulative sums the price of
+    token A in token B (reserveB / reserveA), priceBCumulative its inverse."""
+
+    timestamp: int
+    priceACumulative: int
+    priceBCumulative: int
+
+
+def observe(state: Mapping[bytes, Union[int, bytes]]) -> Observation:
+    """Observation from a pool's global state (see getAppGlobalState)."""
+    return Observation(
+        state[LAST_PRICE_UPDATE_KEY],
+        int.from_bytes(state[PRICE_A_CUMULATIVE_KEY], "big"),
+        int.from_bytes(state[PRICE_B_CUMULATIVE_KEY], "big"),
+    )
+
+
+def extend(
+    observation: Observation, reserveA: int, reserveB: int, timestamp: int
+) -> Observation:
+    """``observation`` carried forward to ``timestamp``, assuming the pool held
+    ``reserveA`` and ``reserveB`` since it was taken."""
+    elapsed = timestamp - observation.timestamp
+    if elapsed <= 0 or reserveA == 0 or reserveB == 0:
+        return observation
+    return Observation(
+        timestamp,
+        accumulatePrice(observation.priceACumulative, reserveB, reserveA, elapsed),
+        accumulatePrice(observation.priceBCumulative, reserveA, reserveB, elapsed),
+    )
+
+
+def twap(older: Observation, newer: Observation) -> Tuple[float, float]:
+    """Time-weighted average prices of token A and token B between two
+    observations.
+
+    Args:
+        older: The observation at the start of the interval.
+        newer: The observation at the end; must be later than ``older``.
+    """
+    elapsed = newer.timestamp - older.timestamp
+    if elapsed <= 0:
+        raise ValueError(
+            "observations at {} and {} span no time".format(
+                older.timestamp, newer.timestamp
+            )
+        )
+    return tuple(
+        (after - before) % PRICE_CUMULATIVE_MODULUS / elapsed / PRICE_ONE
+        for before, after in (
+            (older.priceACumulative, newer.priceACumulative),
+            (older.priceBCumulative, newer.priceBCumulative),
+        )
+    )
@@ -0,0 +1,434 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue
+from typing import Any, Callable, Dict, List, Optional
+from urllib.error import URLError
+
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .journal import Journal
+from .instrumentation import observeRoundsToConfirm
+from .utils import (
+    ConfirmationTimeout,
+    PendingTxnResponse,
+    PoolError,
+    getPendingTransaction,
+)
+
+# a job builds and signs its group (a list of SignedTransaction) for the given
+# suggested params, so it can be re-signed with a fresh validity window
+GroupBuilder = Callable[[transaction.SuggestedParams], List[Any]]
+
+RETRIABLE = "retriable"
+EXPIRED = "expired"
+LANDED = "landed"
+FATAL = "fatal"
+
+EXPIRED_MARKERS = ("txn dead", "outside of")
+LANDED_MARKERS = ("already in ledger",)
+RETRIABLE_MARKERS = ("rate limit", "too many requests", "timeout", "pool is full")
+
+
+def classifyError(e: Exception) -> str:
+    """Sort a submission error into RETRIABLE, EXPIRED (re-sign needed),
+    LANDED (a re-send of a group the ledger already holds) or FATAL.
+
+    A ConfirmationTimeout is RETRIABLE, not EXPIRED: the group may still
+    confirm until the round passes its last valid round, so only the same
+    signed bytes may be sent again.
+    """
+    if isinstance(e, ConfirmationTimeout):
+        return RETRIABLE
+
+    message = str(e).lower()
+    if any(marker in message for marker in LANDED_MARKERS):
+        return LANDED
+    if isinstance(e, PoolError):
+        # e.g. "TransactionPool.Remember: txn dead: round 12 outside of 1--10"
+        if any(marker in message for marker in EXPIRED_MARKERS):
+            return EXPIRED
+        return FATAL
+
+    if isinstance(e, AlgodHTTPError):
+        code = getattr(e, "code", None)
+        if code == 429 or (code is not None and code >= 500):
+            return RETRIABLE
+        if any(marker in message for marker in EXPIRED_MARKERS):
+            return EXPIRED
+        if any(marker in message for marker in RETRIABLE_MARKERS):
+            return RETRIABLE
+        return FATAL
+
+    if isinstance(e, (URLError, ConnectionError, TimeoutError)):
+        return RETRIABLE
+
+    return FATAL
+
+
+class TokenBucket:
+    """Blocking token bucket allowing ``rate`` acquisitions per second on
+    average with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Job:
+    __slots__ = ("build", "meta", "future", "attempts", "signedTxns", "sentRound")
+
+    def __init__(self, build: GroupBuilder, meta: Dict[str, Any]) -> None:
+        self.build = build
+        self.meta = meta
+        self.future: Future = Future()
+        self.attempts = 0
+        # the current build, kept until it is confirmed or provably expired
+        self.signedTxns: Optional[List[Any]] = None
+        self.sentRound: Optional[int] = None
+
+    @property
+    def txID(self) -> str:
+        return self.signedTxns[-1].get_txid()
+
+    @property
+    def lastValid(self) -> int:
+        # the group can only commit while every one of its transactions can
+        return min(s.transaction.last_valid_round for s in self.signedTxns)
+
+
+class SubmissionPipeline:
+    """Sends signed groups from a bounded queue with a pool of worker threads.
+
+    Sending and confirming are separate stages. Each worker waits on the
+    shared rate limiter, sends a group and hands it to a single confirmer
+    thread, which polls every outstanding group once per round, so workers
+    never block on confirmation. Retriable send errors are retried with
+    jittered exponential backoff, re-sending the same signed bytes; a re-send
+    the ledger already holds counts as sent. A group is only rebuilt and
+    re-signed with fresh suggested params once it can no longer confirm:
+    the node reports it dead, or the round has passed its last valid round
+    without it confirming. Until then a group the node has lost track of is
+    re-sent as is. Fatal errors fail the job's future.
+
+    Args:
+        client: An algod client.
+        concurrency: number of worker threads.
+        rate: maximum sends per second.
+        burst: rate limiter burst size, defaults to ``rate``.
+        maxQueue: queue bound; ``submit`` blocks while the queue is full.
+        maxAttempts: attempts per job before giving up.
+        backoff: base delay in seconds for retries.
+        confirm: wait for confirmation before a job completes.
+        paramsTTL: seconds to reuse suggested params between refreshes.
+        journal: optional Journal recording every group built, its status
+            and its confirmed response.
+    """
+
+    def __init__(
+        self,
+        client: AlgodClient,
+        concurrency: int = 4,
+        rate: float = 10.0,
+        burst: Optional[float] = None,
+        maxQueue: int = 1000,
+        maxAttempts: int = 5,
+        backoff: float = 0.5,
+        maxBackoff: float = 8.0,
+        confirm: bool = True,
+        paramsTTL: float = 5.0,
+        journal: Optional[Journal] = None,
+    ) -> None:
+        self.client = client
+        self.limiter = TokenBucket(rate, burst)
+        # rebuilt jobs are put back by the confirmer, which must not block,
+        # so the bound on new submissions is kept by a semaphore instead
+        self.queue: "Queue[Optional[_Job]]" = Queue()
+        self.slots = threading.Semaphore(maxQueue)
+        self.maxAttempts = maxAttempts
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.confirm = confirm
+        self.paramsTTL = paramsTTL
+        self.journal = journal
+
+        self.paramsLock = threading.Lock()
+        self.params: Optional[transaction.SuggestedParams] = None
+        self.paramsFetched = 0.0
+
+        self.statsLock = threading.Condition()
+        self.counters: Dict[str, int] = {
+            "submitted": 0,
+            "sent": 0,
+            "resent": 0,
+            "confirmed": 0,
+            "retried": 0,
+            "resigned": 0,
+            "failed": 0,
+        }
+        self.outstanding = 0
+        self.started = time.monotonic()
+
+        self.watchLock = threading.Condition()
+        self.watching: Dict[str, _Job] = dict()
+        self.stopping = False
+
+        self.workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(concurrency)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.confirmer = threading.Thread(target=self._confirm, daemon=True)
+        self.confirmer.start()
+
+    def submit(self, build: GroupBuilder, **meta: Any) -> Future:
+        """Queue a group. The future resolves to the PendingTxnResponse of its
+        last transaction (or its txID when ``confirm`` is False).
+
+        ``meta`` (operation, appID, amounts) is passed on to the journal.
+        """
+        job = _Job(build, meta)
+        self.slots.acquire()
+        with self.statsLock:
+            self.counters["submitted"] += 1
+            self.outstanding += 1
+        self.queue.put(job)
+        return job.future
+
+    def close(self, wait: bool = True) -> None:
+        """Stop once every submitted job has completed; with ``wait`` False
+        this happens in the background."""
+        if not wait:
+            threading.Thread(target=self.close, daemon=True).start()
+            return
+        with self.statsLock:
+            while self.outstanding:
+                self.statsLock.wait()
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        with self.watchLock:
+            self.stopping = True
+            self.watchLock.notify_all()
+        self.confirmer.join()
+
+    def __enter__(self) -> "SubmissionPipeline":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, float]:
+        queueDepth = self.queue.qsize()
+        with self.statsLock:
+            stats: Dict[str, float] = dict(self.counters)
+            stats["inFlight"] = max(0, self.outstanding - queueDepth)
+        with self.watchLock:
+            stats["confirming"] = len(self.watching)
+        elapsed = time.monotonic() - self.started
+        stats["queueDepth"] = queueDepth
+        stats["sentPerSecond"] = stats["sent"] / elapsed if elapsed > 0 else 0.0
+        stats["confirmedPerSecond"] = (
+            stats["confirmed"] / elapsed if elapsed > 0 else 0.0
+        )
+        return stats
+
+    def _count(self, name: str, delta: int = 1) -> None:
+        with self.statsLock:
+            self.counters[name] += delta
+
+    def _suggestedParams(self, refresh: bool = False) -> transaction.SuggestedParams:
+        with self.paramsLock:
+            now = time.monotonic()
+            if refresh or self.params is None or now - self.paramsFetched > self.paramsTTL:
+                self.params = self.client.suggested_params()
+                self.paramsFetched = now
+            return self.params
+
+    def _finish(self, job: _Job, result: Any) -> None:
+        job.future.set_result(result)
+        with self.statsLock:
+            self.outstanding -= 1
+            self.statsLock.notify_all()
+
+    def _fail(self, job: _Job, error: Exception) -> None:
+        if self.journal is not None and job.signedTxns is not None:
+            self.journal.failed(job.txID, error)
+        job.future.set_exception(error)
+        with self.statsLock:
+            self.counters["failed"] += 1
+            self.outstanding -= 1
+            self.statsLock.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            if job.attempts == 0:
+                self.slots.release()
+            try:
+                self._send(job)
+            except Exception as e:
+                self._fail(job, e)
+
+    def _build(self, job: _Job, refresh: bool = False) -> List[Any]:
+        signedTxns = job.build(self._suggestedParams(refresh))
+        if self.journal is not None:
+            self.journal.built(signedTxns, **job.meta)
+        return signedTxns
+
+    def _send(self, job: _Job) -> None:
+        if job.signedTxns is None:
+            job.signedTxns = self._build(job, refresh=job.attempts > 0)
+        delivered = False
+
+        while True:
+            job.attempts += 1
+            try:
+                self.limiter.acquire()
+                self.client.send_transactions(job.signedTxns)
+                break
+            except Exception as e:
+                kind = classifyError(e)
+                if kind == LANDED:
+                    break
+                if not delivered:
+                    # no earlier send of these bytes can have reached a node
+                    if kind == FATAL or job.attempts >= self.maxAttempts:
+                        raise
+                    if kind == EXPIRED:
+                        self._expire(job, e)
+                        return
+                elif kind != RETRIABLE or job.attempts >= self.maxAttempts:
+                    # an earlier send may still land; the confirmer settles
+                    # the job from the ledger once the group confirms or dies
+                    break
+                delivered = True
+                self._count("retried")
+                delay = min(self.maxBackoff, self.backoff * 2 ** (job.attempts - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+        self._count("sent")
+        if self.journal is not None:
+            self.journal.sent(job.txID)
+        if not self.confirm:
+            self._finish(job, job.txID)
+            return
+        with self.watchLock:
+            self.watching[job.txID] = job
+            self.watchLock.notify_all()
+
+    def _expire(self, job: _Job, error: Exception) -> None:
+        """Rebuild a group that can no longer confirm, or fail its job once
+        it is out of attempts."""
+        self._count("resigned")
+        if job.attempts >= self.maxAttempts:
+            self._fail(job, error)
+            return
+        if self.journal is not None:
+            self.journal.failed(job.txID, error, status=EXPIRED)
+        job.signedTxns = None
+        job.sentRound = None
+        self.queue.put(job)
+
+    def _unwatch(self, job: _Job) -> None:
+        with self.watchLock:
+            self.watching.pop(job.txID, None)
+
+    def _confirm(self) -> None:
+        lastRound: Optional[int] = None
+        while True:
+            with self.watchLock:
+                while not self.watching and not self.stopping:
+                    self.watchLock.wait()
+                    lastRound = None
+                if not self.watching:
+                    return
+                jobs = list(self.watching.values())
+
+            try:
+                if lastRound is None:
+                    lastRound = self.client.status()["last-round"]
+                # the round is read before the groups are, so a group not
+                # confirmed by then and past its last valid round never will be
+                for job in jobs:
+                    self._check(job, lastRound)
+                with self.watchLock:
+                    if not self.watching:
+                        continue
+                lastRound = self.client.status_after_block(lastRound + 1)["last-round"]
+            except Exception:
+                lastRound = None
+                time.sleep(self.backoff * random.uniform(0.5, 1.0))
+
+    def _check(self, job: _Job, lastRound: int) -> None:
+        if job.sentRound is None:
+            job.sentRound = lastRound
+        try:
+            pending = getPendingTransaction(self.client, job.txID)
+        except Exception as e:
+            if getattr(e, "code", None) != 404:
+                # without the group's status it may still confirm; give up
+                # only once it no longer can
+                if lastRound > job.lastValid:
+                    self._unwatch(job)
+                    self._fail(job, e)
+                return
+            # the node has no record of the group, it was dropped
+            pending = dict()
+
+        if pending.get("confirmed-round", 0) > 0:
+            self._unwatch(job)
+            self._count("confirmed")
+            observeRoundsToConfirm(pending["confirmed-round"] - job.sentRound)
+            response = PendingTxnResponse(pending)
+            if self.journal is not None:
+                self.journal.confirmed(job.txID, response)
+            self._finish(job, response)
+            return
+
+        if pending.get("pool-error"):
+            error = PoolError(job.txID, pending["pool-error"])
+            self._unwatch(job)
+            if classifyError(error) == EXPIRED:
+                self._expire(job, error)
+            else:
+                self._fail(job, error)
+            return
+
+        if lastRound > job.lastValid:
+            self._unwatch(job)
+            self._expire(job, ConfirmationTimeout(job.txID, lastRound - job.sentRound))
+        elif not pending:
+            self._resend(job)
+
+    def _resend(self, job: _Job) -> None:
+        try:
+            self.limiter.acquire()
+            self.client.send_transactions(job.signedTxns)
+        except Exception:
+            # the group is checked again next round either way
+            return
+        self._count("resent")
@@ -0,0 +1,297 @@
+import json
+import os
+from base64 import b64decode
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+from algosdk.logic import get_application_address
+
+from .utils import PendingTxnResponse, getAppGlobalState, getBalances
+
+COLUMNS = ("round", "timestamp", "reserveA", "reserveB", "poolTokensOutstanding")
+INITIAL_CAPACITY = 1 << 16
+
+
+def decodeStateDelta(delta: Optional[List[Any]]) -> Dict[bytes, Any]:
+    """Decode a global/local state delta from a confirmed transaction.
+
+    Deleted keys map to None.
+    """
+    state: Dict[bytes, Any] = dict()
+
+    for pair in delta or []:
+        key = b64decode(pair["key"])
+        value = pair["value"]
+        action = value["action"]
+
+        if action == 2:
+            state[key] = value.get("uint", 0)
+        elif action == 1:
+            state[key] = b64decode(value.get("bytes", ""))
+        elif action == 3:
+            state[key] = None
+        else:
+            raise Exception(f"Unexpected state delta action: {action}")
+
+    return state
+
+
+class ReservesSeries:
+    """Append-only columnar store of pool reserves for a single app.
+
+    Each column lives in its own memory-mapped ``.npy`` file under ``path``
+    and rows are kept sorted by round, so range lookups are binary searches.
+    """
+
+    def __init__(self, path: str, capacity: int = INITIAL_CAPACITY) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.length = 0
+        metaPath = os.path.join(path, "meta.json")
+        if os.path.exists(metaPath):
+            with open(metaPath) as f:
+                self.length = json.load(f)["length"]
+
+        self.columns: Dict[str, np.ndarray] = dict()
+        for name in COLUMNS:
+            columnPath = os.path.join(path, name + ".npy")
+            if os.path.exists(columnPath):
+                self.columns[name] = np.load(columnPath, mmap_mode="r+")
+            else:
+                self.columns[name] = np.lib.format.open_memmap(
+                    columnPath, mode="w+", dtype=np.uint64, shape=(capacity,)
+                )
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.columns[COLUMNS[0]])
+        if needed <= capacity:
+            return
+
+        while capacity < needed:
+            capacity *= 2
+
+        for name in COLUMNS:
+            old = self.columns[name]
+            columnPath = os.path.join(self.path, name + ".npy")
+            tmpPath = columnPath + ".tmp"
+            new = np.lib.format.open_memmap(
+                tmpPath, mode="w+", dtype=np.uint64, shape=(capacity,)
+            )
+            new[: self.length] = old[: self.length]
+            new.flush()
+            del old, new
+            os.replace(tmpPath, columnPath)
+            self.columns[name] = np.load(columnPath, mmap_mode="r+")
+
+    def extend(self, **values: np.ndarray) -> None:
+        """Append a batch of rows. Every column in COLUMNS must be given."""
+        rounds = np.asarray(values["round"], dtype=np.uint64)
+        n = len(rounds)
+        if n == 0:
+            return
+
+        if np.any(rounds[1:] < rounds[:-1]) or (
+            self.length > 0 and rounds[0] < self.columns["round"][self.length - 1]
+        ):
+            raise ValueError("Rows must be appended in round order")
+
+        self._grow(self.length + n)
+        for name in COLUMNS:
+            self.columns[name][self.length : self.length + n] = values[name]
+        self.length += n
+
+    def append(
+        self,
+        round: int,
+        timestamp: int,
+        reserveA: int,
+        reserveB: int,
+        poolTokensOutstanding: int,
+    ) -> None:
+        self.extend(
+            round=[round],
+            timestamp=[timestamp],
+            reserveA=[reserveA],
+            reserveB=[reserveB],
+            poolTokensOutstanding=[poolTokensOutstanding],
+        )
+
+    def flush(self) -> None:
+        for column in self.columns.values():
+            column.flush()
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"length": self.length}, f)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name][: self.length]
+
+    def last(self) -> Optional[Dict[str, int]]:
+        if self.length == 0:
+            return None
+        return {name: int(self.columns[name][self.length - 1]) for name in COLUMNS}
+
+    def indexRange(self, startRound: int, endRound: int) -> Tuple[int, int]:
+        """Return the [start, end) row indices covering rounds in [startRound, endRound]."""
+        rounds = self.column("round")
+        start = int(np.searchsorted(rounds, startRound, side="left"))
+        end = int(np.searchsorted(rounds, endRound, side="right"))
+        return start, end
+
+    def range(self, startRound: int, endRound: int) -> Dict[str, np.ndarray]:
+        start, end = self.indexRange(startRound, endRound)
+        return {name: self.columns[name][start:end] for name in COLUMNS}
+
+    def prices(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Price of token A quoted in token B (reserveB / reserveA) per row."""
+        end = self.length if end is None else end
+        reserveA = self.columns["reserveA"][start:end].astype(np.float64)
+        reserveB = self.columns["reserveB"][start:end].astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(reserveA > 0, reserveB / reserveA, np.nan)
+
+    def _timeWindow(self, startTime: int, endTime: int) -> Tuple[int, int]:
+        timestamps = self.column("timestamp")
+        # the row in effect at startTime is the last one at or before it
+        start = max(int(np.searchsorted(timestamps, startTime, side="right")) - 1, 0)
+        end = int(np.searchsorted(timestamps, endTime, side="left"))
+        return start, max(end, start + 1)
+
+    def twap(self, startTime: int, endTime: int) -> float:
+        """Time-weighted average price over [startTime, endTime] in seconds."""
+        if self.length == 0 or endTime <= startTime:
+            raise ValueError("Empty series or window")
+
+        start, end = self._timeWindow(startTime, endTime)
+        timestamps = self.columns["timestamp"][start:end].astype(np.int64)
+        edges = np.clip(np.append(timestamps, endTime), startTime, endTime)
+        weights = np.diff(edges)
+        prices = self.prices(start, end)
+
+        mask = ~np.isnan(prices) & (weights > 0)
+        total = weights[mask].sum()
+        if total == 0:
+            return float("nan")
+        return float(np.dot(prices[mask], weights[mask]) / total)
+
+    def volatility(self, startTime: int, endTime: int) -> float:
+        """Standard deviation of per-row log returns of the price over the window."""
+        start, end = self._timeWindow(startTime, endTime)
+        prices = self.prices(start, end)
+        prices = prices[~np.isnan(prices) & (prices > 0)]
+        if len(prices) < 2:
+            return 0.0
+        return float(np.std(np.diff(np.log(prices))))
+
+
+class ReservesStore:
+    """A directory of ReservesSeries, one per pool app id."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.series: Dict[int, ReservesSeries] = dict()
+
+    def get(self, appID: int) -> ReservesSeries:
+        if appID not in self.series:
+            self.series[appID] = ReservesSeries(os.path.join(self.root, str(appID)))
+        return self.series[appID]
+
+    def flush(self) -> None:
+        for series in self.series.values():
+            series.flush()
+
+
+class ReservesFeed:
+    """Keeps a pool's ReservesSeries up to date from its confirmed transactions.
+
+    The pool state is read from algod once in ``bootstrap``; after that every
+    confirmed group is applied as a delta: asset transfers into the app address
+    add to reserves, inner transfers out of it subtract, and the pool token
+    counter is taken from the app call's global state delta.
+    """
+
+    def __init__(self, client: AlgodClient, store: ReservesStore, appID: int) -> None:
+        self.client = client
+        self.appID = appID
+        self.appAddr = get_application_address(appID)
+        # msgpack responses carry raw 32-byte addresses, JSON ones base32 strings
+        self.appAddrs = (self.appAddr, encoding.decode_address(self.appAddr))
+        self.series = store.get(appID)
+        self.timestamps: Dict[int, int] = dict()
+
+        appGlobalState = getAppGlobalState(client, appID)
+        self.tokenA = appGlobalState[b"token_a_key"]
+        self.tokenB = appGlobalState[b"token_b_key"]
+        self.state = self.series.last()
+
+    def blockTimestamp(self, round: int) -> int:
+        if round not in self.timestamps:
+            self.timestamps[round] = self.client.block_info(round)["block"]["ts"]
+        return self.timestamps[round]
+
+    def bootstrap(self) -> None:
+        """Record the current on-chain reserves as the first row."""
+        balances = getBalances(self.client, self.appAddr)
+        appGlobalState = getAppGlobalState(self.client, self.appID)
+        round = self.client.status()["last-round"]
+
+        self.state = {
+            "round": round,
+            "timestamp": self.blockTimestamp(round),
+            "reserveA": balances.get(self.tokenA, 0),
+            "reserveB": balances.get(self.tokenB, 0),
+            "poolTokensOutstanding": appGlobalState.get(
+                b"pool_tokens_outstanding_key", 0
+            ),
+        }
+        self.series.append(**self.state)
+
+    def _applyTransfer(self, txn: Dict[str, Any], inner: bool) -> None:
+        if txn.get("type") != "axfer":
+            return
+
+        amount = txn.get("aamt", 0)
+        toApp = txn.get("arcv") in self.appAddrs
+        if toApp and not inner:
+            sign = 1
+        elif inner and not toApp:
+            sign = -1
+        else:
+            return
+
+        asset = txn.get("xaid")
+        if asset == self.tokenA:
+            self.state["reserveA"] += sign * amount
+        elif asset == self.tokenB:
+            self.state["reserveB"] += sign * amount
+
+    def ingest(self, responses: List[PendingTxnResponse]) -> None:
+        """Apply one confirmed group, given the responses of all its transactions."""
+        if self.state is None:
+            raise RuntimeError("Call bootstrap() before ingesting transactions")
+
+        round: Optional[int] = None
+        for response in responses:
+            round = response.confirmedRound or round
+            self._applyTransfer(response.txn["txn"], inner=False)
+
+            for innerTxn in response.innerTxns:
+                self._applyTransfer(innerTxn["txn"]["txn"], inner=True)
+
+            if response.txn["txn"].get("apid") == self.appID:
+                delta = decodeStateDelta(response.globalStateDelta)
+                outstanding = delta.get(b"pool_tokens_outstanding_key")
+                if outstanding is not None:
+                    self.state["poolTokensOutstanding"] = outstanding
+
+        if round is None:
+            raise ValueError("Group has not been confirmed")
+
+        self.state["round"] = round
+        self.state["timestamp"] = self.blockTimestamp(round)
+        self.series.append(**self.state)
@@ -0,0 +1,89 @@
+import os
+from random import choice, randint
+from typing import Optional
+
+from algosdk import account
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+from .transport import PooledAlgodClient
+from .utils import waitForTransaction
+
+# sandbox defaults, overridable from the environment
+ALGOD_ADDRESS = "http://localhost:4001"
+ALGOD_TOKEN = "a" * 64
+
+
+def getAlgodClient(
+    address: Optional[str] = None, token: Optional[str] = None
+) -> AlgodClient:
+    """Client for ``address`` or $ALGOD_ADDRESS (default: the sandbox node)."""
+    return PooledAlgodClient(
+        token or os.environ.get("ALGOD_TOKEN", ALGOD_TOKEN),
+        address or os.environ.get("ALGOD_ADDRESS", ALGOD_ADDRESS),
+    )
+
+
+def getDispenser() -> Account:
+    """Funding account given by the $DISPENSER_MNEMONIC environment variable."""
+    mnemonic = os.environ.get("DISPENSER_MNEMONIC")
+    if not mnemonic:
+        raise RuntimeError("Set DISPENSER_MNEMONIC to a funded account's mnemonic")
+    return Account.FromMnemonic(mnemonic)
+
+
+def getTemporaryAccount(
+    client: AlgodClient, funder: Account, amount: int = 10_000_000
+) -> Account:
+    """Generate a new account and fund it with ``amount`` microAlgos from ``funder``."""
+    temporary = Account(account.generate_account()[0])
+
+    txn = transaction.PaymentTxn(
+        sender=funder.getAddress(),
+        receiver=temporary.getAddress(),
+        amt=amount,
+        sp=client.suggested_params(),
+    )
+    signedTxn = funder.sign(txn)
+    client.send_transaction(signedTxn)
+    waitForTransaction(client, signedTxn.get_txid())
+
+    return temporary
+
+
+def optInToAsset(client: AlgodClient, assetID: int, account: Account) -> None:
+    txn = transaction.AssetOptInTxn(
+        sender=account.getAddress(), index=assetID, sp=client.suggested_params()
+    )
+    signedTxn = account.sign(txn)
+    client.send_transaction(signedTxn)
+    waitForTransaction(client, signedTxn.get_txid())
+
+
+def createDummyAsset(client: AlgodClient, total: int, creator: Account) -> int:
+    """Create an asset of ``total`` units held by ``creator``; return its id."""
+    randomNumber = randint(0, 999)
+    # a random note keeps otherwise identical creations from being duplicates
+    randomNote = bytes(randint(0, 255) for _ in range(20))
+
+    txn = transaction.AssetCreateTxn(
+        sender=creator.getAddress(),
+        total=total,
+        decimals=0,
+        default_frozen=False,
+        manager=creator.getAddress(),
+        reserve=creator.getAddress(),
+        freeze=creator.getAddress(),
+        clawback=creator.getAddress(),
+        unit_name=f"D{randomNumber}",
+        asset_name=f"Dummy {choice('ABCDEFGH')}{randomNumber}",
+        note=randomNote,
+        sp=client.suggested_params(),
+    )
+    signedTxn = creator.sign(txn)
+    client.send_transaction(signedTxn)
+
+    response = waitForTransaction(client, signedTxn.get_txid())
+    assert response.assetIndex is not None and response.assetIndex > 0
+    return response.assetIndex
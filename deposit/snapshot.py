@@ -0,0 +1,148 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import msgpack
+import numpy as np
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+
+# fields of a block transaction that can name an account whose balances change
+ADDRESS_FIELDS = ("snd", "rcv", "close", "arcv", "asnd", "aclose", "fadd")
+
+
+class BalanceSnapshot:
+    """Balances of many accounts for a fixed set of assets at a given round.
+
+    Amounts are kept in a dense uint64 table indexed by (address, asset);
+    column 0 is always the Algo balance. Assets an account has not opted
+    into read as 0.
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[str],
+        assetIDs: Iterable[int],
+        table: Optional[np.ndarray] = None,
+        round: int = 0,
+    ) -> None:
+        self.addresses: List[str] = list(addresses)
+        self.assetIDs: List[int] = [0] + [a for a in assetIDs if a != 0]
+        self.addressIndex: Dict[str, int] = {a: i for i, a in enumerate(self.addresses)}
+        self.assetIndex: Dict[int, int] = {a: i for i, a in enumerate(self.assetIDs)}
+        self.table = (
+            np.zeros((len(self.addresses), len(self.assetIDs)), dtype=np.uint64)
+            if table is None
+            else table
+        )
+        self.round = round
+
+    def get(self, address: str, assetID: int = 0) -> int:
+        return int(self.table[self.addressIndex[address], self.assetIndex[assetID]])
+
+    def column(self, assetID: int) -> np.ndarray:
+        return self.table[:, self.assetIndex[assetID]]
+
+    def _fetchRow(self, client: AlgodClient, address: str) -> int:
+        accountInfo = client.account_info(address)
+        row = self.table[self.addressIndex[address]]
+        row[:] = 0
+        row[0] = accountInfo["amount"]
+
+        for assetHolding in accountInfo.get("assets", []):
+            column = self.assetIndex.get(assetHolding["asset-id"])
+            if column is not None:
+                row[column] = assetHolding["amount"]
+
+        return accountInfo.get("round", 0)
+
+    def fetch(
+        self,
+        client: AlgodClient,
+        addresses: Optional[Iterable[str]] = None,
+        maxWorkers: int = 16,
+    ) -> None:
+        """Fetch balances for ``addresses`` (default: all) with at most
+        ``maxWorkers`` requests in flight.
+
+        Rows are read at whatever round each request is served, so the
+        snapshot's round becomes the earliest of them after a full fetch:
+        a later refresh then scans every block that could have changed a
+        row. Fetching some of the addresses leaves the round as it is.
+        """
+        full = addresses is None
+        addresses = self.addresses if addresses is None else list(addresses)
+        if len(addresses) == 0:
+            return
+
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            rounds = list(
+                executor.map(lambda a: self._fetchRow(client, a), addresses)
+            )
+
+        if full:
+            self.round = min(rounds)
+
+    def touchedBetween(
+        self, client: AlgodClient, firstRound: int, lastRound: int
+    ) -> Set[str]:
+        """Addresses of this snapshot that appear in blocks firstRound..lastRound."""
+        touched: Set[str] = set()
+
+        for round in range(firstRound, lastRound + 1):
+            block = msgpack.unpackb(
+                client.block_info(round, response_format="msgpack"), raw=False
+            )["block"]
+            for stxn in block.get("txns", []):
+                self._collectAddresses(stxn, touched)
+
+        return touched
+
+    def _collectAddresses(self, stxn: Dict[str, Any], touched: Set[str]) -> None:
+        txn = stxn.get("txn", {})
+        for field in ADDRESS_FIELDS:
+            raw = txn.get(field)
+            if raw:
+                address = encoding.encode_address(raw)
+                if address in self.addressIndex:
+                    touched.add(address)
+
+        # app calls and inner transactions move funds of the app account too
+        for raw in txn.get("apat", []):
+            address = encoding.encode_address(raw)
+            if address in self.addressIndex:
+                touched.add(address)
+        for inner in stxn.get("dt", {}).get("itx", []):
+            self._collectAddresses(inner, touched)
+
+    def refresh(self, client: AlgodClient, maxWorkers: int = 16) -> Set[str]:
+        """Re-fetch only the accounts touched since the snapshot's round."""
+        currentRound = client.status()["last-round"]
+        touched = self.touchedBetween(client, self.round + 1, currentRound)
+        self.fetch(client, touched, maxWorkers=maxWorkers)
+        self.round = max(self.round, currentRound)
+        return touched
+
+    def save(self, path: str) -> None:
+        """Write the table as ``path/balances.npy`` plus an index file."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "balances.npy"), self.table)
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump(
+                {
+                    "addresses": self.addresses,
+                    "assetIDs": self.assetIDs,
+                    "round": self.round,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BalanceSnapshot":
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+        table = np.load(
+            os.path.join(path, "balances.npy"), mmap_mode="r+" if mmap else None
+        )
+        return cls(index["addresses"], index["assetIDs"], table, index["round"])
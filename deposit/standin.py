@@ -0,0 +1,682 @@
+"""A minimal local stand-in for an algod node.
+
+It speaks enough of the algod v2 REST API (status, suggested params,
+account and application info, TEAL compile, transaction submission and
+pending transaction info) over HTTP/1.1 keep-alive for benchmarks and load
+runs without a sandbox.
+
+Submitted groups are applied atomically to an in-memory ledger and confirm
+in the next round: payments, asset creation, opt-ins and transfers, and the
+pool app's create/setup/supply/withdraw/swap/delete calls, evaluated with
+deposit.model so rejections match the approval program. Signatures, other
+programs and app minimum balances are not checked.
+"""
+
+import json
+import threading
+import time
+from base64 import b32encode, b64encode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import parse
+
+import msgpack
+from algosdk import constants, encoding
+from algosdk.logic import get_application_address
+
+from .model import (
+    POOL_TOKEN_DEFAULT_AMOUNT,
+    ContractReject,
+    PoolModel,
+    accumulatePrice,
+)
+
+GENESIS_HASH = b64encode(bytes(32)).decode()
+GENESIS_ID = "standin-v1"
+FIRST_INDEX = 1000
+
+# minimum balance of an account, plus this much per asset it holds
+MIN_BALANCE = 100_000
+ASSET_MIN_BALANCE = 100_000
+
+NOOP, OPT_IN, CLOSE_OUT, CLEAR_STATE, UPDATE, DELETE = range(6)
+
+
+class Rejected(Exception):
+    pass
+
+
+def _txid(txn: Dict[str, Any]) -> str:
+    encoded = msgpack.packb(txn, use_bin_type=True)
+    return encoding._undo_padding(
+        b32encode(encoding.checksum(constants.txid_prefix + encoded)).decode()
+    )
+
+
+def _address(raw: Optional[bytes]) -> str:
+    return encoding.encode_address(raw or bytes(32))
+
+
+def _btoi(value: bytes) -> int:
+    if len(value) > 8:
+        raise ContractReject("btoi arg too long")
+    return int.from_bytes(value, "big")
+
+
+class _Overlay:
+    """Copy-on-write view of the ledger for applying one group atomically."""
+
+    def __init__(self, node: "StandInNode") -> None:
+        self.node = node
+        self.accounts: Dict[str, Dict[str, Any]] = dict()
+        self.applications: Dict[int, Optional[Dict[str, Any]]] = dict()
+        self.assets: Dict[int, Dict[str, Any]] = dict()
+        self.nextIndex = node.nextIndex
+
+    def account(self, address: str) -> Dict[str, Any]:
+        account = self.accounts.get(address)
+        if account is None:
+            base = self.node.accounts.get(address, {"amount": 0, "assets": {}})
+            account = {"amount": base["amount"], "assets": dict(base["assets"])}
+            self.accounts[address] = account
+        return account
+
+    def application(self, appID: int) -> Dict[str, Any]:
+        if appID in self.applications:
+            app = self.applications[appID]
+        else:
+            base = self.node.applications.get(appID)
+            app = None if base is None else dict(base, globals=dict(base["globals"]))
+            self.applications[appID] = app
+        if app is None:
+            raise Rejected("application {} does not exist".format(appID))
+        return app
+
+    def assetExists(self, assetID: int) -> bool:
+        return assetID in self.assets or assetID in self.node.assets
+
+    def newIndex(self) -> int:
+        index = self.nextIndex
+        self.nextIndex += 1
+        return index
+
+    def charge(self, address: str, amount: int) -> None:
+        account = self.account(address)
+        if account["amount"] < amount:
+            raise Rejected(
+                "overspend (account {}, data {{amount: {}}}, tried to spend {})".format(
+                    address, account["amount"], amount
+                )
+            )
+        account["amount"] -= amount
+
+    def pay(self, sender: str, receiver: str, amount: int) -> None:
+        self.charge(sender, amount)
+        self.account(receiver)["amount"] += amount
+
+    def transfer(self, assetID: int, sender: str, receiver: str, amount: int) -> None:
+        source = self.account(sender)["assets"]
+        target = self.account(receiver)["assets"]
+        if assetID not in source:
+            raise Rejected("asset {} missing from {}".format(assetID, sender))
+        if assetID not in target:
+            raise Rejected(
+                "receiver error: must optin, asset {} missing from {}".format(
+                    assetID, receiver
+                )
+            )
+        if source[assetID] < amount:
+            raise Rejected(
+                "underflow on subtracting {} from sender amount {}".format(
+                    amount, source[assetID]
+                )
+            )
+        source[assetID] -= amount
+        target[assetID] += amount
+
+    def checkMinBalances(self) -> None:
+        for address, account in self.accounts.items():
+            required = MIN_BALANCE + ASSET_MIN_BALANCE * len(account["assets"])
+            if 0 < account["amount"] < required or (
+                account["assets"] and account["amount"] < required
+            ):
+                raise Rejected(
+                    "account {} balance {} below min {}".format(
+                        address, account["amount"], required
+                    )
+                )
+
+    def commit(self) -> None:
+        node = self.node
+        node.accounts.update(self.accounts)
+        node.assets.update(self.assets)
+        for appID, app in self.applications.items():
+            if app is None:
+                node.applications.pop(appID, None)
+            else:
+                node.applications[appID] = app
+        node.nextIndex = self.nextIndex
+
+
+class StandInNode:
+    """In-memory ledger whose round advances every ``blockInterval`` seconds."""
+
+    def __init__(self, blockInterval: float = 1.0) -> None:
+        self.blockInterval = blockInterval
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.accounts: Dict[str, Dict[str, Any]] = dict()
+        self.assets: Dict[int, Dict[str, Any]] = dict()
+        self.applications: Dict[int, Dict[str, Any]] = dict()
+        self.pending: Dict[str, Dict[str, Any]] = dict()
+        self.nextIndex = FIRST_INDEX
+        self.counters = {"accepted": 0, "rejected": 0}
+
+    def lastRound(self) -> int:
+        return 1 + int((time.monotonic() - self.started) / self.blockInterval)
+
+    def waitForRound(self, round: int, limit: float = 60.0) -> int:
+        deadline = time.monotonic() + limit
+        while self.lastRound() < round and time.monotonic() < deadline:
+            time.sleep(min(self.blockInterval / 4, 0.05))
+        return self.lastRound()
+
+    def fund(self, address: str, amount: int) -> None:
+        """Credit ``amount`` microAlgos to ``address`` out of thin air."""
+        with self.lock:
+            account = self.accounts.setdefault(address, {"amount": 0, "assets": {}})
+            account["amount"] += amount
+
+    def submit(self, raw: bytes) -> str:
+        """Apply a group atomically and return its first txID.
+
+        Raises:
+            Rejected: with an algod-style message if any transaction fails.
+        """
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(raw)
+        group: List[Dict[str, Any]] = list(unpacker)
+        txids = [_txid(stxn["txn"]) for stxn in group]
+
+        with self.lock:
+            round = self.lastRound() + 1
+            overlay = _Overlay(self)
+            records = []
+            try:
+                for index, txid in enumerate(txids):
+                    try:
+                        if txid in self.pending:
+                            raise Rejected("transaction already in ledger")
+                        records.append(self._apply(overlay, group, index, round))
+                    except ContractReject as e:
+                        raise Rejected(
+                            "transaction {}: logic eval error: {}".format(txid, e)
+                        )
+                    except Rejected as e:
+                        raise Rejected("transaction {}: {}".format(txid, e))
+                overlay.checkMinBalances()
+            except Rejected as e:
+                self.counters["rejected"] += 1
+                raise Rejected("TransactionPool.Remember: {}".format(e))
+
+            overlay.commit()
+            self.counters["accepted"] += 1
+            for stxn, txid, record in zip(group, txids, records):
+                record.update({"pool-error": "", "txn": stxn, "confirmed-round": round})
+                self.pending[txid] = record
+        return txids[0]
+
+    def _apply(
+        self, overlay: _Overlay, group: List[Dict[str, Any]], index: int, round: int
+    ) -> Dict[str, Any]:
+        txn = group[index]["txn"]
+        sender = _address(txn.get("snd"))
+        firstValid, lastValid = txn.get("fv", 0), txn.get("lv", 0)
+        if not firstValid <= round <= lastValid:
+            raise Rejected(
+                "txn dead: round {} outside of {}--{}".format(
+                    round, firstValid, lastValid
+                )
+            )
+        overlay.charge(sender, txn.get("fee", 0))
+
+        kind = txn.get("type")
+        record: Dict[str, Any] = dict()
+        if kind == "pay":
+            overlay.pay(sender, _address(txn.get("rcv")), txn.get("amt", 0))
+        elif kind == "axfer":
+            assetID = txn.get("xaid", 0)
+            receiver = _address(txn.get("arcv"))
+            amount = txn.get("aamt", 0)
+            holdings = overlay.account(sender)["assets"]
+            if receiver == sender and amount == 0 and assetID not in holdings:
+                if not overlay.assetExists(assetID):
+                    raise Rejected("asset {} does not exist".format(assetID))
+                holdings[assetID] = 0
+            else:
+                overlay.transfer(assetID, sender, receiver, amount)
+        elif kind == "acfg" and not txn.get("caid"):
+            params = txn.get("apar", {})
+            assetID = overlay.newIndex()
+            overlay.assets[assetID] = dict(params, creator=sender)
+            overlay.account(sender)["assets"][assetID] = params.get("t", 0)
+            record["asset-index"] = assetID
+        elif kind == "appl":
+            self._callApp(overlay, group, index, sender, record)
+        else:
+            raise Rejected(
+                "{} transactions are not supported by the stand-in".format(kind)
+            )
+        return record
+
+    def _callApp(
+        self,
+        overlay: _Overlay,
+        group: List[Dict[str, Any]],
+        index: int,
+        sender: str,
+        record: Dict[str, Any],
+    ) -> None:
+        txn = group[index]["txn"]
+        appID = txn.get("apid", 0)
+        args: List[bytes] = txn.get("apaa", [])
+        onComplete = txn.get("apan", NOOP)
+
+        if appID == 0:
+            if len(args) < 5:
+                raise ContractReject("invalid ApplicationArgs index")
+            appID = overlay.newIndex()
+            overlay.applications[appID] = {
+                "creator": sender,
+                "globals": {
+                    b"creator_key": args[0],
+                    b"token_a_key": _btoi(args[1]),
+                    b"token_b_key": _btoi(args[2]),
+                    b"fee_bps_key": _btoi(args[3]),
+                    b"min_increment_key": _btoi(args[4]),
+                    b"price_a_cumulative_key": bytes(16),
+                    b"price_b_cumulative_key": bytes(16),
+                    b"last_price_update_key": int(time.time()),
+                },
+            }
+            record["application-index"] = appID
+            return
+
+        state = overlay.application(appID)["globals"]
+        if onComplete == CLEAR_STATE:
+            return
+        if onComplete == DELETE:
+            if state.get(b"pool_tokens_outstanding_key", 0) != 0:
+                raise ContractReject("pool tokens outstanding")
+            if encoding.decode_address(sender) != state[b"creator_key"]:
+                raise ContractReject("assert failed: sender is not the creator")
+            overlay.applications[appID] = None
+            return
+        if onComplete != NOOP:
+            raise ContractReject("on completion {} rejected".format(onComplete))
+
+        call = _AppCall(overlay, appID, state, sender)
+        method = args[0] if args else b""
+        if method == b"setup":
+            call.setup()
+        elif method == b"supply" and index >= 2:
+            call.supply(group[index - 2]["txn"], group[index - 1]["txn"])
+        elif method == b"withdraw" and index >= 1:
+            call.withdraw(group[index - 1]["txn"])
+        elif method == b"swap" and index >= 1:
+            call.swap(group[index - 1]["txn"])
+        elif method == b"zap" and index >= 1:
+            call.zap(group[index - 1]["txn"])
+        else:
+            raise ContractReject("err opcode: no matching method {!r}".format(method))
+        if call.inner:
+            record["inner-txns"] = call.inner
+
+    def pendingInfo(self, txid: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            info = self.pending.get(txid)
+        if info is None:
+            return None
+        if info["confirmed-round"] > self.lastRound():
+            return dict(info, **{"confirmed-round": 0})
+        return info
+
+    def accountInfo(self, address: str) -> Dict[str, Any]:
+        with self.lock:
+            account = self.accounts.get(address, {"amount": 0, "assets": {}})
+            assets = [
+                {"asset-id": assetID, "amount": amount, "is-frozen": False}
+                for assetID, amount in account["assets"].items()
+            ]
+            return {
+                "address": address,
+                "amount": account["amount"],
+                "assets": assets,
+                "round": self.lastRound(),
+            }
+
+    def accountRecord(self, address: str) -> Dict[str, Any]:
+        """The account as algod's msgpack format has it: the raw ledger
+        record, with zero fields left out and keys in canonical order."""
+        with self.lock:
+            account = self.accounts.get(address, {"amount": 0, "assets": {}})
+            record: Dict[str, Any] = dict()
+            if account["amount"]:
+                record["algo"] = account["amount"]
+            if account["assets"]:
+                record["asset"] = {
+                    assetID: {"a": amount} if amount else {}
+                    for assetID, amount in sorted(account["assets"].items())
+                }
+            return record
+
+    def assetHolding(self, address: str, assetID: int) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            holdings = self.accounts.get(address, {"assets": {}})["assets"]
+            if assetID not in holdings:
+                return None
+            return {
+                "asset-holding": {
+                    "asset-id": assetID,
+                    "amount": holdings[assetID],
+                    "is-frozen": False,
+                },
+                "round": self.lastRound(),
+            }
+
+    def applicationInfo(self, appID: int) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            app = self.applications.get(appID)
+            if app is None:
+                return None
+            globalState = [
+                {"key": b64encode(key).decode(), "value": _tealValue(value)}
+                for key, value in app["globals"].items()
+            ]
+        return {
+            "id": appID,
+            "params": {"creator": app["creator"], "global-state": globalState},
+        }
+
+
+def _tealValue(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bytes):
+        return {"type": 1, "bytes": b64encode(value).decode(), "uint": 0}
+    return {"type": 2, "bytes": "", "uint": value}
+
+
+class _AppCall:
+    """The pool approval program's NoOp methods, run against an overlay.
+
+    Inner transactions are paid for from the app account, as on chain.
+    """
+
+    def __init__(
+        self, overlay: _Overlay, appID: int, state: Dict[bytes, Any], sender: str
+    ) -> None:
+        self.overlay = overlay
+        self.state = state
+        self.sender = sender
+        self.appAddr = get_application_address(appID)
+        self.inner: List[Dict[str, Any]] = []
+
+    def _send(self, key: bytes, receiver: str, amount: int) -> None:
+        assetID = self.state[key]
+        self.overlay.charge(self.appAddr, constants.min_txn_fee)
+        if receiver == self.appAddr and amount == 0:
+            if not self.overlay.assetExists(assetID):
+                raise ContractReject("asset {} does not exist".format(assetID))
+            self.overlay.account(self.appAddr)["assets"].setdefault(assetID, 0)
+        else:
+            self.overlay.transfer(assetID, self.appAddr, receiver, amount)
+        self.inner.append(
+            {
+                "txn": {
+                    "txn": {
+                        "type": "axfer",
+                        "snd": encoding.decode_address(self.appAddr),
+                        "arcv": encoding.decode_address(receiver),
+                        "xaid": assetID,
+                        "aamt": amount,
+                    }
+                }
+            }
+        )
+
+    def _holding(self, key: bytes) -> int:
+        holdings = self.overlay.account(self.appAddr)["assets"]
+        assetID = self.state.get(key)
+        if assetID not in holdings:
+            raise ContractReject("assert failed: app does not hold {}".format(assetID))
+        return holdings[assetID]
+
+    def _received(self, txn: Dict[str, Any], key: bytes) -> int:
+        if not (
+            txn.get("type") == "axfer"
+            and _address(txn.get("snd")) == self.sender
+            and _address(txn.get("arcv")) == self.appAddr
+            and txn.get("xaid") == self.state.get(key)
+            and txn.get("aamt", 0) > 0
+        ):
+            raise ContractReject("assert failed: token not received")
+        return txn["aamt"]
+
+    def _pool(self, reserveA: int, reserveB: int) -> PoolModel:
+        return PoolModel(
+            self.state[b"fee_bps_key"],
+            self.state[b"min_increment_key"],
+            reserveA,
+            reserveB,
+            self.state.get(b"pool_tokens_outstanding_key", 0),
+        )
+
+    def _updatePrices(self, reserveA: int, reserveB: int) -> None:
+        # block timestamps are wall-clock seconds, as in the block endpoint
+        now = int(time.time())
+        elapsed = now - self.state[b"last_price_update_key"]
+        if elapsed <= 0:
+            return
+        if reserveA > 0 and reserveB > 0:
+            for key, numerator, denominator in (
+                (b"price_a_cumulative_key", reserveB, reserveA),
+                (b"price_b_cumulative_key", reserveA, reserveB),
+            ):
+                cumulative = int.from_bytes(self.state[key], "big")
+                cumulative = accumulatePrice(
+                    cumulative, numerator, denominator, elapsed
+                )
+                self.state[key] = cumulative.to_bytes(16, "big")
+        self.state[b"last_price_update_key"] = now
+
+    def setup(self) -> None:
+        if b"pool_token_key" in self.state:
+            raise ContractReject("assert failed: already set up")
+        self.overlay.charge(self.appAddr, constants.min_txn_fee)
+        poolToken = self.overlay.newIndex()
+        self.overlay.assets[poolToken] = {
+            "t": POOL_TOKEN_DEFAULT_AMOUNT,
+            "creator": self.appAddr,
+        }
+        holdings = self.overlay.account(self.appAddr)["assets"]
+        holdings[poolToken] = POOL_TOKEN_DEFAULT_AMOUNT
+        self.state[b"pool_token_key"] = poolToken
+        self.state[b"pool_tokens_outstanding_key"] = 0
+        self._send(b"token_a_key", self.appAddr, 0)
+        self._send(b"token_b_key", self.appAddr, 0)
+
+    def supply(self, txnA: Dict[str, Any], txnB: Dict[str, Any]) -> None:
+        if self._holding(b"pool_token_key") == 0:
+            raise ContractReject("assert failed: no pool tokens left")
+        qA = self._received(txnA, b"token_a_key")
+        qB = self._received(txnB, b"token_b_key")
+        pool = self._pool(
+            self._holding(b"token_a_key") - qA, self._holding(b"token_b_key") - qB
+        )
+        self._updatePrices(pool.reserveA, pool.reserveB)
+        minted, refundA, refundB = pool.supply(qA, qB)
+        if refundA:
+            self._send(b"token_a_key", self.sender, refundA)
+        if refundB:
+            self._send(b"token_b_key", self.sender, refundB)
+        self._send(b"pool_token_key", self.sender, minted)
+        self.state[b"pool_tokens_outstanding_key"] = pool.outstanding
+
+    def withdraw(self, txn: Dict[str, Any]) -> None:
+        amount = self._received(txn, b"pool_token_key")
+        pool = self._pool(self._holding(b"token_a_key"), self._holding(b"token_b_key"))
+        self._updatePrices(pool.reserveA, pool.reserveB)
+        outA, outB = pool.withdraw(amount)
+        self._send(b"token_a_key", self.sender, outA)
+        self._send(b"token_b_key", self.sender, outB)
+        self.state[b"pool_tokens_outstanding_key"] = pool.outstanding
+
+    def swap(self, txn: Dict[str, Any]) -> None:
+        givenIsA = txn.get("xaid") == self.state[b"token_a_key"]
+        amount = self._received(txn, b"token_a_key" if givenIsA else b"token_b_key")
+        reserveA = self._holding(b"token_a_key")
+        reserveB = self._holding(b"token_b_key")
+        if givenIsA:
+            reserveA -= amount
+        else:
+            reserveB -= amount
+        self._updatePrices(reserveA, reserveB)
+        out = self._pool(reserveA, reserveB).swap(givenIsA, amount)
+        self._send(b"token_b_key" if givenIsA else b"token_a_key", self.sender, out)
+
+    def zap(self, txn: Dict[str, Any]) -> None:
+        givenIsA = txn.get("xaid") == self.state[b"token_a_key"]
+        amount = self._received(txn, b"token_a_key" if givenIsA else b"token_b_key")
+        reserveA = self._holding(b"token_a_key")
+        reserveB = self._holding(b"token_b_key")
+        if givenIsA:
+            reserveA -= amount
+        else:
+            reserveB -= amount
+        self._updatePrices(reserveA, reserveB)
+        pool = self._pool(reserveA, reserveB)
+        minted, _, _ = pool.zap(givenIsA, amount)
+        self._send(b"pool_token_key", self.sender, minted)
+        self.state[b"pool_tokens_outstanding_key"] = pool.outstanding
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately; without this, Nagle's algorithm
+    # and delayed ACKs stall every keep-alive response by ~40ms
+    disable_nagle_algorithm = True
+    node: StandInNode
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: Any, msgpackFormat: bool = False) -> None:
+        if msgpackFormat:
+            payload = msgpack.packb(body, use_bin_type=True)
+            contentType = "application/msgpack"
+        else:
+            payload = json.dumps(body, default=_jsonDefault).encode()
+            contentType = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self) -> Tuple[str, Dict[str, str]]:
+        url = parse.urlsplit(self.path)
+        return url.path, dict(parse.parse_qsl(url.query))
+
+    def do_GET(self) -> None:
+        path, query = self._route()
+        asMsgpack = query.get("format") == "msgpack"
+        node = self.node
+        parts = path.strip("/").split("/")
+
+        if path == "/health":
+            return self._reply(200, None)
+        if path == "/v2/status":
+            return self._reply(200, _status(node.lastRound()))
+        if path.startswith("/v2/status/wait-for-block-after/"):
+            return self._reply(200, _status(node.waitForRound(int(parts[-1]) + 1)))
+        if path == "/v2/transactions/params":
+            return self._reply(
+                200,
+                {
+                    "consensus-version": "standin",
+                    "fee": 0,
+                    "genesis-hash": GENESIS_HASH,
+                    "genesis-id": GENESIS_ID,
+                    "last-round": node.lastRound(),
+                    "min-fee": constants.min_txn_fee,
+                },
+            )
+        if path.startswith("/v2/transactions/pending/"):
+            info = node.pendingInfo(parts[-1])
+            if info is None:
+                return self._reply(404, {"message": "txn not found"})
+            return self._reply(200, info, asMsgpack)
+        if (
+            path.startswith("/v2/accounts/")
+            and len(parts) == 5
+            and parts[3] == "assets"
+        ):
+            holding = node.assetHolding(parts[2], int(parts[4]))
+            if holding is None:
+                return self._reply(404, {"message": "account asset info not found"})
+            return self._reply(200, holding, asMsgpack)
+        if path.startswith("/v2/accounts/"):
+            if asMsgpack and "exclude" not in query:
+                return self._reply(200, node.accountRecord(parts[2]), asMsgpack)
+            info = node.accountInfo(parts[2])
+            if query.get("exclude") == "all":
+                del info["assets"]
+            return self._reply(200, info, asMsgpack)
+        if path.startswith("/v2/applications/"):
+            app = node.applicationInfo(int(parts[2]))
+            if app is None:
+                return self._reply(404, {"message": "application does not exist"})
+            return self._reply(200, app)
+        if path.startswith("/v2/blocks/"):
+            return self._reply(
+                200,
+                {"block": {"rnd": int(parts[2]), "ts": int(time.time())}},
+                asMsgpack,
+            )
+        return self._reply(404, {"message": "not implemented by stand-in"})
+
+    def do_POST(self) -> None:
+        path, _ = self._route()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if path == "/v2/transactions":
+            try:
+                return self._reply(200, {"txId": self.node.submit(body)})
+            except Rejected as e:
+                return self._reply(400, {"message": str(e)})
+            except Exception as e:
+                return self._reply(400, {"message": "malformed group: {}".format(e)})
+        if path == "/v2/teal/compile":
+            # programs are never evaluated, so the source stands in for bytecode
+            return self._reply(200, {"hash": "", "result": b64encode(body).decode()})
+        return self._reply(404, {"message": "not implemented by stand-in"})
+
+
+def _status(lastRound: int) -> Dict[str, Any]:
+    return {"last-round": lastRound, "time-since-last-round": 0, "catchup-time": 0}
+
+
+def _jsonDefault(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return b64encode(value).decode()
+    raise TypeError(type(value))
+
+
+def serve(
+    node: Optional[StandInNode] = None, host: str = "127.0.0.1", port: int = 0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start a stand-in node on a background thread; return (server, address)."""
+    node = node or StandInNode()
+    handler = type("Handler", (_Handler,), {"node": node})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://{}:{}".format(*server.server_address)
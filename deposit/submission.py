@@ -0,0 +1,148 @@
+import os
+import struct
+import threading
+from itertools import count
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from algosdk import constants
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+
+NONCE_SIZE = 16
+
+
+class NonceAllocator:
+    """Hands out nonces that are unique per account, across threads and processes.
+
+    A nonce is an 8-byte random process prefix followed by an 8-byte
+    per-account counter. Putting it in the first transaction of a group
+    changes the group id and hence every txID in the group, so otherwise
+    identical groups (same sender, amounts and suggested params) no longer
+    collide or get deduplicated by the node.
+    """
+
+    def __init__(self, prefix: Optional[bytes] = None) -> None:
+        self.prefix = os.urandom(8) if prefix is None else prefix
+        assert len(self.prefix) == 8
+        self.counters: Dict[str, Iterator[int]] = dict()
+        self.lock = threading.Lock()
+
+    def next(self, address: str) -> bytes:
+        counter = self.counters.get(address)
+        if counter is None:
+            with self.lock:
+                counter = self.counters.setdefault(address, count())
+        # next() on itertools.count is atomic under the GIL
+        return self.prefix + struct.pack(">Q", next(counter))
+
+    def lease(self, address: str) -> bytes:
+        """A 32-byte lease built from a fresh nonce."""
+        return self.next(address) + bytes(32 - NONCE_SIZE)
+
+
+class InFlightTxns:
+    """Thread-safe set of txIDs that have been sent but not yet resolved."""
+
+    def __init__(self) -> None:
+        self.txids = set()
+        self.lock = threading.Lock()
+
+    def add(self, txids: Iterable[str]) -> bool:
+        """Claim all txids. Returns False (claiming none) if any is in flight."""
+        txids = list(txids)
+        with self.lock:
+            if any(t in self.txids for t in txids):
+                return False
+            self.txids.update(txids)
+        return True
+
+    def discard(self, txids: Iterable[str]) -> None:
+        with self.lock:
+            self.txids.difference_update(txids)
+
+    def __contains__(self, txid: str) -> bool:
+        return txid in self.txids
+
+    def __len__(self) -> int:
+        return len(self.txids)
+
+
+def flatFeeParams(sp: transaction.SuggestedParams) -> transaction.SuggestedParams:
+    """``sp`` with a flat minimum fee.
+
+    Flat fees skip the SDK's size estimate, which signs every transaction
+    with a throwaway key just to measure it.
+    """
+    return transaction.SuggestedParams(
+        fee=max(sp.min_fee or constants.min_txn_fee, constants.min_txn_fee),
+        first=sp.first,
+        last=sp.last,
+        gh=sp.gh,
+        gen=sp.gen,
+        flat_fee=True,
+    )
+
+
+class DuplicateGroupError(Exception):
+    pass
+
+
+def applyNonce(
+    txns: List[transaction.Transaction],
+    allocator: NonceAllocator,
+    useLease: bool = False,
+) -> bytes:
+    """Stamp a fresh nonce into the note (or lease) of the group's first
+    transaction. Must be called before the group id is assigned.
+
+    Raises:
+        ValueError: if the note has no room left for the nonce.
+    """
+    first = txns[0]
+    if not useLease:
+        note = first.note or b""
+        if len(note) + NONCE_SIZE > constants.note_max_length:
+            raise ValueError(
+                "Note of {} bytes has no room for a {}-byte nonce; notes are "
+                "limited to {} bytes, use useLease instead".format(
+                    len(note), NONCE_SIZE, constants.note_max_length
+                )
+            )
+    nonce = allocator.next(first.sender)
+    if useLease:
+        first.lease = nonce + bytes(32 - NONCE_SIZE)
+    else:
+        first.note = note + nonce
+    return nonce
+
+
+def submitGroup(
+    client: AlgodClient,
+    txns: List[transaction.Transaction],
+    signer: Account,
+    allocator: NonceAllocator,
+    inFlight: InFlightTxns,
+    useLease: bool = False,
+) -> List[str]:
+    """Nonce, group, sign and send ``txns``; return their txIDs.
+
+    The txIDs stay in ``inFlight`` until the caller discards them once the
+    group is confirmed or has failed.
+    """
+    applyNonce(txns, allocator, useLease)
+    transaction.assign_group_id(txns)
+    signedTxns = [signer.sign(txn) for txn in txns]
+    txids = [s.get_txid() for s in signedTxns]
+
+    if not inFlight.add(txids):
+        raise DuplicateGroupError("Group {} is already in flight".format(txids[-1]))
+
+    try:
+        client.send_transactions(signedTxns)
+    except Exception:
+        inFlight.discard(txids)
+        raise
+
+    return txids
@@ -0,0 +1,638 @@
+"""A small TEAL evaluator for the pool approval program.
+
+Runs the assembly pyteal emits for deposit/contracts/contracts.py against an
+in-memory context: one transaction group, the app's global state and the
+asset holdings it reads. It covers the opcodes, fields and named constants
+that program uses, with the AVM's panics (uint64 overflow and underflow,
+division by zero, oversized byte math, failed asserts, out-of-range group
+lookups) and its opcode costs, so the contract can be checked against
+deposit.model without a node.
+
+Types are not checked at run time; pyteal has already type-checked the
+program. Fees, minimum balances and schema limits are not checked either,
+and assets are only checked to be available when the app call lists its
+``Assets``.
+"""
+from math import isqrt
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pyteal import Expr, Mode, compileTeal
+
+UINT64_MAX = 2 ** 64 - 1
+# byte math operands are at most this many bytes
+MAX_BYTE_MATH_SIZE = 64
+# longest byte string on the stack
+MAX_BYTES_SIZE = 4096
+# opcode budget each app call adds to the group
+APP_CALL_BUDGET = 700
+
+NAMED_INTS = {
+    "NoOp": 0,
+    "OptIn": 1,
+    "CloseOut": 2,
+    "ClearState": 3,
+    "UpdateApplication": 4,
+    "DeleteApplication": 5,
+    "pay": 1,
+    "keyreg": 2,
+    "acfg": 3,
+    "axfer": 4,
+    "afrz": 5,
+    "appl": 6,
+}
+# transaction fields that default to the zero address rather than 0
+ADDRESS_FIELDS = frozenset(
+    ("Sender", "Receiver", "AssetReceiver", "AssetSender", "CloseRemainderTo")
+)
+# opcodes that cost more than 1
+COSTS = {
+    "sqrt": 4,
+    "divmodw": 20,
+    "b+": 10,
+    "b-": 10,
+    "b*": 20,
+    "b/": 20,
+    "b%": 20,
+    "bsqrt": 40,
+}
+
+
+class TealError(Exception):
+    """The program panicked, failed an assert or ran out of budget.
+
+    Args:
+        kind: "overflow" for arithmetic panics, "assert", "err", "lookup",
+            "ledger" for inner transactions the ledger refuses, or "budget".
+        op: the opcode that failed.
+    """
+
+    def __init__(self, kind: str, op: str, message: str = "") -> None:
+        super().__init__(
+            "{} in {}{}".format(kind, op, ": " + message if message else "")
+        )
+        self.kind = kind
+        self.op = op
+
+
+class EvalContext:
+    """What one app call sees and changes.
+
+    Args:
+        group: the transaction group, one dict of TEAL field names to values
+            per transaction (e.g. ``{"TypeEnum": 4, "XferAsset": 12, ...}``).
+        index: group index of the app call being evaluated.
+        appID: the app's id.
+        appAddress: the app account's address, as 32 bytes.
+        state: the app's global state; changed in place.
+        holdings: ``{(address, asset id): amount}`` of every account the
+            program reads or pays; changed in place.
+        timestamp: Global.latest_timestamp().
+        nextAssetID: id given to the next asset an inner transaction creates.
+    """
+
+    def __init__(
+        self,
+        group: Sequence[Dict[str, Any]],
+        index: int,
+        appID: int,
+        appAddress: bytes,
+        state: Dict[bytes, Any],
+        holdings: Dict[Tuple[bytes, int], int],
+        timestamp: int = 0,
+        nextAssetID: int = 1,
+    ) -> None:
+        self.group = group
+        self.index = index
+        self.appID = appID
+        self.appAddress = appAddress
+        self.state = state
+        self.holdings = holdings
+        self.timestamp = timestamp
+        self.nextAssetID = nextAssetID
+        self.inner: List[Dict[str, Any]] = []
+
+    def globalField(self, field: str) -> Any:
+        if field == "LatestTimestamp":
+            return self.timestamp
+        if field == "CurrentApplicationAddress":
+            return self.appAddress
+        if field == "CurrentApplicationID":
+            return self.appID
+        if field == "GroupSize":
+            return len(self.group)
+        raise TealError("lookup", "global", field)
+
+    def assetAvailable(self, asset: int) -> bool:
+        """Whether the app call may read or move ``asset``; always true if
+        the call does not list its ``Assets``."""
+        assets = self.group[self.index].get("Assets")
+        return assets is None or asset in assets
+
+    def submit(self, fields: Dict[str, Any]) -> None:
+        """Apply an inner transaction sent by the app account."""
+        sender = self.appAddress
+        kind = fields.get("TypeEnum", 0)
+        if kind == NAMED_INTS["axfer"]:
+            asset = fields.get("XferAsset", 0)
+            if not self.assetAvailable(asset):
+                raise TealError(
+                    "lookup", "itxn_submit", "unavailable Asset {}".format(asset)
+                )
+            receiver = fields.get("AssetReceiver", bytes(32))
+            amount = fields.get("AssetAmount", 0)
+            if receiver == sender and amount == 0:
+                # opt-in
+                self.holdings.setdefault((sender, asset), 0)
+            else:
+                if (receiver, asset) not in self.holdings:
+                    raise TealError("ledger", "itxn_submit", "receiver not opted in")
+                balance = self.holdings.get((sender, asset))
+                if balance is None or balance < amount:
+                    raise TealError("ledger", "itxn_submit", "underflow on asset")
+                self.holdings[(sender, asset)] = balance - amount
+                self.holdings[(receiver, asset)] += amount
+        elif kind == NAMED_INTS["acfg"]:
+            fields = dict(fields, CreatedAssetID=self.nextAssetID)
+            self.holdings[(sender, self.nextAssetID)] = fields.get(
+                "ConfigAssetTotal", 0
+            )
+            self.nextAssetID += 1
+        else:
+            raise TealError("ledger", "itxn_submit", "type {}".format(kind))
+        self.inner.append(fields)
+
+
+class _Run:
+    __slots__ = ("ctx", "stack", "scratch", "calls", "pending", "result")
+
+    def __init__(self, ctx: Optional[EvalContext]) -> None:
+        self.ctx = ctx
+        self.stack: List[Any] = []
+        self.scratch: List[Any] = [0] * 256
+        self.calls: List[int] = []
+        self.pending: Dict[str, Any] = {}
+        self.result: Optional[bool] = None
+
+
+def _bigint(run: _Run, op: str) -> int:
+    value = run.stack.pop()
+    if len(value) > MAX_BYTE_MATH_SIZE:
+        raise TealError("overflow", op, "{} byte operand".format(len(value)))
+    return int.from_bytes(value, "big")
+
+
+def _bytes(value: int) -> bytes:
+    return value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+
+def _binary(f: Callable[[Any, Any], Any]) -> Callable[[_Run, Any], None]:
+    def run(r: _Run, _: Any) -> None:
+        b = r.stack.pop()
+        r.stack.append(f(r.stack.pop(), b))
+
+    return run
+
+
+def _uint64(op: str, f: Callable[[int, int], int]) -> Callable[[_Run, Any], None]:
+    def run(r: _Run, _: Any) -> None:
+        b = r.stack.pop()
+        value = f(r.stack.pop(), b)
+        if value < 0 or value > UINT64_MAX:
+            raise TealError("overflow", op)
+        r.stack.append(value)
+
+    return run
+
+
+def _div(r: _Run, _: Any) -> None:
+    b = r.stack.pop()
+    if b == 0:
+        raise TealError("overflow", "/", "division by zero")
+    r.stack.append(r.stack.pop() // b)
+
+
+def _mod(r: _Run, _: Any) -> None:
+    b = r.stack.pop()
+    if b == 0:
+        raise TealError("overflow", "%", "modulo by zero")
+    r.stack.append(r.stack.pop() % b)
+
+
+def _mulw(r: _Run, _: Any) -> None:
+    b = r.stack.pop()
+    product = r.stack.pop() * b
+    r.stack.append(product >> 64)
+    r.stack.append(product & UINT64_MAX)
+
+
+def _divw(r: _Run, _: Any) -> None:
+    s = r.stack
+    divisor = s.pop()
+    dividend = (s[-2] << 64) | s[-1]
+    del s[-2:]
+    if divisor == 0:
+        raise TealError("overflow", "divw", "division by zero")
+    quotient = dividend // divisor
+    if quotient > UINT64_MAX:
+        raise TealError("overflow", "divw", "quotient exceeds uint64")
+    s.append(quotient)
+
+
+def _addw(r: _Run, _: Any) -> None:
+    total = r.stack.pop() + r.stack.pop()
+    r.stack.append(total >> 64)
+    r.stack.append(total & UINT64_MAX)
+
+
+def _divmodw(r: _Run, _: Any) -> None:
+    s = r.stack
+    divisor = (s[-2] << 64) | s[-1]
+    dividend = (s[-4] << 64) | s[-3]
+    del s[-4:]
+    if divisor == 0:
+        raise TealError("overflow", "divmodw", "division by zero")
+    q, m = divmod(dividend, divisor)
+    s.extend((q >> 64, q & UINT64_MAX, m >> 64, m & UINT64_MAX))
+
+
+def _byteMath(op: str, f: Callable[[int, int], int]) -> Callable[[_Run, Any], None]:
+    def run(r: _Run, _: Any) -> None:
+        b = _bigint(r, op)
+        a = _bigint(r, op)
+        if op in ("b/", "b%") and b == 0:
+            raise TealError("overflow", op, "division by zero")
+        value = f(a, b)
+        if value < 0:
+            raise TealError("overflow", op, "negative result")
+        r.stack.append(_bytes(value))
+
+    return run
+
+
+def _bsqrt(r: _Run, _: Any) -> None:
+    r.stack.append(_bytes(isqrt(_bigint(r, "bsqrt"))))
+
+
+def _concat(r: _Run, _: Any) -> None:
+    b = r.stack.pop()
+    value = r.stack.pop() + b
+    if len(value) > MAX_BYTES_SIZE:
+        raise TealError("overflow", "concat", "{} bytes".format(len(value)))
+    r.stack.append(value)
+
+
+def _extractUint64(r: _Run, _: Any) -> None:
+    start = r.stack.pop()
+    value = r.stack.pop()
+    if start + 8 > len(value):
+        raise TealError(
+            "lookup", "extract_uint64", "{} of {} bytes".format(start, len(value))
+        )
+    r.stack.append(int.from_bytes(value[start : start + 8], "big"))
+
+
+def _btoi(r: _Run, _: Any) -> None:
+    value = r.stack.pop()
+    if len(value) > 8:
+        raise TealError("overflow", "btoi", "{} bytes".format(len(value)))
+    r.stack.append(int.from_bytes(value, "big"))
+
+
+def _assert(r: _Run, _: Any) -> None:
+    if not r.stack.pop():
+        raise TealError("assert", "assert")
+
+
+def _err(r: _Run, _: Any) -> None:
+    raise TealError("err", "err")
+
+
+def _push(r: _Run, value: Any) -> None:
+    r.stack.append(value)
+
+
+def _pop(r: _Run, _: Any) -> None:
+    r.stack.pop()
+
+
+def _dup(r: _Run, _: Any) -> None:
+    r.stack.append(r.stack[-1])
+
+
+def _dup2(r: _Run, _: Any) -> None:
+    r.stack.extend(r.stack[-2:])
+
+
+def _swap(r: _Run, _: Any) -> None:
+    s = r.stack
+    s[-1], s[-2] = s[-2], s[-1]
+
+
+def _dig(r: _Run, n: int) -> None:
+    r.stack.append(r.stack[-1 - n])
+
+
+def _cover(r: _Run, n: int) -> None:
+    s = r.stack
+    s.insert(len(s) - 1 - n, s.pop())
+
+
+def _uncover(r: _Run, n: int) -> None:
+    r.stack.append(r.stack.pop(-1 - n))
+
+
+def _load(r: _Run, slot: int) -> None:
+    r.stack.append(r.scratch[slot])
+
+
+def _store(r: _Run, slot: int) -> None:
+    r.scratch[slot] = r.stack.pop()
+
+
+def _field(txn: Dict[str, Any], field: str) -> Any:
+    return txn.get(field, bytes(32) if field in ADDRESS_FIELDS else 0)
+
+
+def _txn(r: _Run, field: str) -> None:
+    if field == "GroupIndex":
+        r.stack.append(r.ctx.index)
+    else:
+        r.stack.append(_field(r.ctx.group[r.ctx.index], field))
+
+
+def _txna(r: _Run, arg: Tuple[str, int]) -> None:
+    field, i = arg
+    values = r.ctx.group[r.ctx.index].get(field, [])
+    if i >= len(values):
+        raise TealError("lookup", "txna", "{} {}".format(field, i))
+    r.stack.append(values[i])
+
+
+def _gtxns(r: _Run, field: str) -> None:
+    i = r.stack.pop()
+    if i >= len(r.ctx.group):
+        raise TealError("lookup", "gtxns", "group index {}".format(i))
+    r.stack.append(i if field == "GroupIndex" else _field(r.ctx.group[i], field))
+
+
+def _global(r: _Run, field: str) -> None:
+    r.stack.append(r.ctx.globalField(field))
+
+
+def _appGlobalGet(r: _Run, _: Any) -> None:
+    r.stack.append(r.ctx.state.get(r.stack.pop(), 0))
+
+
+def _appGlobalGetEx(r: _Run, _: Any) -> None:
+    key = r.stack.pop()
+    appID = r.stack.pop()
+    if appID in (0, r.ctx.appID) and key in r.ctx.state:
+        r.stack.extend((r.ctx.state[key], 1))
+    else:
+        r.stack.extend((0, 0))
+
+
+def _appGlobalPut(r: _Run, _: Any) -> None:
+    value = r.stack.pop()
+    r.ctx.state[r.stack.pop()] = value
+
+
+def _assetHoldingGet(r: _Run, field: str) -> None:
+    if field != "AssetBalance":
+        raise TealError("lookup", "asset_holding_get", field)
+    asset = r.stack.pop()
+    if not r.ctx.assetAvailable(asset):
+        raise TealError(
+            "lookup", "asset_holding_get", "unavailable Asset {}".format(asset)
+        )
+    amount = r.ctx.holdings.get((r.stack.pop(), asset))
+    r.stack.extend((0, 0) if amount is None else (amount, 1))
+
+
+def _itxnBegin(r: _Run, _: Any) -> None:
+    r.pending = {}
+
+
+def _itxnField(r: _Run, field: str) -> None:
+    r.pending[field] = r.stack.pop()
+
+
+def _itxnSubmit(r: _Run, _: Any) -> None:
+    r.ctx.submit(r.pending)
+
+
+def _itxn(r: _Run, field: str) -> None:
+    if not r.ctx.inner:
+        raise TealError("lookup", "itxn", "no inner transaction")
+    r.stack.append(r.ctx.inner[-1].get(field, 0))
+
+
+_HANDLERS: Dict[str, Callable[[_Run, Any], None]] = {
+    "+": _uint64("+", lambda a, b: a + b),
+    "-": _uint64("-", lambda a, b: a - b),
+    "*": _uint64("*", lambda a, b: a * b),
+    "/": _div,
+    "%": _mod,
+    "mulw": _mulw,
+    "addw": _addw,
+    "divw": _divw,
+    "divmodw": _divmodw,
+    "sqrt": lambda r, _: r.stack.append(isqrt(r.stack.pop())),
+    "==": _binary(lambda a, b: int(a == b)),
+    "!=": _binary(lambda a, b: int(a != b)),
+    "<": _binary(lambda a, b: int(a < b)),
+    ">": _binary(lambda a, b: int(a > b)),
+    "<=": _binary(lambda a, b: int(a <= b)),
+    ">=": _binary(lambda a, b: int(a >= b)),
+    "&&": _binary(lambda a, b: int(bool(a and b))),
+    "||": _binary(lambda a, b: int(bool(a or b))),
+    "!": lambda r, _: r.stack.append(int(not r.stack.pop())),
+    "itob": lambda r, _: r.stack.append(r.stack.pop().to_bytes(8, "big")),
+    "btoi": _btoi,
+    "concat": _concat,
+    "extract_uint64": _extractUint64,
+    "b+": _byteMath("b+", lambda a, b: a + b),
+    "b-": _byteMath("b-", lambda a, b: a - b),
+    "b*": _byteMath("b*", lambda a, b: a * b),
+    "b/": _byteMath("b/", lambda a, b: a // b),
+    "b%": _byteMath("b%", lambda a, b: a % b),
+    "bsqrt": _bsqrt,
+    "assert": _assert,
+    "err": _err,
+    "pop": _pop,
+    "dup": _dup,
+    "dup2": _dup2,
+    "swap": _swap,
+    "dig": _dig,
+    "cover": _cover,
+    "uncover": _uncover,
+    "load": _load,
+    "store": _store,
+    "txn": _txn,
+    "txna": _txna,
+    "gtxns": _gtxns,
+    "global": _global,
+    "app_global_get": _appGlobalGet,
+    "app_global_get_ex": _appGlobalGetEx,
+    "app_global_put": _appGlobalPut,
+    "asset_holding_get": _assetHoldingGet,
+    "itxn_begin": _itxnBegin,
+    "itxn_field": _itxnField,
+    "itxn_submit": _itxnSubmit,
+    "itxn": _itxn,
+}
+_BRANCHES = ("b", "bz", "bnz", "callsub")
+# the pc callsub/retsub use for "return to the caller of Program.call"
+_EXIT = -1
+
+
+def _parseBytes(token: str) -> bytes:
+    if token.startswith('"'):
+        return token[1:-1].encode().decode("unicode_escape").encode("latin-1")
+    if token.startswith("0x"):
+        return bytes.fromhex(token[2:])
+    raise ValueError("unsupported byte constant {}".format(token))
+
+
+def _parseInt(token: str) -> int:
+    if token in NAMED_INTS:
+        return NAMED_INTS[token]
+    return int(token, 0)
+
+
+class Instruction(NamedTuple):
+    op: str
+    arg: Any
+    cost: int
+
+
+class Program:
+    """An assembled TEAL program.
+
+    Args:
+        teal: the program text, as compileTeal returns it.
+    """
+
+    def __init__(self, teal: str) -> None:
+        self.labels: Dict[str, int] = {}
+        lines: List[Tuple[str, List[str]]] = []
+        for raw in teal.splitlines():
+            # pyteal puts comments on lines of their own
+            line = raw.strip()
+            if not line or line.startswith(("//", "#pragma")):
+                continue
+            if line.endswith(":"):
+                self.labels[line[:-1]] = len(lines)
+                continue
+            op, *args = line.split(None, 1)
+            lines.append((op, args[0].split() if args and op != "byte" else args))
+
+        self.instructions = [self._assemble(op, args) for op, args in lines]
+        self._ops = [
+            (_HANDLERS.get(i.op), i.op, i.arg, i.cost) for i in self.instructions
+        ]
+
+    def _assemble(self, op: str, args: List[str]) -> Instruction:
+        cost = COSTS.get(op, 1)
+        if op == "int":
+            return Instruction("int", _parseInt(args[0]), cost)
+        if op == "byte":
+            return Instruction("byte", _parseBytes(args[0]), cost)
+        if op in _BRANCHES:
+            return Instruction(op, self.labels[args[0]], cost)
+        if op in ("retsub", "return"):
+            return Instruction(op, None, cost)
+        if op not in _HANDLERS:
+            raise ValueError("unsupported opcode {}".format(op))
+        if op in ("dig", "cover", "uncover", "load", "store"):
+            return Instruction(op, int(args[0]), cost)
+        if op == "txna":
+            return Instruction(op, (args[0], int(args[1])), cost)
+        return Instruction(op, args[0] if args else None, cost)
+
+    @classmethod
+    def fromExpr(cls, program: Expr, version: int = 6) -> "Program":
+        """Compile a pyteal application program and assemble it."""
+        return cls(compileTeal(program, mode=Mode.Application, version=version))
+
+    def _execute(self, run: _Run, pc: int, budget: int) -> int:
+        """Run from ``pc`` until the program returns or leaves through
+        _EXIT; return the opcode cost spent."""
+        ops = self._ops
+        end = len(ops)
+        cost = 0
+        while 0 <= pc < end:
+            handler, op, arg, opCost = ops[pc]
+            cost += opCost
+            if cost > budget:
+                raise TealError("budget", op, "cost {} over {}".format(cost, budget))
+            pc += 1
+            if handler is not None:
+                handler(run, arg)
+            elif op in ("int", "byte"):
+                run.stack.append(arg)
+            elif op == "b":
+                pc = arg
+            elif op == "bz":
+                if not run.stack.pop():
+                    pc = arg
+            elif op == "bnz":
+                if run.stack.pop():
+                    pc = arg
+            elif op == "callsub":
+                run.calls.append(pc)
+                pc = arg
+            elif op == "retsub":
+                pc = run.calls.pop()
+            elif op == "return":
+                run.result = bool(run.stack.pop())
+                return cost
+        if pc == end and run.result is None:
+            if len(run.stack) != 1:
+                raise TealError(
+                    "err", "return", "stack has {} values".format(len(run.stack))
+                )
+            run.result = bool(run.stack.pop())
+        return cost
+
+    def eval(self, ctx: EvalContext, budget: Optional[int] = None) -> Tuple[bool, int]:
+        """Evaluate the program for ``ctx``'s app call.
+
+        Returns whether it approved and the opcode cost; raises TealError if
+        it panicked. ``budget`` defaults to the pooled budget of the app
+        calls in the group.
+        """
+        if budget is None:
+            budget = APP_CALL_BUDGET * sum(
+                1 for txn in ctx.group if txn.get("TypeEnum") == NAMED_INTS["appl"]
+            )
+        run = _Run(ctx)
+        cost = self._execute(run, 0, budget)
+        return bool(run.result), cost
+
+    def call(
+        self,
+        label: str,
+        args: Sequence[Any],
+        ctx: Optional[EvalContext] = None,
+        budget: int = APP_CALL_BUDGET,
+    ) -> List[Any]:
+        """Call the subroutine at ``label`` with ``args`` and return what it
+        leaves on the stack. Labels are pyteal's, e.g. ``assessFee_6``; see
+        subroutine()."""
+        run = _Run(ctx)
+        run.stack.extend(args)
+        run.calls.append(_EXIT)
+        self._execute(run, self.labels[label], budget)
+        return run.stack
+
+    def subroutine(self, name: str) -> str:
+        """The label pyteal gave the subroutine ``name``."""
+        matches = [
+            label
+            for label in self.labels
+            if label.startswith(name + "_") and label[len(name) + 1 :].isdigit()
+        ]
+        if len(matches) != 1:
+            raise KeyError(name)
+        return matches[0]
@@ -0,0 +1,291 @@
+from base64 import b32encode, b64decode, b64encode
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import msgpack
+from algosdk import constants, encoding
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+from .operations import getSupplyTxns, getSwapTxns, getWithdrawTxns
+
+# fields that change between otherwise identical groups
+AMOUNT_KEYS = {"pay": "amt", "axfer": "aamt"}
+PATCH_KEYS = ("fv", "lv", "gh", "grp", "lx", "note")
+
+# largest encodings: key + bin16 note of up to 1024 bytes
+MAX_PATCH_SIZE = 8 + 3 + constants.note_max_length
+
+
+def _packHeader(count: int) -> bytes:
+    if count < 16:
+        return bytes([0x80 | count])
+    return b"\xde" + count.to_bytes(2, "big")
+
+
+class TxnTemplate:
+    """Canonical msgpack encoding of one transaction, split into pre-encoded
+    constant runs and the few fields that are patched per group: amount,
+    first/last valid round, genesis hash, group id, and lease/note nonces.
+
+    Canonical encoding sorts keys and omits zero values, so a patched field
+    that is zero is simply left out and the map header is rewritten.
+    """
+
+    __slots__ = ("segments", "constantCount", "amountKey", "buffer")
+
+    def __init__(self, txn: transaction.Transaction) -> None:
+        fields = {k: v for k, v in txn.dictify().items() if v}
+        self.amountKey: Optional[str] = AMOUNT_KEYS.get(fields["type"])
+
+        patchKeys = set(PATCH_KEYS)
+        if self.amountKey is not None:
+            patchKeys.add(self.amountKey)
+
+        self.segments: List[Any] = []
+        self.constantCount = 0
+        run = b""
+        for key in sorted(set(fields) | patchKeys):
+            if key in patchKeys:
+                if run:
+                    self.segments.append(run)
+                    run = b""
+                self.segments.append((key, msgpack.packb(key)))
+            else:
+                run += msgpack.packb(key) + msgpack.packb(
+                    fields[key], use_bin_type=True
+                )
+                self.constantCount += 1
+        if run:
+            self.segments.append(run)
+
+        size = 3 + sum(
+            len(s) if isinstance(s, bytes) else MAX_PATCH_SIZE for s in self.segments
+        )
+        self.buffer = bytearray(size)
+
+    def encode(self, values: Dict[str, Any]) -> bytes:
+        buffer = self.buffer
+        count = self.constantCount
+        pos = 3
+        for segment in self.segments:
+            if isinstance(segment, bytes):
+                end = pos + len(segment)
+                buffer[pos:end] = segment
+                pos = end
+                continue
+
+            key, packedKey = segment
+            value = values.get(key)
+            if not value:
+                continue
+            packed = packedKey + msgpack.packb(value, use_bin_type=True)
+            end = pos + len(packed)
+            buffer[pos:end] = packed
+            pos = end
+            count += 1
+
+        header = _packHeader(count)
+        start = 3 - len(header)
+        buffer[start:3] = header
+        return bytes(buffer[start:pos])
+
+
+def _txid(encoded: bytes) -> bytes:
+    return encoding.checksum(constants.txid_prefix + encoded)
+
+
+def _formatTxid(raw: bytes) -> str:
+    return encoding._undo_padding(b32encode(raw).decode())
+
+
+class GroupTemplate:
+    """Templates for every transaction of a fixed-shape atomic group."""
+
+    __slots__ = ("txns",)
+
+    def __init__(self, txns: List[transaction.Transaction]) -> None:
+        self.txns = [TxnTemplate(txn) for txn in txns]
+
+    def encode(
+        self,
+        amounts: Sequence[Optional[int]],
+        suggestedParams: transaction.SuggestedParams,
+        note: Optional[bytes] = None,
+        lease: Optional[bytes] = None,
+    ) -> Tuple[List[bytes], List[str]]:
+        """Return the grouped, unsigned encodings and their txIDs.
+
+        ``note`` and ``lease`` are set on the first transaction only.
+        """
+        values = [
+            {
+                template.amountKey: amount,
+                "fv": suggestedParams.first,
+                "lv": suggestedParams.last,
+                "gh": b64decode(suggestedParams.gh),
+            }
+            for template, amount in zip(self.txns, amounts)
+        ]
+        values[0]["note"] = note
+        values[0]["lx"] = lease
+
+        hashes = [_txid(t.encode(v)) for t, v in zip(self.txns, values)]
+        groupID = encoding.checksum(
+            constants.tgid_prefix
+            + msgpack.packb({"txlist": hashes}, use_bin_type=True)
+        )
+
+        encoded = []
+        for template, value in zip(self.txns, values):
+            value["grp"] = groupID
+            encoded.append(template.encode(value))
+
+        return encoded, [_formatTxid(_txid(e)) for e in encoded]
+
+
+def signEncoded(encoded: List[bytes], signer: Account) -> List[bytes]:
+    """Sign canonical transaction encodings, returning SignedTransaction msgpack."""
+    prefix = b"\x82" + msgpack.packb("sig")
+    txnKey = msgpack.packb("txn")
+    return [
+        prefix + msgpack.packb(sig, use_bin_type=True) + txnKey + e
+        for sig, e in zip(signer.signMany(encoded), encoded)
+    ]
+
+
+def sendRawGroup(client: AlgodClient, signedTxns: List[bytes]) -> str:
+    return client.send_raw_transaction(b64encode(b"".join(signedTxns)))
+
+
+def _isTemplatable(suggestedParams: transaction.SuggestedParams) -> bool:
+    # with a per-byte fee the fee depends on the encoded size, i.e. on amounts
+    return suggestedParams.flat_fee or suggestedParams.fee == 0
+
+
+def _effectiveFee(suggestedParams: transaction.SuggestedParams) -> int:
+    # a zero per-byte fee is raised to the minimum fee by the builders
+    if suggestedParams.flat_fee:
+        return suggestedParams.fee
+    return max(suggestedParams.min_fee or 0, constants.min_txn_fee)
+
+
+class TemplateCache:
+    """GroupTemplates keyed by (pool, account, operation).
+
+    Templates are built once from the same ``get*Txns`` builders the
+    operations use, with placeholder amounts. The fee the transactions carry
+    (not the suggested per-byte fee) and the genesis id are part of the key
+    since they are baked into the constant segments.
+
+    Templates encode into preallocated buffers, so a cache must not be
+    shared between threads.
+    """
+
+    def __init__(self) -> None:
+        self.templates: Dict[Tuple, GroupTemplate] = dict()
+
+    def build(
+        self,
+        key: Tuple,
+        builder: Callable[[Sequence[Optional[int]], Any], List[transaction.Transaction]],
+        amounts: Sequence[Optional[int]],
+        suggestedParams: transaction.SuggestedParams,
+        signer: Account,
+        note: Optional[bytes] = None,
+        lease: Optional[bytes] = None,
+    ) -> Tuple[List[bytes], List[str]]:
+        """Return the signed group and its txIDs.
+
+        ``builder(amounts, suggestedParams)`` must return the ungrouped
+        transactions; ``amounts`` holds one entry per transaction, None for
+        those without an amount.
+        """
+        if not _isTemplatable(suggestedParams):
+            txns = builder(amounts, suggestedParams)
+            txns[0].note = note
+            txns[0].lease = lease
+            transaction.assign_group_id(txns)
+            encoded = [b64decode(encoding.msgpack_encode(t)) for t in txns]
+            return signEncoded(encoded, signer), [t.get_txid() for t in txns]
+
+        key = key + (_effectiveFee(suggestedParams), suggestedParams.gen)
+        template = self.templates.get(key)
+        if template is None:
+            placeholders = [None if a is None else 1 for a in amounts]
+            template = GroupTemplate(builder(placeholders, suggestedParams))
+            self.templates[key] = template
+
+        encoded, txids = template.encode(amounts, suggestedParams, note, lease)
+        return signEncoded(encoded, signer), txids
+
+    def supply(
+        self,
+        appID: int,
+        appGlobalState: dict,
+        qA: int,
+        qB: int,
+        supplier: Account,
+        suggestedParams: transaction.SuggestedParams,
+        note: Optional[bytes] = None,
+        lease: Optional[bytes] = None,
+    ) -> Tuple[List[bytes], List[str]]:
+        addr = supplier.getAddress()
+        return self.build(
+            (appID, addr, "supply"),
+            lambda amounts, sp: getSupplyTxns(
+                appID, appGlobalState, amounts[1], amounts[2], addr, sp
+            ),
+            [2_000, qA, qB, None],
+            suggestedParams,
+            supplier,
+            note,
+            lease,
+        )
+
+    def withdraw(
+        self,
+        appID: int,
+        appGlobalState: dict,
+        poolTokenAmount: int,
+        withdrawAccount: Account,
+        suggestedParams: transaction.SuggestedParams,
+        note: Optional[bytes] = None,
+        lease: Optional[bytes] = None,
+    ) -> Tuple[List[bytes], List[str]]:
+        addr = withdrawAccount.getAddress()
+        return self.build(
+            (appID, addr, "withdraw"),
+            lambda amounts, sp: getWithdrawTxns(
+                appID, appGlobalState, amounts[1], addr, sp
+            ),
+            [2_000, poolTokenAmount, None],
+            suggestedParams,
+            withdrawAccount,
+            note,
+            lease,
+        )
+
+    def swap(
+        self,
+        appID: int,
+        appGlobalState: dict,
+        tokenId: int,
+        amount: int,
+        trader: Account,
+        suggestedParams: transaction.SuggestedParams,
+        note: Optional[bytes] = None,
+        lease: Optional[bytes] = None,
+    ) -> Tuple[List[bytes], List[str]]:
+        addr = trader.getAddress()
+        return self.build(
+            (appID, addr, "swap", tokenId),
+            lambda amounts, sp: getSwapTxns(
+                appID, appGlobalState, tokenId, amounts[1], addr, sp
+            ),
+            [1_000, amount, None],
+            suggestedParams,
+            trader,
+            note,
+            lease,
+        )
@@ -0,0 +1,172 @@
+import http.client
+import json
+import socket
+import threading
+from queue import Empty, LifoQueue
+from typing import Dict, Optional, Tuple
+from urllib import parse
+
+from algosdk import constants, error
+from algosdk.v2client.algod import AlgodClient, api_version_path_prefix
+
+
+class ConnectionPool:
+    """Persistent HTTP/1.1 keep-alive connections to one host.
+
+    Args:
+        scheme: "http" or "https".
+        host: host name.
+        port: port, or None for the scheme default.
+        maxIdle: connections kept open between requests.
+        maxPerHost: connections allowed at once; further requests wait.
+        timeout: socket timeout in seconds.
+    """
+
+    def __init__(
+        self,
+        scheme: str,
+        host: str,
+        port: Optional[int],
+        maxIdle: int = 10,
+        maxPerHost: int = 32,
+        timeout: float = 30.0,
+    ) -> None:
+        self.connectionClass = (
+            http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        )
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle: "LifoQueue[http.client.HTTPConnection]" = LifoQueue(maxsize=maxIdle)
+        self.slots = threading.BoundedSemaphore(maxPerHost)
+        self.lock = threading.Lock()
+        self.created = 0
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return a connection and whether it was reused from the idle pool."""
+        self.slots.acquire()
+        try:
+            return self.idle.get_nowait(), True
+        except Empty:
+            with self.lock:
+                self.created += 1
+            return (
+                self.connectionClass(self.host, self.port, timeout=self.timeout),
+                False,
+            )
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool) -> None:
+        try:
+            if reusable:
+                try:
+                    self.idle.put_nowait(connection)
+                    return
+                except Exception:
+                    pass
+            connection.close()
+        finally:
+            self.slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Empty:
+                return
+
+
+_POOLS: Dict[Tuple[str, str, Optional[int]], ConnectionPool] = dict()
+_POOLS_LOCK = threading.Lock()
+
+
+def getConnectionPool(address: str, **options) -> ConnectionPool:
+    """Connection pool shared by every client talking to the same host."""
+    url = parse.urlsplit(address)
+    key = (url.scheme, url.hostname, url.port)
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = ConnectionPool(url.scheme, url.hostname, url.port, **options)
+        return _POOLS[key]
+
+
+class PooledAlgodClient(AlgodClient):
+    """AlgodClient that sends requests over pooled keep-alive connections
+    instead of opening a new urllib connection per request.
+
+    It is a drop-in replacement: pass it as the ``client`` argument of any
+    function in deposit.operations or deposit.utils.
+    """
+
+    def __init__(
+        self,
+        algod_token: str,
+        algod_address: str,
+        headers: Optional[Dict[str, str]] = None,
+        **poolOptions,
+    ) -> None:
+        super().__init__(algod_token, algod_address, headers)
+        self.basePath = parse.urlsplit(algod_address).path.rstrip("/")
+        self.pool = getConnectionPool(algod_address, **poolOptions)
+
+    def algod_request(
+        self,
+        method,
+        requrl,
+        params=None,
+        data=None,
+        headers=None,
+        response_format="json",
+    ):
+        header = {"User-Agent": "py-algorand-sdk", "Connection": "keep-alive"}
+
+        if self.headers:
+            header.update(self.headers)
+
+        if headers:
+            header.update(headers)
+
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+
+        if requrl not in constants.unversioned_paths:
+            requrl = api_version_path_prefix + requrl
+        if params:
+            requrl = requrl + "?" + parse.urlencode(params)
+
+        status, body = self._send(method, self.basePath + requrl, data, header)
+
+        if status >= 400:
+            message = body.decode("utf-8")
+            try:
+                message = json.loads(message)["message"]
+            finally:
+                raise error.AlgodHTTPError(message, status)
+
+        if response_format == "json":
+            try:
+                return json.loads(body)
+            except Exception as e:
+                raise error.AlgodResponseError(
+                    "Failed to parse JSON response from algod"
+                ) from e
+        return body
+
+    def _send(self, method, path, data, header) -> Tuple[int, bytes]:
+        while True:
+            connection, reused = self.pool.acquire()
+            reusable = False
+            try:
+                connection.request(method, path, body=data, headers=header)
+                response = connection.getresponse()
+                body = response.read()
+                reusable = not response.will_close
+            except (http.client.HTTPException, OSError) as e:
+                # the server may have closed an idle keep-alive connection;
+                # retry once on a fresh one, but not after a timeout
+                if reused and not isinstance(e, socket.timeout):
+                    continue
+                raise
+            finally:
+                # a connection that failed mid-request is never reused
+                self.pool.release(connection, reusable)
+            return response.status, body
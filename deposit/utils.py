@@ -1,28 +1,111 @@
-from typing import List, Tuple, Dict, Any, Optional, Union
-from base64 import b64decode
+from typing import List, Tuple, Dict, Any, Iterator, Mapping, Optional, Union
+from base64 import b64decode, b64encode
 
+import msgpack
 from algosdk.v2client.algod import AlgodClient
 
 from pyteal import compileTeal, Mode, Expr
 
+from .balances import fetchBalances
+from .instrumentation import observeRoundsToConfirm
+
+
+class PoolError(Exception):
+    """The node dropped a transaction from its pool."""
+
+    def __init__(self, txID: str, message: str) -> None:
+        super().__init__("Pool error: {}".format(message))
+        self.txID = txID
+        self.message = message
+
+
+class ConfirmationTimeout(Exception):
+    def __init__(self, txID: str, rounds: int) -> None:
+        super().__init__(
+            "Transaction {} not confirmed after {} rounds".format(txID, rounds)
+        )
+        self.txID = txID
+        self.rounds = rounds
+
+
+def _decodeLog(log: Union[str, bytes]) -> bytes:
+    # JSON responses carry logs base64-encoded, msgpack responses as raw bytes
+    return log if isinstance(log, bytes) else b64decode(log)
+
 
 class PendingTxnResponse:
+    """Lazy view over a pending transaction response (JSON or msgpack).
+
+    Fields are read from the underlying response on access, and logs are
+    only decoded the first time ``logs`` is read.
+    """
+
+    __slots__ = ("response", "_logs")
+
     def __init__(self, response: Dict[str, Any]) -> None:
-        self.poolError: str = response["pool-error"]
-        self.txn: Dict[str, Any] = response["txn"]
+        self.response = response
+        self._logs: Optional[List[bytes]] = None
+
+    @property
+    def poolError(self) -> str:
+        return self.response.get("pool-error", "")
+
+    @property
+    def txn(self) -> Dict[str, Any]:
+        return self.response["txn"]
+
+    @property
+    def applicationIndex(self) -> Optional[int]:
+        return self.response.get("application-index")
+
+    @property
+    def assetIndex(self) -> Optional[int]:
+        return self.response.get("asset-index")
+
+    @property
+    def closeRewards(self) -> Optional[int]:
+        return self.response.get("close-rewards")
+
+    @property
+    def closingAmount(self) -> Optional[int]:
+        return self.response.get("closing-amount")
+
+    @property
+    def confirmedRound(self) -> Optional[int]:
+        return self.response.get("confirmed-round")
+
+    @property
+    def globalStateDelta(self) -> Optional[Any]:
+        return self.response.get("global-state-delta")
 
-        self.applicationIndex: Optional[int] = response.get("application-index")
-        self.assetIndex: Optional[int] = response.get("asset-index")
-        self.closeRewards: Optional[int] = response.get("close-rewards")
-        self.closingAmount: Optional[int] = response.get("closing-amount")
-        self.confirmedRound: Optional[int] = response.get("confirmed-round")
-        self.globalStateDelta: Optional[Any] = response.get("global-state-delta")
-        self.localStateDelta: Optional[Any] = response.get("local-state-delta")
-        self.receiverRewards: Optional[int] = response.get("receiver-rewards")
-        self.senderRewards: Optional[int] = response.get("sender-rewards")
+    @property
+    def localStateDelta(self) -> Optional[Any]:
+        return self.response.get("local-state-delta")
 
-        self.innerTxns: List[Any] = response.get("inner-txns", [])
-        self.logs: List[bytes] = [b64decode(l) for l in response.get("logs", [])]
+    @property
+    def receiverRewards(self) -> Optional[int]:
+        return self.response.get("receiver-rewards")
+
+    @property
+    def senderRewards(self) -> Optional[int]:
+        return self.response.get("sender-rewards")
+
+    @property
+    def innerTxns(self) -> List[Any]:
+        return self.response.get("inner-txns", [])
+
+    @property
+    def logs(self) -> List[bytes]:
+        if self._logs is None:
+            self._logs = [_decodeLog(l) for l in self.response.get("logs", [])]
+        return self._logs
+
+
+def getPendingTransaction(client: AlgodClient, txID: str) -> Dict[str, Any]:
+    """pending_transaction_info, fetched and decoded as msgpack."""
+    return msgpack.unpackb(
+        client.pending_transaction_info(txID, response_format="msgpack"), raw=False
+    )
 
 
 def waitForTransaction(
@@ -33,80 +116,109 @@ def waitForTransaction(
     startRound = lastRound
 
     while lastRound < startRound + timeout:
-        pending_txn = client.pending_transaction_info(txID)
+        pending_txn = getPendingTransaction(client, txID)
 
         if pending_txn.get("confirmed-round", 0) > 0:
+            observeRoundsToConfirm(pending_txn["confirmed-round"] - startRound)
             return PendingTxnResponse(pending_txn)
 
-        if pending_txn["pool-error"]:
-            raise Exception("Pool error: {}".format(pending_txn["pool-error"]))
+        if pending_txn.get("pool-error"):
+            raise PoolError(txID, pending_txn["pool-error"])
 
         lastStatus = client.status_after_block(lastRound + 1)
 
         lastRound += 1
 
-    raise Exception(
-        "Transaction {} not confirmed after {} rounds".format(txID, timeout)
-    )
+    raise ConfirmationTimeout(txID, timeout)
 
 
 def fullyCompileContract(client: AlgodClient, contract: Expr) -> bytes:
-    teal = compileTeal(contract, mode=Mode.Application, version=5)
+    teal = compileTeal(contract, mode=Mode.Application, version=6)
     response = client.compile(teal)
     return b64decode(response["result"])
 
 
+def decodeStateValue(value: Dict[str, Any]) -> Union[int, bytes]:
+    valueType = value["type"]
+
+    if valueType == 2:
+        # value is uint64
+        return value.get("uint", 0)
+    elif valueType == 1:
+        # value is byte array
+        return b64decode(value.get("bytes", ""))
+    else:
+        raise Exception(f"Unexpected state type: {valueType}")
+
+
 def decodeState(stateArray: List[Any]) -> Dict[bytes, Union[int, bytes]]:
     state: Dict[bytes, Union[int, bytes]] = dict()
 
     for pair in stateArray:
-        key = b64decode(pair["key"])
+        state[b64decode(pair["key"])] = decodeStateValue(pair["value"])
 
-        value = pair["value"]
-        valueType = value["type"]
+    return state
 
-        if valueType == 2:
-            # value is uint64
-            value = value.get("uint", 0)
-        elif valueType == 1:
-            # value is byte array
-            value = b64decode(value.get("bytes", ""))
-        else:
-            raise Exception(f"Unexpected state type: {valueType}")
 
-        state[key] = value
+class StateView(Mapping):
+    """Read-only, lazily decoded view of an app state array.
 
-    return state
+    Lookups base64-encode the requested key and decode only that value, so
+    reading a few keys does not pay for decoding the whole state.
+    """
 
+    __slots__ = ("raw", "decoded")
 
-def getAppGlobalState(
-    client: AlgodClient, appID: int
-) -> Dict[bytes, Union[int, bytes]]:
-    appInfo = client.application_info(appID)
-    return decodeState(appInfo["params"]["global-state"])
+    def __init__(self, stateArray: List[Any]) -> None:
+        self.raw: Dict[str, Dict[str, Any]] = {
+            pair["key"]: pair["value"] for pair in stateArray
+        }
+        self.decoded: Dict[bytes, Union[int, bytes]] = dict()
 
+    def __getitem__(self, key: bytes) -> Union[int, bytes]:
+        try:
+            return self.decoded[key]
+        except KeyError:
+            pass
+        value = decodeStateValue(self.raw[b64encode(key).decode()])
+        self.decoded[key] = value
+        return value
 
-def getBalances(client: AlgodClient, account: str) -> Dict[int, int]:
-    balances: Dict[int, int] = dict()
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, bytes) and b64encode(key).decode() in self.raw
 
-    accountInfo = client.account_info(account)
+    def __iter__(self) -> Iterator[bytes]:
+        return (b64decode(k) for k in self.raw)
 
-    # set key 0 to Algo balance
-    balances[0] = accountInfo["amount"]
+    def __len__(self) -> int:
+        return len(self.raw)
 
-    assets: List[Dict[str, Any]] = accountInfo.get("assets", [])
-    for assetHolding in assets:
-        assetID = assetHolding["asset-id"]
-        amount = assetHolding["amount"]
-        balances[assetID] = amount
 
-    return balances
+def getAppGlobalState(client: AlgodClient, appID: int) -> StateView:
+    # the applications endpoint only serves JSON
+    appInfo = client.application_info(appID)
+    return StateView(appInfo["params"].get("global-state", []))
+
+
+def getBalances(
+    client: AlgodClient, account: str, assetIDs: Optional[List[int]] = None
+) -> Mapping[int, int]:
+    """Map of asset id to amount held by ``account``, with key 0 set to the
+    Algo balance. Only ``assetIDs`` are kept if given. See deposit.balances."""
+    return fetchBalances(client, account, assetIDs)
 
 
 def getLastBlockTimestamp(client: AlgodClient) -> Tuple[int, int]:
+    """Return the (round, timestamp) of the latest block.
+
+    This costs a status call and a block fetch; code that needs it
+    repeatedly should use deposit.clock.RoundClock instead.
+    """
     status = client.status()
     lastRound = status["last-round"]
-    block = client.block_info(lastRound)
+    block = msgpack.unpackb(
+        client.block_info(lastRound, response_format="msgpack"), raw=False
+    )
     timestamp = block["block"]["ts"]
 
-    return block, timestamp
\ No newline at end of file
+    return lastRound, timestamp
\ No newline at end of file
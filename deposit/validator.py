@@ -0,0 +1,429 @@
+"""Client-side pre-validation of unsigned groups against the approval program.
+
+The checks mirror ``validateTokenReceived`` and the supply, withdraw and swap
+programs in deposit/contracts/contracts.py, using cached pool state, so a
+group the contract would reject is caught before it is signed and sent.
+The arithmetic is deposit.model, which matches the program exactly.
+
+A group is only as valid as the state it is checked against: a group that
+passes can still fail if the pool moves before it lands.
+"""
+
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from algosdk import constants, encoding
+from algosdk.future import transaction
+from algosdk.logic import get_application_address
+from algosdk.v2client.algod import AlgodClient
+
+from .model import (
+    POOL_TOKEN_DEFAULT_AMOUNT,
+    ArrayLike,
+    ContractReject,
+    PoolModel,
+    checkedAdd,
+    checkedMul,
+    isqrt,
+    swapOutputBatch,
+    wideRatio,
+)
+from .utils import getAppGlobalState, getBalances
+
+MAX_GROUP_SIZE = constants.tx_group_limit
+
+SUPPLY, WITHDRAW, SWAP, ZAP = 0, 1, 2, 3
+KINDS = {b"supply": SUPPLY, b"withdraw": WITHDRAW, b"swap": SWAP, b"zap": ZAP}
+# how far back each kind reads with Txn.group_index() - n
+REACH = (2, 1, 1, 1)
+
+
+class PoolState:
+    """Cached state of one pool: its parameters and the app's holdings.
+
+    Args:
+        appID: the app id.
+        appGlobalState: the app's decoded global state.
+        balances: the app account's holdings, asset id -> amount.
+    """
+
+    __slots__ = (
+        "appID",
+        "address",
+        "creator",
+        "tokenA",
+        "tokenB",
+        "poolToken",
+        "model",
+    )
+
+    def __init__(
+        self, appID: int, appGlobalState: Mapping, balances: Mapping[int, int]
+    ) -> None:
+        self.appID = appID
+        self.address = get_application_address(appID)
+        self.creator = appGlobalState.get(b"creator_key")
+        self.tokenA = appGlobalState[b"token_a_key"]
+        self.tokenB = appGlobalState[b"token_b_key"]
+        self.poolToken = appGlobalState.get(b"pool_token_key")
+        self.model = PoolModel(
+            appGlobalState[b"fee_bps_key"],
+            appGlobalState[b"min_increment_key"],
+            balances.get(self.tokenA, 0),
+            balances.get(self.tokenB, 0),
+            appGlobalState.get(b"pool_tokens_outstanding_key", 0),
+        )
+
+    @classmethod
+    def fetch(cls, client: AlgodClient, appID: int) -> "PoolState":
+        return cls(
+            appID,
+            getAppGlobalState(client, appID),
+            getBalances(client, get_application_address(appID)),
+        )
+
+
+class _Call(NamedTuple):
+    kind: int
+    appID: int
+    a: int  # token A (supply), pool token (withdraw) or input (swap) amount
+    b: int  # token B amount (supply), 1 if the swap input is token A
+    error: Optional[str]
+
+
+def _u64(*values: ArrayLike) -> Tuple[np.ndarray, ...]:
+    return tuple(np.asarray(v, dtype=np.uint64) for v in values)
+
+
+def _unwrap(txns: Sequence) -> List[transaction.Transaction]:
+    # accept signed transactions too
+    if txns and isinstance(txns[0], transaction.Transaction):
+        return txns
+    return [getattr(txn, "transaction", txn) for txn in txns]
+
+
+def _received(
+    txns: List[transaction.Transaction],
+    index: int,
+    sender: str,
+    pool: PoolState,
+    tokens: Tuple[int, ...],
+) -> Optional[str]:
+    """validateTokenReceived for any of ``tokens``; None if it holds."""
+    if index < 0:
+        return "group index underflow"
+    txn = txns[index]
+    if txn.type != constants.assettransfer_txn:
+        return "transaction {} is not an asset transfer".format(index)
+    if txn.sender != sender:
+        return "transaction {} is from another sender".format(index)
+    if txn.receiver != pool.address:
+        return "transaction {} is not sent to the app".format(index)
+    if txn.index not in tokens:
+        return "transaction {} transfers asset {}".format(index, txn.index)
+    if not txn.amount or txn.amount <= 0:
+        return "transaction {} transfers nothing".format(index)
+    return None
+
+
+def _call(
+    txns: List[transaction.Transaction], i: int, pool: PoolState
+) -> Optional[_Call]:
+    """The structural checks of the call at ``i``: None for a call the
+    validator does not model (create, delete and the like), otherwise the
+    amounts the math needs, or the reason the call fails."""
+    txn = txns[i]
+    method = txn.app_args[0] if txn.app_args else b""
+    kind = KINDS.get(method)
+    if txn.on_complete != transaction.OnComplete.NoOpOC:
+        if txn.on_complete == transaction.OnComplete.DeleteApplicationOC:
+            return None
+        return _Call(-1, pool.appID, 0, 0, "on completion rejected")
+    if kind is None:
+        if method == b"setup":
+            return None
+        return _Call(-1, pool.appID, 0, 0, "no matching method {!r}".format(method))
+
+    if pool.poolToken is None:
+        return _Call(kind, pool.appID, 0, 0, "app is not set up")
+
+    used = (pool.tokenA, pool.tokenB) + ((pool.poolToken,) if kind != SWAP else ())
+    available = txn.foreign_assets or ()
+    for assetID in used:
+        if assetID not in available:
+            return _Call(kind, pool.appID, 0, 0, "unavailable Asset {}".format(assetID))
+
+    if kind == SUPPLY:
+        error = _received(txns, i - 2, txn.sender, pool, (pool.tokenA,)) or _received(
+            txns, i - 1, txn.sender, pool, (pool.tokenB,)
+        )
+        if error:
+            return _Call(kind, pool.appID, 0, 0, error)
+        return _Call(kind, pool.appID, txns[i - 2].amount, txns[i - 1].amount, None)
+
+    if kind == WITHDRAW:
+        error = _received(txns, i - 1, txn.sender, pool, (pool.poolToken,))
+        if error:
+            return _Call(kind, pool.appID, 0, 0, error)
+        return _Call(kind, pool.appID, txns[i - 1].amount, 0, None)
+
+    error = _received(txns, i - 1, txn.sender, pool, (pool.tokenA, pool.tokenB))
+    if error:
+        return _Call(kind, pool.appID, 0, 0, error)
+    given = txns[i - 1]
+    return _Call(kind, pool.appID, given.amount, int(given.index == pool.tokenA), None)
+
+
+def _apply(call: _Call, model: PoolModel) -> None:
+    """Run the call's math on ``model``; raises ContractReject."""
+    if call.kind == SUPPLY:
+        model.supply(call.a, call.b)
+    elif call.kind == WITHDRAW:
+        model.withdraw(call.a)
+    elif call.kind == ZAP:
+        model.zap(bool(call.b), call.a)
+    else:
+        model.swap(bool(call.b), call.a)
+
+
+def _deletable(
+    txn: transaction.Transaction, pool: PoolState, model: PoolModel
+) -> Optional[str]:
+    if model.outstanding != 0:
+        return "pool tokens outstanding"
+    if pool.creator is not None and encoding.decode_address(txn.sender) != pool.creator:
+        return "sender is not the creator"
+    return None
+
+
+def validateGroup(txns: Sequence, pools: Mapping[int, PoolState]) -> Optional[str]:
+    """Check a group against the contract rules; None if it would pass.
+
+    Calls are applied in order to copies of the cached pools, so later calls
+    in the group see the effect of earlier ones. Transfers to a pool that no
+    call reads are counted as donations to its reserves.
+    """
+    txns = _unwrap(txns)
+    if len(txns) > MAX_GROUP_SIZE:
+        return "group of {} exceeds {} transactions".format(len(txns), MAX_GROUP_SIZE)
+
+    byAddress: Optional[Dict[str, PoolState]] = None
+    read = set()
+    for i, txn in enumerate(txns):
+        if txn.type == constants.appcall_txn and txn.index in pools:
+            kind = KINDS.get(txn.app_args[0] if txn.app_args else b"")
+            if kind is not None:
+                read.update(range(max(i - REACH[kind], 0), i))
+
+    models: Dict[int, PoolModel] = {}
+    for i, txn in enumerate(txns):
+        if txn.type == constants.assettransfer_txn and i not in read:
+            if byAddress is None:
+                byAddress = {pool.address: pool for pool in pools.values()}
+            pool = byAddress.get(txn.receiver)
+            if pool is not None and txn.amount:
+                model = models.setdefault(pool.appID, pool.model.copy())
+                if txn.index == pool.tokenA:
+                    model.reserveA += txn.amount
+                elif txn.index == pool.tokenB:
+                    model.reserveB += txn.amount
+            continue
+
+        if txn.type != constants.appcall_txn or txn.index not in pools:
+            continue
+        pool = pools[txn.index]
+        model = models.setdefault(pool.appID, pool.model.copy())
+        if txn.on_complete == transaction.OnComplete.DeleteApplicationOC:
+            error = _deletable(txn, pool, model)
+            if error:
+                return "transaction {}: {}".format(i, error)
+            continue
+
+        call = _call(txns, i, pool)
+        if call is None:
+            continue
+        if call.error:
+            return "transaction {}: {}".format(i, call.error)
+        try:
+            _apply(call, model)
+        except ContractReject as e:
+            return "transaction {}: {}".format(i, e)
+    return None
+
+
+def _single(
+    txns: List[transaction.Transaction], pools: Mapping[int, PoolState]
+) -> Optional[_Call]:
+    """The group's pool call if the group is nothing but one well-formed
+    supply, withdraw or swap; None if it needs the sequential path."""
+    if not txns or len(txns) > MAX_GROUP_SIZE:
+        return None
+    last = txns[-1]
+    if last.type != constants.appcall_txn or last.index not in pools:
+        return None
+    pool = pools[last.index]
+    kind = KINDS.get(last.app_args[0] if last.app_args else b"")
+    # zaps have no array check and take the sequential path
+    if kind is None or kind == ZAP:
+        return None
+
+    # a transfer to the pool the call does not read would shift its reserves
+    unread = len(txns) - 1 - REACH[kind]
+    for i in range(len(txns) - 1):
+        txn = txns[i]
+        if txn.type == constants.appcall_txn:
+            return None
+        if (
+            i < unread
+            and txn.type == constants.assettransfer_txn
+            and txn.receiver == pool.address
+        ):
+            return None
+
+    call = _call(txns, len(txns) - 1, pool)
+    if call is None or call.error:
+        return None
+    return call
+
+
+# The array checks below take amounts and pool state as arrays or scalars that
+# broadcast against each other, and return a mask of elements the contract
+# would accept. They cover the math and the positive-amount asserts only, not
+# the shape of the group.
+
+
+def supplyAccepted(
+    qA: ArrayLike,
+    qB: ArrayLike,
+    reserveA: ArrayLike,
+    reserveB: ArrayLike,
+    outstanding: ArrayLike,
+    minIncrement: ArrayLike,
+) -> np.ndarray:
+    """Mask of supplies of ``qA`` and ``qB`` the supply program accepts."""
+    qA, qB, rA, rB, outstanding, minIncrement = _u64(
+        qA, qB, reserveA, reserveB, outstanding, minIncrement
+    )
+    ok = (qA > 0) & (qB > 0) & (qA >= minIncrement) & (qB >= minIncrement)
+    ok &= outstanding < POOL_TOKEN_DEFAULT_AMOUNT
+    ok &= checkedAdd(rA, qA)[1] & checkedAdd(rB, qB)[1]
+    room = np.where(
+        outstanding < POOL_TOKEN_DEFAULT_AMOUNT,
+        np.uint64(POOL_TOKEN_DEFAULT_AMOUNT) - outstanding,
+        np.uint64(0),
+    )
+
+    initial = (rA == 0) | (rB == 0)
+    product, productOk = checkedMul(qA, qB)
+    initialOk = productOk & (isqrt(product) <= room)
+
+    # tryTakeAdjustedAmounts keeping all of A, then keeping all of B
+    safeA = np.where(initial, np.uint64(1), rA)
+    safeB = np.where(initial, np.uint64(1), rB)
+    correspondingB, okB = wideRatio(qA, rB, safeA)
+    takeA = (correspondingB > 0) & (qB >= correspondingB)
+    mintedA, mintedAOk = wideRatio(outstanding, qA, safeA)
+    correspondingA, okA = wideRatio(qB, rA, safeB)
+    takeB = (correspondingA > 0) & (qA >= correspondingA)
+    mintedB, mintedBOk = wideRatio(outstanding, qB, safeB)
+
+    adjustedOk = okB & np.where(
+        takeA,
+        mintedAOk & (mintedA <= room),
+        okA & takeB & mintedBOk & (mintedB <= room),
+    )
+    return ok & np.where(initial, initialOk, adjustedOk)
+
+
+def withdrawAccepted(
+    amount: ArrayLike,
+    reserveA: ArrayLike,
+    reserveB: ArrayLike,
+    outstanding: ArrayLike,
+) -> np.ndarray:
+    """Mask of withdrawals of ``amount`` pool tokens the withdraw program accepts."""
+    amount, rA, rB, outstanding = _u64(amount, reserveA, reserveB, outstanding)
+    ok = (amount > 0) & (rA > 0) & (rB > 0) & (outstanding > 0)
+    ok &= amount <= outstanding
+    safe = np.where(outstanding == 0, np.uint64(1), outstanding)
+    outA, okA = wideRatio(rA, amount, safe)
+    outB, okB = wideRatio(rB, amount, safe)
+    return ok & okA & okB & (outA > 0) & (outB > 0) & (outA <= rA) & (outB <= rB)
+
+
+def swapAccepted(
+    amount: ArrayLike,
+    givenIsA: ArrayLike,
+    reserveA: ArrayLike,
+    reserveB: ArrayLike,
+    outstanding: ArrayLike,
+    feeBps: ArrayLike,
+) -> np.ndarray:
+    """Mask of swaps of ``amount`` of token A (or B) the swap program accepts."""
+    amount, rA, rB, outstanding, feeBps = _u64(
+        amount, reserveA, reserveB, outstanding, feeBps
+    )
+    givenIsA = np.asarray(givenIsA, dtype=bool)
+    given = np.where(givenIsA, rA, rB)
+    other = np.where(givenIsA, rB, rA)
+    return (outstanding > 0) & swapOutputBatch(amount, given, other, feeBps)[1]
+
+
+def validateBatch(
+    groups: Sequence[Sequence], pools: Mapping[int, PoolState], explain: bool = True
+) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """Check many groups independently against the same cached pool state.
+
+    Groups made of one supply, withdraw or swap (the shape the get*Txns
+    builders produce) have their math checked with NumPy across the whole
+    batch; anything else goes through validateGroup. Returns a boolean mask
+    of groups that would pass and, for those that would not, the reason
+    (unless ``explain`` is False, which leaves the reasons None).
+    """
+    n = len(groups)
+    ok = np.zeros(n, dtype=bool)
+    reasons: List[Optional[str]] = [None] * n
+
+    calls: List[List[Tuple[int, _Call]]] = [[], [], []]
+    for g, group in enumerate(groups):
+        txns = _unwrap(group)
+        call = _single(txns, pools)
+        if call is None:
+            reasons[g] = validateGroup(txns, pools)
+            ok[g] = reasons[g] is None
+        else:
+            calls[call.kind].append((g, call))
+
+    for kind, items in enumerate(calls):
+        if not items:
+            continue
+        index = np.fromiter((g for g, _ in items), dtype=np.int64, count=len(items))
+        models = [pools[call.appID].model for _, call in items]
+
+        def column(values) -> np.ndarray:
+            return np.fromiter(values, dtype=np.uint64, count=len(items))
+
+        a = column(call.a for _, call in items)
+        b = column(call.b for _, call in items)
+        rA = column(m.reserveA for m in models)
+        rB = column(m.reserveB for m in models)
+        outstanding = column(m.outstanding for m in models)
+
+        if kind == SUPPLY:
+            passed = supplyAccepted(
+                a, b, rA, rB, outstanding, column(m.minIncrement for m in models)
+            )
+        elif kind == WITHDRAW:
+            passed = withdrawAccepted(a, rA, rB, outstanding)
+        else:
+            passed = swapAccepted(
+                a, b.astype(bool), rA, rB, outstanding, column(m.feeBps for m in models)
+            )
+        ok[index] = passed
+
+        if explain:
+            # the sequential path names the reason
+            for g in index[~passed]:
+                reasons[g] = validateGroup(groups[g], pools)
+
+    return ok, reasons
@@ -0,0 +1,104 @@
+"""Vectorized valuation of LP positions.
+
+For every pool-token holder, computes what ``withdrawGivenPoolToken`` would
+pay out if the holder withdrew their whole balance against the current
+reserves:
+
+    outA = WideRatio([reserveA, balance, SCALING_FACTOR], [outstanding, SCALING_FACTOR])
+
+and the same for token B. The products do not fit in 64 bits, so the floor
+division is done exactly in uint64 limbs (see mulDivFloor) instead of with
+Python integers.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from .model import SCALING_FACTOR, UINT128_LIMIT, UINT64_MAX
+from .snapshot import BalanceSnapshot
+
+
+def mulDivFloor(x: int, y: np.ndarray, z: int) -> np.ndarray:
+    """Exact ``floor(x * y / z)`` for scalars ``x``, ``z`` and a uint64 array
+    ``y`` whose elements are at most ``z`` (so every result is at most ``x``).
+
+    With ``x = q * z + r`` the result is ``q * y + floor(r * y / z)``. The
+    second term is long division of ``r * y`` by ``z``, feeding ``y`` in
+    chunks of ``b`` bits small enough that ``remainder * 2 ** b + r * chunk``
+    stays below 2 ** 64.
+    """
+    y = np.asarray(y, dtype=np.uint64)
+    if z <= 0:
+        raise ZeroDivisionError("mulDivFloor by zero")
+    q, r = divmod(x, z)
+
+    bits = 63 - z.bit_length()
+    if bits < 1:
+        # z is too close to 2 ** 64 for any chunk size; rare, so go exact
+        return np.array([x * int(v) // z for v in y.ravel()], dtype=np.uint64).reshape(
+            y.shape
+        )
+
+    zz = np.uint64(z)
+    rr = np.uint64(r)
+    quotient = np.zeros(y.shape, dtype=np.uint64)
+    remainder = np.zeros(y.shape, dtype=np.uint64)
+    mask = np.uint64((1 << bits) - 1)
+    # chunks above the largest element are all zero
+    top = int(y.max()).bit_length() if y.size else 0
+    for shift in range((max(top - 1, 0) // bits) * bits, -1, -bits):
+        chunk = (y >> np.uint64(shift)) & mask
+        acc = (remainder << np.uint64(bits)) + rr * chunk
+        quotient = (quotient << np.uint64(bits)) + acc // zz
+        remainder = acc % zz
+
+    return np.uint64(q) * y + quotient
+
+
+def withdrawable(
+    balances: np.ndarray, reserveA: int, reserveB: int, outstanding: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Token A and B each holder would receive for their whole balance.
+
+    Args:
+        balances: pool-token balance of each holder.
+        reserveA: the app's token A holding.
+        reserveB: the app's token B holding.
+        outstanding: pool_tokens_outstanding_key.
+
+    Returns:
+        (outA, outB, ok): the amounts, and a mask of holders whose withdrawal
+        the contract would accept in one go. It rejects zero balances, payouts
+        that round to zero, and balances large enough that
+        ``reserve * balance * SCALING_FACTOR`` overflows WideRatio's 128 bits;
+        for those the amounts are still the exact pro-rata values.
+    """
+    balances = np.asarray(balances, dtype=np.uint64)
+    if outstanding <= 0 or reserveA <= 0 or reserveB <= 0:
+        zeros = np.zeros(balances.shape, dtype=np.uint64)
+        return zeros, zeros.copy(), np.zeros(balances.shape, dtype=bool)
+
+    valid = balances <= np.uint64(outstanding)
+    # balances above outstanding cannot exist on chain; value them at zero
+    clipped = np.where(valid, balances, np.uint64(0))
+    outA = mulDivFloor(reserveA, clipped, outstanding)
+    outB = mulDivFloor(reserveB, clipped, outstanding)
+
+    ok = valid & (balances > 0) & (outA > 0) & (outB > 0)
+    for reserve in (reserveA, reserveB):
+        largest = (UINT128_LIMIT - 1) // (reserve * SCALING_FACTOR)
+        if largest < UINT64_MAX:
+            ok &= balances <= np.uint64(largest)
+    return outA, outB, ok
+
+
+def valueHolders(
+    snapshot: BalanceSnapshot,
+    poolToken: int,
+    reserveA: int,
+    reserveB: int,
+    outstanding: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """withdrawable for every account of ``snapshot``, in its address order."""
+    return withdrawable(snapshot.column(poolToken), reserveA, reserveB, outstanding)
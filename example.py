@@ -2,33 +2,35 @@ from time import time, sleep
 
 from algosdk import account, encoding
 from algosdk.logic import get_application_address
-""" from amm.operations import (
-    createAmmApp,
-    setupAmmApp,
+from deposit.operations import (
+    createApp,
+    setupApp,
     supply,
     withdraw,
     swap,
     closeAmm,
     optInToPoolToken,
 )
-from amm.util import (
+from deposit.utils import (
     getBalances,
     getAppGlobalState,
     getLastBlockTimestamp,
 )
-from amm.testing.setup import getAlgodClient
-from amm.testing.resources import (
+from deposit.resources import (
+    getAlgodClient,
+    getDispenser,
     getTemporaryAccount,
     optInToAsset,
     createDummyAsset,
-) """
+)
 
 def simple_amm():
     client = getAlgodClient()
+    dispenser = getDispenser()
 
     print("Alice is generating temporary accounts...")
-    creator = getTemporaryAccount(client)
-    supplier = getTemporaryAccount(client)
+    creator = getTemporaryAccount(client, dispenser)
+    supplier = getTemporaryAccount(client, dispenser)
 
     print("Alice is generating example tokens...")
     tokenAAmount = 10 ** 13
@@ -39,7 +41,7 @@ def simple_amm():
     print("TokenB id is:", tokenB)
 
     print("Alice is creating AMM that swaps between token A and token B...")
-    appID = createAmmApp(
+    appID = createApp(
         client=client,
         creator=creator,
         tokenA=tokenA,
@@ -55,7 +57,7 @@ def simple_amm():
     print("AMM's balances: ", ammBalancesBefore)
 
     print("Alice is setting up and funding amm...")
-    poolToken = setupAmmApp(
+    poolToken = setupApp(
         client=client,
         appID=appID,
         funder=creator,
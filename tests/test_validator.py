@@ -0,0 +1,259 @@
+"""deposit.validator verdicts checked against the approval program itself.
+
+Every group is judged by validateGroup and evaluated on deposit.teal with
+the same pool state, and the two must agree on whether it is accepted.
+"""
+
+import random
+from base64 import b64encode
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+from algosdk import account, encoding
+from algosdk.future import transaction
+
+from deposit.contracts.contracts import approval_program
+from deposit.model import POOL_TOKEN_DEFAULT_AMOUNT, UINT64_MAX
+from deposit.operations import (
+    getSupplyTxns,
+    getSwapTxns,
+    getWithdrawTxns,
+    getZapTxns,
+)
+from deposit.teal import NAMED_INTS, EvalContext, Program, TealError
+from deposit.validator import PoolState, validateBatch, validateGroup
+
+SUGGESTED_PARAMS = transaction.SuggestedParams(
+    fee=1000,
+    first=1000,
+    last=2000,
+    gh=b64encode(bytes(range(32))).decode(),
+    gen="sandnet-v1",
+    flat_fee=True,
+)
+APP_ID = 100
+TOKEN_A, TOKEN_B, POOL_TOKEN = 11, 12, 13
+TIMESTAMP = 1_700_000_000
+
+
+@pytest.fixture(scope="module")
+def program() -> Program:
+    return Program.fromExpr(approval_program())
+
+
+def makePool(
+    reserveA: int,
+    reserveB: int,
+    outstanding: int,
+    feeBps: int = 30,
+    minIncrement: int = 1000,
+) -> Tuple[PoolState, Dict[bytes, object]]:
+    """A set-up pool; returns its PoolState and its global state as the
+    program stores it."""
+    state = {
+        b"creator_key": encoding.decode_address(account.generate_account()[1]),
+        b"token_a_key": TOKEN_A,
+        b"token_b_key": TOKEN_B,
+        b"pool_token_key": POOL_TOKEN,
+        b"fee_bps_key": feeBps,
+        b"min_increment_key": minIncrement,
+        b"pool_tokens_outstanding_key": outstanding,
+        b"price_a_cumulative_key": bytes(16),
+        b"price_b_cumulative_key": bytes(16),
+        b"last_price_update_key": TIMESTAMP,
+    }
+    return PoolState(APP_ID, state, {TOKEN_A: reserveA, TOKEN_B: reserveB}), state
+
+
+def fields(txn: transaction.Transaction) -> Dict[str, object]:
+    """The TEAL fields of ``txn`` the program reads."""
+    out: Dict[str, object] = {
+        "TypeEnum": NAMED_INTS[txn.type],
+        "Sender": encoding.decode_address(txn.sender),
+    }
+    if txn.type == "pay":
+        out["Receiver"] = encoding.decode_address(txn.receiver)
+    elif txn.type == "axfer":
+        out["AssetReceiver"] = encoding.decode_address(txn.receiver)
+        out["XferAsset"] = txn.index
+        out["AssetAmount"] = txn.amount
+    elif txn.type == "appl":
+        out["ApplicationID"] = txn.index
+        out["OnCompletion"] = int(txn.on_complete)
+        out["ApplicationArgs"] = list(txn.app_args or [])
+        out["Assets"] = list(txn.foreign_assets or [])
+    return out
+
+
+def programAccepts(
+    program: Program,
+    txns: List[transaction.Transaction],
+    pool: PoolState,
+    state: Dict[bytes, object],
+) -> bool:
+    """Evaluate the group's app call with the app holding the pool's
+    reserves plus whatever the group sent it."""
+    group = [fields(txn) for txn in txns]
+    calls = [i for i, txn in enumerate(group) if txn["TypeEnum"] == NAMED_INTS["appl"]]
+    assert len(calls) == 1
+    appAddress = encoding.decode_address(pool.address)
+    holdings = {
+        (appAddress, TOKEN_A): pool.model.reserveA,
+        (appAddress, TOKEN_B): pool.model.reserveB,
+        (appAddress, POOL_TOKEN): POOL_TOKEN_DEFAULT_AMOUNT - pool.model.outstanding,
+    }
+    for txn in group[: calls[0]]:
+        if (
+            txn["TypeEnum"] == NAMED_INTS["axfer"]
+            and txn["AssetReceiver"] == appAddress
+        ):
+            holdings[(appAddress, txn["XferAsset"])] += txn["AssetAmount"]
+    if any(amount > UINT64_MAX for amount in holdings.values()):
+        # the ledger refuses a transfer that overflows the app's holding
+        return False
+    sender = group[calls[0]]["Sender"]
+    for asset in (TOKEN_A, TOKEN_B, POOL_TOKEN):
+        holdings[(sender, asset)] = 0
+
+    ctx = EvalContext(
+        group, calls[0], APP_ID, appAddress, dict(state), holdings, TIMESTAMP + 60
+    )
+    try:
+        approved, _ = program.eval(ctx)
+    except TealError:
+        return False
+    return approved
+
+
+def randomAmount(rng: random.Random) -> int:
+    if rng.random() < 0.7:
+        return rng.randrange(1000, 10 ** 6)
+    return rng.choice(
+        [
+            0,
+            1,
+            rng.randrange(1, 1000),
+            rng.randrange(1, 10 ** 12),
+            rng.randrange(1, 2 ** 63),
+        ]
+    )
+
+
+def randomPool(rng: random.Random) -> Tuple[PoolState, Dict[bytes, object]]:
+    if rng.random() < 0.7:
+        return makePool(
+            rng.randrange(10 ** 7, 10 ** 9),
+            rng.randrange(10 ** 7, 10 ** 9),
+            rng.randrange(10 ** 6, 10 ** 12),
+        )
+    return makePool(
+        rng.choice([0, randomAmount(rng), UINT64_MAX - rng.randrange(10 ** 6)]),
+        rng.choice([0, randomAmount(rng)]),
+        rng.choice([0, randomAmount(rng), POOL_TOKEN_DEFAULT_AMOUNT - 1]),
+        feeBps=rng.choice([0, 30, 100, 9_999]),
+        minIncrement=rng.choice([0, 1000]),
+    )
+
+
+def randomGroup(
+    rng: random.Random, pool: PoolState, sender: str
+) -> List[transaction.Transaction]:
+    state = {
+        b"token_a_key": TOKEN_A,
+        b"token_b_key": TOKEN_B,
+        b"pool_token_key": POOL_TOKEN,
+    }
+    token = rng.choice([TOKEN_A, TOKEN_B])
+    kind = rng.random()
+    if kind < 0.3:
+        txns = getSwapTxns(
+            APP_ID, state, token, randomAmount(rng), sender, SUGGESTED_PARAMS
+        )
+    elif kind < 0.5:
+        txns = getZapTxns(
+            APP_ID, state, token, randomAmount(rng), sender, SUGGESTED_PARAMS
+        )
+    elif kind < 0.8:
+        txns = getSupplyTxns(
+            APP_ID,
+            state,
+            randomAmount(rng),
+            randomAmount(rng),
+            sender,
+            SUGGESTED_PARAMS,
+        )
+    else:
+        txns = getWithdrawTxns(
+            APP_ID, state, randomAmount(rng), sender, SUGGESTED_PARAMS
+        )
+
+    corruption = rng.random()
+    if corruption < 0.05 and len(txns) > 3:
+        txns[1], txns[2] = txns[2], txns[1]
+    elif corruption < 0.1:
+        txns[-1].foreign_assets = txns[-1].foreign_assets[:1]
+    elif corruption < 0.15:
+        txns.insert(-1, txns.pop(0))
+    elif corruption < 0.2:
+        txns[-2].sender = account.generate_account()[1]
+    return txns
+
+
+def _verdicts(
+    program: Program, seed: int, n: int
+) -> List[Tuple[Optional[str], bool, List[transaction.Transaction]]]:
+    rng = random.Random(seed)
+    senders = [account.generate_account()[1] for _ in range(4)]
+    out = []
+    for _ in range(n):
+        pool, state = randomPool(rng)
+        txns = randomGroup(rng, pool, rng.choice(senders))
+        out.append(
+            (
+                validateGroup(txns, {APP_ID: pool}),
+                programAccepts(program, txns, pool, state),
+                txns,
+            )
+        )
+    return out
+
+
+def test_valid_swap_accepted(program: Program) -> None:
+    pool, state = makePool(10 ** 8, 2 * 10 ** 8, 10 ** 9)
+    sender = account.generate_account()[1]
+    txns = getSwapTxns(APP_ID, state, TOKEN_A, 10 ** 5, sender, SUGGESTED_PARAMS)
+    assert validateGroup(txns, {APP_ID: pool}) is None
+    assert programAccepts(program, txns, pool, state)
+
+
+def test_unavailable_asset_rejected(program: Program) -> None:
+    pool, state = makePool(10 ** 8, 2 * 10 ** 8, 10 ** 9)
+    sender = account.generate_account()[1]
+    txns = getSupplyTxns(APP_ID, state, 10 ** 5, 2 * 10 ** 5, sender, SUGGESTED_PARAMS)
+    txns[-1].foreign_assets = [TOKEN_A, TOKEN_B]
+    assert validateGroup(txns, {APP_ID: pool}) is not None
+    assert not programAccepts(program, txns, pool, state)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_groups_agree(program: Program, seed: int) -> None:
+    verdicts = _verdicts(program, seed, 500)
+    mismatches = [
+        (error, accepted, [txn.dictify() for txn in txns])
+        for error, accepted, txns in verdicts
+        if (error is None) != accepted
+    ]
+    assert not mismatches, mismatches[:3]
+    # the mix must exercise both outcomes
+    assert any(accepted for _, accepted, _ in verdicts)
+    assert not all(accepted for _, accepted, _ in verdicts)
+
+
+def test_batch_agrees_with_program(program: Program) -> None:
+    rng = random.Random(7)
+    senders = [account.generate_account()[1] for _ in range(4)]
+    for _ in range(300):
+        pool, state = randomPool(rng)
+        txns = randomGroup(rng, pool, rng.choice(senders))
+        mask, _ = validateBatch([txns], {APP_ID: pool}, explain=False)
+        assert bool(mask[0]) == programAccepts(program, txns, pool, state)